@@ -1,18 +1,34 @@
 import requests
 import time
+import asyncio
+import copy
 import json
+import random
+import hashlib
 import logging
-import requests
-from typing import Dict, Any, Optional, List
+import re
+import socket
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Any, Iterator, Optional, List, Tuple
 from functools import wraps
-import streamlit as st
+from urllib.parse import urlsplit
 from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from urllib3.connection import HTTPConnection
+
+from config import API_CONFIG, ENDPOINTS, ACTIVE_ENDPOINT
+from model_health import get_health_monitor
+from stream_parser import IncrementalJSONParser, sse_data
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_DURATION_RE = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
 class APIException(Exception):
     """API调用异常"""
     def __init__(self, message: str, status_code: Optional[int] = None, response_text: Optional[str] = None):
@@ -21,58 +37,793 @@ class APIException(Exception):
         self.response_text = response_text
         super().__init__(self.message)
 
+
+class RequestCancelled(APIException):
+    """请求被调用方取消（如对冲中落后的一方），不作为失败或拥塞信号"""
+
+# 事件监听器：listener(事件名, 事件数据)
+# 事件：retry（将要重试）、fallback（尝试备用模型）、success（调用成功）、failure（全部失败，使用默认评分）、
+# latency（每次HTTP请求的耗时和状态码）、coalesced（与进行中的相同请求合并，未单独调用API）、
+# concurrency（模型的自适应并发窗口大小变化）、circuit（模型熔断状态变化）、
+# hedge（主模型应答过慢，向备用模型发送对冲请求）
+APIEventListener = Callable[[str, Dict[str, Any]], None]
+
+
+class _InFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """进程级请求合并：相同键的并发调用只执行一次，所有调用方共享其结果"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _InFlightCall] = {}
+        self.coalesced = 0
+
+    def begin(self, key: str) -> Tuple[_InFlightCall, bool]:
+        """登记一次调用，返回 (进行中的调用, 是否由当前调用方执行)"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                return call, False
+            call = self._calls[key] = _InFlightCall()
+            return call, True
+
+    def finish(self, key: str, call: _InFlightCall, result: Optional[Dict[str, Any]] = None,
+               error: Optional[BaseException] = None):
+        """执行方完成调用，唤醒所有等待方"""
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.result, call.error = result, error
+        call.done.set()
+
+    def do(self, key: str, fn: Callable[[], Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+        """执行或加入相同键的调用，返回 (结果副本, 是否与其他调用共享)
+
+        执行方出错时等待方不共享异常，改为自行执行。
+        """
+        while True:
+            call, leader = self.begin(key)
+            if leader:
+                try:
+                    result = fn()
+                except BaseException as e:
+                    self.finish(key, call, error=e)
+                    raise
+                self.finish(key, call, result)
+                return copy.deepcopy(result), False
+            call.done.wait()
+            if call.error is None:
+                return copy.deepcopy(call.result), True
+
+
+# 进程内所有客户端（各会话、各线程）共享，相同请求同时只向上游发送一次
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """获取进程级共享的请求合并器"""
+    return _single_flight
+
+def _parse_duration(value: str) -> Optional[float]:
+    """解析时长：纯数字为秒，也支持 1m30s、250ms 等写法"""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts or ''.join(number + unit for number, unit in parts) != value.replace(' ', ''):
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def _parse_retry_after(value: str) -> Optional[float]:
+    """解析 Retry-After：秒数或HTTP日期，返回需要等待的秒数"""
+    seconds = _parse_duration(value)
+    if seconds is not None:
+        return max(0.0, seconds)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_reset(value: str) -> Optional[float]:
+    """解析限流窗口重置时间，返回距重置的秒数（兼容毫秒/秒级时间戳和相对时长）"""
+    seconds = _parse_duration(value)
+    if seconds is None:
+        return None
+    if seconds > 1e12:
+        seconds = seconds / 1000 - time.time()
+    elif seconds > 1e9:
+        seconds -= time.time()
+    return max(0.0, seconds)
+
+
+class TokenBucket:
+    """单个模型的令牌桶：按 rate（个/秒）补充令牌，最多积累 capacity 个"""
+
+    def __init__(self, rate: float, capacity: float, min_rate: float):
+        self.base_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.blocked_until = 0.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, now: float) -> float:
+        """预订一个令牌，返回需要等待的秒数（令牌不足时预支，等待到补足为止）"""
+        self._refill(now)
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+    def refund(self):
+        """退回一个预订的令牌"""
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def wait_time(self, now: float) -> float:
+        """下一个请求需要等待的秒数"""
+        tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        wait = (1 - tokens) / self.rate if tokens < 1 else 0.0
+        return max(wait, self.blocked_until - now, 0.0)
+
+
+class RateLimiter:
+    """进程级按模型限流：所有客户端的出站请求都先在对应模型的令牌桶中取令牌
+
+    免费模型（:free）按配置的保守速率限流；其他模型初始速率为上限 max_requests_per_minute（相当于不限流），
+    只在服务端给出限流信号后放慢。根据响应头实时调整：Retry-After 暂停该模型直到指定时间，
+    X-RateLimit-Remaining/Reset 把补充速率设为“剩余额度/距重置时间”（可升可降，不超过上限），
+    429 时速率减半，之后没有限流响应头的成功响应逐步恢复到初始速率。
+    """
+
+    def __init__(self, requests_per_minute: float = 20, burst: float = 5, min_requests_per_minute: float = 2,
+                 max_requests_per_minute: float = 600):
+        self.rate = requests_per_minute / 60
+        self.burst = burst
+        self.min_rate = min_requests_per_minute / 60
+        self.max_rate = max(max_requests_per_minute / 60, self.rate)
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def _bucket(self, model: str) -> TokenBucket:
+        bucket = self._buckets.get(model)
+        if bucket is None:
+            if model.endswith(':free'):
+                bucket = TokenBucket(self.rate, self.burst, self.min_rate)
+            else:
+                # 最多积累一分钟的令牌，服务端给出限流信号之前不会排队
+                bucket = TokenBucket(self.max_rate, self.max_rate * 60, self.min_rate)
+            self._buckets[model] = bucket
+        return bucket
+
+    def reserve(self, model: str, deadline: Optional[float] = None) -> Optional[float]:
+        """为一次请求预订令牌，返回发送前需要等待的秒数；等待会超过截止时间（time.monotonic()）时不预订，返回 None"""
+        with self._lock:
+            bucket = self._bucket(model)
+            now = time.monotonic()
+            wait = bucket.reserve(now)
+            if deadline is not None and now + wait >= deadline:
+                bucket.refund()
+                return None
+            return wait
+
+    def acquire(self, model: str, deadline: Optional[float] = None) -> bool:
+        """同步等待直到可以发送请求；截止时间前无法发送时立即返回 False"""
+        wait = self.reserve(model, deadline)
+        if wait is None:
+            return False
+        if wait > 0:
+            logger.info(f"模型 {model} 限流，等待 {wait:.1f} 秒")
+            time.sleep(wait)
+        return True
+
+    def observe(self, model: str, status_code: Optional[int], headers) -> None:
+        """根据响应状态码和限流相关响应头调整该模型的令牌桶"""
+        retry_after = headers.get('Retry-After') if headers is not None else None
+        remaining = headers.get('X-RateLimit-Remaining') if headers is not None else None
+        reset = headers.get('X-RateLimit-Reset') if headers is not None else None
+        with self._lock:
+            bucket = self._bucket(model)
+            now = time.monotonic()
+            bucket._refill(now)
+            if retry_after is not None:
+                delay = _parse_retry_after(retry_after)
+                if delay is not None:
+                    bucket.blocked_until = max(bucket.blocked_until, now + delay)
+            if remaining is not None and reset is not None:
+                try:
+                    remaining_count = float(remaining)
+                except ValueError:
+                    remaining_count = None
+                reset_seconds = _parse_reset(reset)
+                if remaining_count is not None and reset_seconds is not None:
+                    bucket.tokens = min(bucket.tokens, remaining_count)
+                    if remaining_count < 1:
+                        bucket.blocked_until = max(bucket.blocked_until, now + reset_seconds)
+                    elif reset_seconds > 0:
+                        bucket.rate = min(self.max_rate, max(bucket.min_rate, remaining_count / reset_seconds))
+            if status_code == 429:
+                bucket.rate = max(bucket.min_rate, bucket.rate / 2)
+                if bucket.blocked_until <= now:
+                    # 没有给出 Retry-After 时清空令牌，按下调后的速率等待
+                    bucket.tokens = min(bucket.tokens, 0.0)
+                    bucket.blocked_until = now + 1 / bucket.rate
+            elif (status_code is not None and status_code < 400 and remaining is None
+                  and bucket.rate < bucket.base_rate):
+                bucket.rate = min(bucket.base_rate, bucket.rate * 1.1)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """各模型当前的令牌数、补充速率（次/分钟）和下一个请求的等待时间，用于监控"""
+        with self._lock:
+            now = time.monotonic()
+            return {
+                model: {
+                    'tokens': max(0.0, min(bucket.capacity, bucket.tokens + (now - bucket.updated) * bucket.rate)),
+                    'rate_per_minute': bucket.rate * 60,
+                    'wait_seconds': bucket.wait_time(now)
+                }
+                for model, bucket in self._buckets.items()
+            }
+
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """获取进程级共享的限流器"""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter(
+                API_CONFIG['rate_limit_per_minute'],
+                burst=API_CONFIG['rate_limit_burst'],
+                min_requests_per_minute=API_CONFIG['min_rate_limit_per_minute'],
+                max_requests_per_minute=API_CONFIG['max_rate_limit_per_minute']
+            )
+        return _rate_limiter
+
+
+class _ConcurrencyWindow:
+    def __init__(self, window: float):
+        self.window = window
+        self.inflight = 0
+        self.latency_ewma: Optional[float] = None
+        self.samples = 0
+        self.last_cut = 0.0
+
+
+class ConcurrencyController:
+    """进程级按模型自适应并发（AIMD）：所有客户端的请求在对应模型的并发窗口内发送
+
+    请求成功且耗时正常时窗口加性增长（每个窗口的请求全部成功约 +1），
+    429、5xx、网络错误或耗时突增（超过平均耗时的 latency_spike_factor 倍）时窗口减半；
+    同一时刻前发出的请求只触发一次减半。
+    """
+
+    def __init__(self, initial_window: float = 4, min_window: float = 1, max_window: float = 16,
+                 latency_spike_factor: float = 3):
+        self.initial_window = initial_window
+        self.min_window = min_window
+        self.max_window = max_window
+        self.latency_spike_factor = latency_spike_factor
+        self._cond = threading.Condition()
+        self._windows: Dict[str, _ConcurrencyWindow] = {}
+
+    def _window(self, model: str) -> _ConcurrencyWindow:
+        window = self._windows.get(model)
+        if window is None:
+            window = self._windows[model] = _ConcurrencyWindow(self.initial_window)
+        return window
+
+    def limit(self, model: str) -> int:
+        """模型当前允许的并发请求数"""
+        with self._cond:
+            return max(1, int(self._window(model).window))
+
+    def try_acquire(self, model: str) -> bool:
+        """窗口未满时占用一个并发名额"""
+        with self._cond:
+            window = self._window(model)
+            if window.inflight >= max(1, int(window.window)):
+                return False
+            window.inflight += 1
+            return True
+
+    def acquire(self, model: str, deadline: Optional[float] = None) -> bool:
+        """同步等待直到窗口有空位；到截止时间（time.monotonic()）仍没有空位时返回 False"""
+        with self._cond:
+            window = self._window(model)
+            while window.inflight >= max(1, int(window.window)):
+                timeout = None if deadline is None else deadline - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    return False
+                self._cond.wait(timeout)
+            window.inflight += 1
+            return True
+
+    async def acquire_async(self, model: str, deadline: Optional[float] = None) -> bool:
+        """异步等待直到窗口有空位（不阻塞事件循环）；到截止时间仍没有空位时返回 False"""
+        while not self.try_acquire(model):
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.05)
+        return True
+
+    def release(self, model: str, status_code: Optional[int], latency: float) -> Optional[float]:
+        """释放名额并根据结果调整窗口；窗口大小变化时返回新的窗口大小"""
+        with self._cond:
+            window = self._window(model)
+            window.inflight -= 1
+            previous = window.window
+            now = time.monotonic()
+            congested = status_code is None or status_code == 429 or status_code >= 500
+            if not congested and status_code < 400:
+                spike = (window.samples >= 5
+                         and latency > self.latency_spike_factor * window.latency_ewma)
+                window.latency_ewma = latency if window.latency_ewma is None else 0.8 * window.latency_ewma + 0.2 * latency
+                window.samples += 1
+                congested = spike
+                if not spike and window.inflight + 1 >= window.window / 2:
+                    # 只在窗口被充分使用时增长，需求不足时不虚增
+                    window.window = min(self.max_window, window.window + 1 / window.window)
+            if congested and now - latency >= window.last_cut:
+                window.window = max(self.min_window, window.window / 2)
+                window.last_cut = now
+            self._cond.notify_all()
+            if int(window.window) != int(previous):
+                return window.window
+            return None
+
+    def cancel(self, model: str):
+        """释放被取消请求的名额，不调整窗口"""
+        with self._cond:
+            self._window(model).inflight -= 1
+            self._cond.notify_all()
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """各模型当前的并发窗口、进行中请求数和平均耗时，用于监控"""
+        with self._cond:
+            return {
+                model: {
+                    'window': window.window,
+                    'inflight': window.inflight,
+                    'latency': window.latency_ewma or 0.0
+                }
+                for model, window in self._windows.items()
+            }
+
+
+_concurrency_controller: Optional[ConcurrencyController] = None
+_concurrency_controller_lock = threading.Lock()
+
+
+def get_concurrency_controller() -> ConcurrencyController:
+    """获取进程级共享的自适应并发控制器"""
+    global _concurrency_controller
+    with _concurrency_controller_lock:
+        if _concurrency_controller is None:
+            _concurrency_controller = ConcurrencyController(
+                API_CONFIG['initial_concurrency_window'],
+                min_window=API_CONFIG['min_concurrency_window'],
+                max_window=API_CONFIG['max_concurrent_requests'],
+                latency_spike_factor=API_CONFIG['latency_spike_factor']
+            )
+        return _concurrency_controller
+
+
+class _ModelCircuit:
+    def __init__(self, window: int):
+        self.state = 'closed'
+        self.outcomes: "deque[bool]" = deque(maxlen=window)
+        self.opened_at = 0.0
+        # 半开状态下试探请求的发出时间（None 表示没有进行中的试探）
+        self.trial_started: Optional[float] = None
+
+
+class CircuitBreaker:
+    """进程级按模型熔断：closed（正常）→ open（跳过该模型）→ half_open（放行一个试探请求）
+
+    最近 window 次请求中失败（网络错误、超时、429/5xx）比例达到 failure_rate 且请求数不少于 min_requests 时熔断，
+    cooldown 秒后放行一个试探请求：成功则恢复，失败则继续熔断。
+    """
+
+    def __init__(self, failure_rate: float = 0.5, min_requests: int = 4, window: int = 10, cooldown: float = 60):
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.window = window
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._circuits: Dict[str, _ModelCircuit] = {}
+
+    def _circuit(self, model: str) -> _ModelCircuit:
+        circuit = self._circuits.get(model)
+        if circuit is None:
+            circuit = self._circuits[model] = _ModelCircuit(self.window)
+        return circuit
+
+    def allow(self, model: str) -> bool:
+        """是否可以向该模型发送请求；半开状态下只放行一个试探请求（试探请求超过 cooldown 未结束时再放行一个）"""
+        with self._lock:
+            circuit = self._circuit(model)
+            if circuit.state == 'closed':
+                return True
+            now = time.monotonic()
+            if circuit.state == 'open':
+                if now - circuit.opened_at < self.cooldown:
+                    return False
+                circuit.state = 'half_open'
+            if circuit.trial_started is not None and now - circuit.trial_started < self.cooldown:
+                return False
+            circuit.trial_started = now
+            return True
+
+    def state(self, model: str) -> str:
+        with self._lock:
+            circuit = self._circuits.get(model)
+            return circuit.state if circuit is not None else 'closed'
+
+    def record(self, model: str, success: bool) -> Optional[str]:
+        """记录一次请求结果；状态变化时返回新状态"""
+        with self._lock:
+            circuit = self._circuit(model)
+            previous = circuit.state
+            if circuit.state == 'half_open':
+                circuit.trial_started = None
+                if success:
+                    circuit.state = 'closed'
+                    circuit.outcomes.clear()
+                else:
+                    circuit.state = 'open'
+                    circuit.opened_at = time.monotonic()
+            elif circuit.state == 'closed':
+                circuit.outcomes.append(success)
+                failures = circuit.outcomes.count(False)
+                if (len(circuit.outcomes) >= self.min_requests
+                        and failures / len(circuit.outcomes) >= self.failure_rate):
+                    circuit.state = 'open'
+                    circuit.opened_at = time.monotonic()
+                    circuit.outcomes.clear()
+            if circuit.state != previous:
+                logger.warning(f"模型 {model} 熔断状态: {previous} -> {circuit.state}")
+                return circuit.state
+            return None
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """各模型的熔断状态、近期失败率和剩余冷却时间，用于监控"""
+        with self._lock:
+            now = time.monotonic()
+            return {
+                model: {
+                    'state': circuit.state,
+                    'failure_rate': (circuit.outcomes.count(False) / len(circuit.outcomes)
+                                     if circuit.outcomes else 0.0),
+                    'cooldown_remaining': (max(0.0, self.cooldown - (now - circuit.opened_at))
+                                           if circuit.state == 'open' else 0.0)
+                }
+                for model, circuit in self._circuits.items()
+            }
+
+
+_circuit_breaker: Optional[CircuitBreaker] = None
+_circuit_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """获取进程级共享的模型熔断器"""
+    global _circuit_breaker
+    with _circuit_breaker_lock:
+        if _circuit_breaker is None:
+            _circuit_breaker = CircuitBreaker(
+                API_CONFIG['circuit_failure_rate'],
+                min_requests=API_CONFIG['circuit_min_requests'],
+                window=API_CONFIG['circuit_window'],
+                cooldown=API_CONFIG['circuit_cooldown']
+            )
+        return _circuit_breaker
+
+
+class HedgePolicy:
+    """对冲请求策略：主模型超过其历史耗时的 percentile 分位仍未应答时，向下一个健康的备用模型发送同一请求
+
+    每个主请求积累 max_rate 个对冲额度（最多积累 max_burst 个），每次对冲消耗一个，
+    长期来看对冲请求数不超过主请求数的 max_rate 倍。
+    """
+
+    def __init__(self, percentile: float = 0.9, min_samples: int = 10, window: int = 50, max_rate: float = 0.1,
+                 max_burst: float = 3):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window = window
+        self.max_rate = max_rate
+        self.max_burst = max_burst
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, "deque[float]"] = {}
+        self._budget = 0.0
+        self.requests = 0
+        self.hedges = 0
+        self.wins = 0
+
+    def observe(self, model: str, latency: float):
+        """记录一次成功请求的耗时"""
+        with self._lock:
+            latencies = self._latencies.get(model)
+            if latencies is None:
+                latencies = self._latencies[model] = deque(maxlen=self.window)
+            latencies.append(latency)
+
+    def _delay(self, model: str) -> Optional[float]:
+        latencies = sorted(self._latencies.get(model, ()))
+        if len(latencies) < self.min_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(self.percentile * len(latencies)))]
+
+    def delay(self, model: str) -> Optional[float]:
+        """主请求发出多少秒后仍未应答时对冲；耗时样本不足时返回 None（不对冲）"""
+        with self._lock:
+            return self._delay(model)
+
+    def start_request(self):
+        """记录一次主请求并积累对冲额度"""
+        with self._lock:
+            self.requests += 1
+            self._budget = min(self.max_burst, self._budget + self.max_rate)
+
+    def try_hedge(self) -> bool:
+        """有额度时消耗一个并返回 True"""
+        with self._lock:
+            if self._budget < 1:
+                return False
+            self._budget -= 1
+            self.hedges += 1
+            return True
+
+    def record_win(self):
+        """对冲请求先于主请求得到有效结果"""
+        with self._lock:
+            self.wins += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """主请求数、对冲数、对冲胜出数和各模型当前的对冲延迟，用于监控"""
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'hedges': self.hedges,
+                'wins': self.wins,
+                'hedge_rate': self.hedges / self.requests if self.requests else 0.0,
+                'delays': {model: self._delay(model) for model in self._latencies}
+            }
+
+
+_hedge_policy: Optional[HedgePolicy] = None
+_hedge_policy_lock = threading.Lock()
+
+
+def get_hedge_policy() -> HedgePolicy:
+    """获取进程级共享的对冲请求策略"""
+    global _hedge_policy
+    with _hedge_policy_lock:
+        if _hedge_policy is None:
+            _hedge_policy = HedgePolicy(
+                API_CONFIG['hedge_percentile'],
+                min_samples=API_CONFIG['hedge_min_samples'],
+                max_rate=API_CONFIG['hedge_max_rate']
+            )
+        return _hedge_policy
+
+
+class RequestBudget:
+    """单份简历的请求时间预算：重试、退避、对冲和降级共用同一个截止时间，每次尝试的超时都不超过剩余时间
+
+    首个请求真正发出时才开始计时，在限流器和并发窗口中的本地排队时间不计入预算。
+    """
+
+    def __init__(self, total: float, connect_timeout: float, read_timeout: float):
+        self.total = total
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        # 截止时间（time.monotonic()），开始计时前为 None
+        self.deadline: Optional[float] = None
+
+    def start(self):
+        """开始计时（已开始时不变）"""
+        if self.deadline is None:
+            self.deadline = time.monotonic() + self.total
+
+    def remaining(self) -> float:
+        if self.deadline is None:
+            return self.total
+        return max(0.0, self.deadline - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, read_timeout: Optional[float] = None) -> Tuple[float, float]:
+        """本次尝试的 (连接超时, 读取超时)，读取超时不超过剩余预算"""
+        remaining = self.remaining()
+        return (min(self.connect_timeout, remaining),
+                min(read_timeout or self.read_timeout, remaining))
+
+
+class _KeepAliveAdapter(HTTPAdapter):
+    """开启TCP keepalive的连接适配器，空闲连接不易被中间网络设备断开"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = HTTPConnection.default_socket_options + [
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        ]
+        super().init_poolmanager(*args, **kwargs)
+
+
+class SessionPool:
+    """按API密钥复用的HTTP会话：Streamlit每次重新运行脚本都会新建客户端，共用会话可保留已建立的TCP/TLS连接
+
+    最多保留 max_sessions 个密钥的会话（最久未使用的先移除），每个会话最多保持 pool_size 个连接。
+    """
+
+    def __init__(self, pool_size: int = 32, max_sessions: int = 8):
+        self.pool_size = pool_size
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, requests.Session]" = OrderedDict()
+        self._preconnected = set()
+
+    def _create_session(self) -> requests.Session:
+        """创建会话（连接层不重试，重试统一由 call_api_with_retry 按时间预算控制）"""
+        session = requests.Session()
+        adapter = _KeepAliveAdapter(pool_connections=4, pool_maxsize=self.pool_size, max_retries=0)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def session(self, api_key: str) -> requests.Session:
+        """获取该密钥的会话，不存在时创建"""
+        with self._lock:
+            session = self._sessions.get(api_key)
+            if session is None:
+                session = self._sessions[api_key] = self._create_session()
+                while len(self._sessions) > self.max_sessions:
+                    # 移除的会话可能仍被旧客户端使用，不主动关闭，由垃圾回收释放连接
+                    evicted, _ = self._sessions.popitem(last=False)
+                    self._preconnected = {item for item in self._preconnected if item[0] != evicted}
+            self._sessions.move_to_end(api_key)
+            return session
+
+    def preconnect(self, api_key: str, url: str, timeout: float = 5):
+        """在后台线程中预先建立到 url 所在主机的连接（每个密钥和主机只做一次），首个分析请求不必等待握手"""
+        parsed = urlsplit(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}/"
+        with self._lock:
+            if (api_key, origin) in self._preconnected:
+                return
+            self._preconnected.add((api_key, origin))
+        session = self.session(api_key)
+
+        def _connect():
+            try:
+                # 只需要建立连接，响应内容无关紧要；关闭响应后连接回到连接池
+                session.head(origin, timeout=timeout).close()
+            except requests.RequestException as e:
+                logger.info(f"预连接 {origin} 失败: {e}")
+                with self._lock:
+                    self._preconnected.discard((api_key, origin))
+
+        threading.Thread(target=_connect, name='http-preconnect', daemon=True).start()
+
+
+_session_pool: Optional[SessionPool] = None
+_session_pool_lock = threading.Lock()
+
+
+def get_session_pool() -> SessionPool:
+    """获取进程级共享的HTTP会话池"""
+    global _session_pool
+    with _session_pool_lock:
+        if _session_pool is None:
+            _session_pool = SessionPool(
+                API_CONFIG['connection_pool_size'],
+                max_sessions=API_CONFIG['max_pooled_sessions']
+            )
+        return _session_pool
+
+
+def get_endpoint(name: Optional[str] = None) -> Dict[str, Any]:
+    """API端点配置（默认为部署时选择的端点）"""
+    name = name or ACTIVE_ENDPOINT
+    if name not in ENDPOINTS:
+        raise ValueError(f"未知的API端点: {name}（可选: {', '.join(ENDPOINTS)}）")
+    return ENDPOINTS[name]
+
+
 class RobustAPIClient:
-    """稳定的API客户端，包含重试机制、错误处理和降级策略"""
+    """稳定的API客户端，包含重试机制、错误处理和降级策略
+
+    客户端不依赖界面，也不在请求之间保存可变状态，同一实例可被多个线程并发使用；
+    重试、降级等过程通过 add_listener 注册的监听器以结构化事件对外通知。
+    """
     
-    def __init__(self, api_key: Optional[str] = None, max_retries: int = 3, timeout: int = 30):
+    def __init__(self, api_key: Optional[str] = None, max_retries: int = 3, timeout: int = 30,
+                 endpoint: Optional[str] = None):
+        # OpenAI兼容端点：地址、认证方式、可选模型和降级顺序见 config.ENDPOINTS
+        self.endpoint = get_endpoint(endpoint)
         self.api_key = api_key
         self.max_retries = max_retries
-        self.timeout = timeout
-        self.base_url = "https://openrouter.ai/api/v1/chat/completions"
+        self.timeout = timeout  # 读取超时
+        self.connect_timeout = API_CONFIG['connect_timeout']
+        # 每份简历从首次请求到降级结束的总时间预算
+        self.request_budget = API_CONFIG['request_budget']
+        self.base_url = self.endpoint['api_base'].rstrip('/') + "/chat/completions"
+        # 是否在进程级限流器中排队（自建服务不限流）
+        self.rate_limited = self.endpoint.get('rate_limit', True)
+        self.requires_api_key = self.endpoint['auth'] != 'none'
         
         # 重试配置
-        self.retry_delays = [1, 2, 4]  # 指数退避：1秒、2秒、4秒
+        self.retry_delays = [1, 2, 4]  # 指数退避：1秒、2秒、4秒（实际等待在其一半到全部之间随机）
         self.retry_status_codes = [429, 500, 502, 503, 504]  # 需要重试的状态码
+        self.unavailable_status_codes = [404, 410]  # 模型不存在或已下线：不重试，但计入熔断失败
         
-        # 降级策略配置
-        self.fallback_models = [
-            "deepseek/deepseek-chat-v3-0324:free",
-            "deepseek/deepseek-r1:free",
-            "qwen/qwen3-32b:free",
-            "google/gemini-2.0-flash-exp:free"
-        ]
-        
-        self.session = self._create_session()
-        
-    def _create_session(self) -> requests.Session:
-        """创建带有重试策略的会话"""
-        session = requests.Session()
+        # 对冲请求：主模型应答过慢时同时请求备用模型，取先到的有效结果
+        self.enable_hedging = API_CONFIG['enable_hedging']
+        # 流式响应：边生成边解析，JSON对象完整后立即结束读取
+        self.enable_streaming = API_CONFIG['enable_streaming']
         
-        # 配置重试策略
-        retry_strategy = Retry(
-            total=self.max_retries,
-            status_forcelist=self.retry_status_codes,
-            allowed_methods=["HEAD", "GET", "POST"],
-            backoff_factor=1
-        )
+        # 降级策略配置：按端点配置的降级顺序
+        self.fallback_models = list(self.endpoint['fallback_models'])
         
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        session.mount("http://", adapter)
-        session.mount("https://", adapter)
+        # 同一密钥的客户端共用会话和连接池
+        self.session = get_session_pool().session(self.api_key or '')
+        self._listeners: tuple = ()
+        self._listeners_lock = threading.Lock()
+    
+    def add_listener(self, listener: APIEventListener):
+        """注册事件监听器"""
+        with self._listeners_lock:
+            self._listeners = self._listeners + (listener,)
+    
+    def remove_listener(self, listener: APIEventListener):
+        with self._listeners_lock:
+            self._listeners = tuple(l for l in self._listeners if l is not listener)
+    
+    def _emit(self, event: str, **data):
+        """通知所有监听器（没有监听器时没有额外开销，监听器的异常不影响API调用）"""
+        for listener in self._listeners:
+            try:
+                listener(event, data)
+            except Exception as e:
+                logger.warning(f"API事件监听器执行失败 ({event}): {e}")
         
-        return session
+    def preconnect(self):
+        """后台预先建立到API服务器的连接（没有API密钥时不连接）"""
+        if self.api_key:
+            get_session_pool().preconnect(self.api_key, self.base_url, timeout=self.connect_timeout)
     
     def _get_headers(self) -> Dict[str, str]:
         """获取请求头"""
         headers = {
             "Content-Type": "application/json",
-            "HTTP-Referer": "https://github.com/your-repo/resume-analyzer",
-            "X-Title": "Resume Analyzer"
+            **self.endpoint.get('extra_headers', {})
         }
         
-        # 只有在有API密钥时才添加Authorization头部
+        # 只有在有API密钥时才按端点的认证方式添加密钥
         if self.api_key and self.api_key != "free_model":
-            headers["Authorization"] = f"Bearer {self.api_key}"
+            if self.endpoint['auth'] == 'bearer':
+                headers["Authorization"] = f"Bearer {self.api_key}"
+            elif self.endpoint['auth'] == 'header':
+                headers[self.endpoint['auth_header']] = self.api_key
             
         return headers
     
@@ -90,40 +841,117 @@ class RobustAPIClient:
     
     def _handle_response(self, response: requests.Response) -> Dict[str, Any]:
         """处理API响应"""
-        if response.status_code == 200:
+        return self._parse_response(response.status_code, response.text)
+    
+    def _parse_content(self, result_text: str) -> Dict[str, Any]:
+        """从模型输出的文本中解析JSON结果"""
+        # 清理可能的markdown格式
+        if "```json" in result_text:
+            result_text = result_text.split("```json")[1].split("```")[0]
+        elif "```" in result_text:
+            result_text = result_text.split("```")[1]
+        
+        # 解析JSON
+        return json.loads(result_text.strip())
+    
+    def _parse_response(self, status_code: int, response_text: str) -> Dict[str, Any]:
+        """按状态码和响应正文解析结果（同步和异步客户端共用）"""
+        if status_code == 200:
             try:
-                result_data = response.json()
-                result_text = result_data['choices'][0]['message']['content']
-                
-                # 清理可能的markdown格式
-                if "```json" in result_text:
-                    result_text = result_text.split("```json")[1].split("```")[0]
-                elif "```" in result_text:
-                    result_text = result_text.split("```")[1]
+                result_data = json.loads(response_text)
+                return self._parse_content(result_data['choices'][0]['message']['content'])
                 
-                # 解析JSON
-                parsed_result = json.loads(result_text.strip())
-                return parsed_result
-                
-            except (KeyError, IndexError, json.JSONDecodeError) as e:
+            except (KeyError, IndexError, TypeError, json.JSONDecodeError) as e:
                 logger.error(f"响应解析失败: {e}")
-                raise APIException(f"响应格式错误: {str(e)}", response.status_code, response.text[:200])
+                raise APIException(f"响应格式错误: {str(e)}", status_code, response_text[:200])
         else:
             # 处理错误响应
             try:
-                error_detail = response.json().get('error', {}).get('message', '未知错误')
+                error_detail = json.loads(response_text).get('error', {}).get('message', '未知错误')
             except:
-                error_detail = f"HTTP {response.status_code}"
+                error_detail = f"HTTP {status_code}"
             
-            raise APIException(f"API调用失败: {error_detail}", response.status_code, response.text[:200])
+            raise APIException(f"API调用失败: {error_detail}", status_code, response_text[:200])
     
-    def _should_retry(self, exception: Exception, attempt: int) -> bool:
-        """判断是否应该重试"""
+    def _stream_delta(self, payload: str) -> str:
+        """SSE数据块中的增量内容；上游在流中返回错误时抛出 APIException"""
+        try:
+            chunk = json.loads(payload)
+        except json.JSONDecodeError:
+            return ''
+        if 'error' in chunk:
+            error = chunk['error']
+            code = error.get('code')
+            raise APIException(f"API调用失败: {error.get('message', '未知错误')}",
+                               code if isinstance(code, int) else None, payload[:200])
+        choices = chunk.get('choices') or [{}]
+        return (choices[0].get('delta') or {}).get('content') or ''
+    
+    def _stream_result(self, parser: IncrementalJSONParser) -> Dict[str, Any]:
+        """流式响应读取结束后的分析结果；没有找到完整的JSON对象时按整段输出解析"""
+        if parser.result is not None:
+            return parser.result
+        try:
+            return self._parse_content(parser.text())
+        except (IndexError, json.JSONDecodeError) as e:
+            logger.error(f"响应解析失败: {e}")
+            raise APIException(f"响应格式错误: {str(e)}", 200, parser.text()[:200])
+    
+    def _read_stream(self, response: requests.Response, on_field: Optional[Callable[[str, Any], None]] = None,
+                     deadline: Optional[float] = None, cancel: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """读取SSE流式响应：逐块解析，每个字段完整时调用 on_field(字段名, 值)，JSON对象闭合后立即关闭连接
+
+        读取超时只限制两次数据之间的间隔，整个流的读取时间由 deadline（time.monotonic()）限制；
+        cancel 被设置后在收到下一块数据时关闭连接并抛出 RequestCancelled。
+        """
+        if response.status_code != 200:
+            return self._parse_response(response.status_code, response.text)
+        parser = IncrementalJSONParser()
+        try:
+            for line in response.iter_lines():
+                if cancel is not None and cancel.is_set():
+                    raise RequestCancelled("请求已取消（流式读取）")
+                payload = sse_data(line.decode('utf-8'))
+                if payload is None:
+                    continue
+                if payload == '[DONE]':
+                    break
+                for field, value in parser.feed(self._stream_delta(payload)):
+                    if on_field:
+                        on_field(field, value)
+                if parser.complete:
+                    # 不再等待模型在JSON之后的多余输出
+                    break
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise APIException("超出请求时间预算（流式读取）")
+        finally:
+            response.close()
+        return self._stream_result(parser)
+    
+    def _complete(self, data: Dict[str, Any], budget: RequestBudget,
+                  on_field: Optional[Callable[[str, Any], None]] = None,
+                  read_timeout: Optional[float] = None, cancel: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """在时间预算内发送一次请求并解析分析结果；启用流式响应时边接收边解析
+
+        cancel 被设置后不再发送尚在排队的请求，流式读取中的请求在下一块数据到达时关闭连接。
+        """
+        if budget.expired():
+            raise APIException("超出请求时间预算")
+        if not self.enable_streaming:
+            return self._handle_response(self._post(data, budget, read_timeout=read_timeout, cancel=cancel))
+        stream_data = dict(data, stream=True)
+        # consume 在请求发出（预算开始计时）后才调用
+        return self._post(stream_data, budget, read_timeout=read_timeout, cancel=cancel,
+                          consume=lambda response: self._read_stream(response, on_field, budget.deadline, cancel))
+    
+    def _should_retry(self, exception: Exception, attempt: int,
+                      network_errors: Tuple[type, ...] = (requests.exceptions.RequestException,)) -> bool:
+        """判断是否应该重试（network_errors 为调用方HTTP库的网络错误类型）"""
         if attempt >= self.max_retries:
             return False
             
         # 网络错误重试
-        if isinstance(exception, requests.exceptions.RequestException):
+        if isinstance(exception, network_errors):
             return True
             
         # 特定状态码重试
@@ -132,113 +960,305 @@ class RobustAPIClient:
             
         return False
     
-    def _log_retry(self, attempt: int, exception: Exception, delay: float):
+    def _log_retry(self, attempt: int, exception: Exception, delay: float, candidate_name: str = ''):
         """记录重试信息"""
         logger.warning(f"API调用失败 (尝试 {attempt}/{self.max_retries}): {str(exception)}")
         if attempt < self.max_retries:
-            logger.info(f"将在 {delay} 秒后重试...")
-            if hasattr(st, 'warning'):
-                st.warning(f"API调用失败，{delay}秒后重试... (尝试 {attempt}/{self.max_retries})")
+            logger.info(f"将在 {delay:.1f} 秒后重试...")
+            if self._listeners:
+                self._emit('retry', candidate_name=candidate_name, attempt=attempt, max_retries=self.max_retries,
+                           delay=delay, error=str(exception))
     
-    def call_api_with_retry(self, prompt: str, model_config: Dict[str, Any], candidate_name: str) -> Dict[str, Any]:
-        """带重试机制的API调用"""
-        headers = self._get_headers()
-        data = self._prepare_request_data(prompt, model_config)
+    def _attempt_blocked(self, model: str, budget: RequestBudget) -> Optional[APIException]:
+        """发送下一次尝试前的检查（同步和异步客户端共用）：预算用尽或模型熔断中时返回原因，否则返回 None"""
+        if budget.expired():
+            return APIException(f"超出请求时间预算（{budget.total}秒）")
+        if not get_circuit_breaker().allow(model):
+            # 模型熔断中，直接进入降级
+            return APIException(f"模型 {model} 熔断中，暂时跳过")
+        return None
+    
+    def _next_retry(self, exception: Exception, attempt: int, budget: RequestBudget, candidate_name: str = '',
+                    network_errors: Tuple[type, ...] = (requests.exceptions.RequestException,)) -> Optional[float]:
+        """重试决策（同步和异步客户端共用）：应当重试且退避后仍有剩余预算时记录重试并返回等待秒数，否则返回 None"""
+        delay = self.retry_delay(exception, attempt)
+        if not self._should_retry(exception, attempt, network_errors) or delay >= budget.remaining():
+            return None
+        self._log_retry(attempt, exception, delay, candidate_name)
+        return delay
+    
+    def _succeeded(self, result: Dict[str, Any], candidate_name: str, model: str, attempt: int, fallback: bool,
+                   start_time: float) -> Dict[str, Any]:
+        """记录成功的分析结果并通知监听器"""
+        result['candidate_name'] = candidate_name
+        result['_response_time'] = time.time() - start_time  # 添加响应时间信息
+        if self._listeners:
+            self._emit('success', candidate_name=candidate_name, model=model, attempt=attempt,
+                       fallback=fallback, latency=result['_response_time'])
+        return result
+    
+    def _fallback_requests(self, prompt: str, model_config: Dict[str, Any], candidate_name: str,
+                           last_exception: Exception, budget: RequestBudget) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """降级顺序（同步和异步客户端共用）：逐个生成 (备用模型, 请求数据)，跳过熔断中的模型，时间预算用尽时停止"""
+        logger.error(f"主要API调用失败，启动降级策略 {candidate_name}: {str(last_exception)}")
         
+        # 当前已是备用模型时不再降级
+        if model_config.get('model', '') in self.fallback_models:
+            return
+        for fallback_model in self.ordered_fallback_models():
+            if budget.expired():
+                logger.warning(f"时间预算已用尽，停止降级: {candidate_name}")
+                return
+            if not get_circuit_breaker().allow(fallback_model):
+                logger.info(f"降级模型 {fallback_model} 熔断中，跳过")
+                continue
+            logger.info(f"尝试降级模型: {fallback_model}")
+            if self._listeners:
+                self._emit('fallback', candidate_name=candidate_name, model=fallback_model, error=str(last_exception))
+            fallback_config = model_config.copy()
+            fallback_config['model'] = fallback_model
+            yield fallback_model, self._prepare_request_data(prompt, fallback_config)
+    
+    def _all_failed(self, candidate_name: str, last_exception: Exception) -> Dict[str, Any]:
+        """所有重试和降级都失败：通知监听器并返回默认评分"""
+        logger.error(f"所有API调用策略都失败，返回默认评分: {candidate_name}")
+        if self._listeners:
+            self._emit('failure', candidate_name=candidate_name, error=str(last_exception))
+        return self._get_default_scores(candidate_name)
+    
+    def _post(self, data: Dict[str, Any], budget: RequestBudget,
+              consume: Optional[Callable[[requests.Response], Any]] = None,
+              read_timeout: Optional[float] = None, cancel: Optional[threading.Event] = None) -> Any:
+        """在时间预算内发送一次请求并通知耗时（超时时间按请求计算，不修改实例状态）
+
+        发送前在进程级限流器中等待令牌、在自适应并发窗口中等待空位，
+        收到响应后按限流响应头调整该模型的速率，按状态码和耗时调整并发窗口，并更新模型熔断器和健康监控。
+        传入 consume 时以流式方式请求，在占用并发名额期间调用 consume(response) 读取响应并返回其结果。
+        预算在请求发出时开始计时：首次发送前的排队不受预算限制，之后的排队等待超过截止时间时不发送；
+        连接和读取超时不超过剩余时间。排队期间 cancel 被设置时不发送；被取消的请求释放名额但不调整并发窗口。
+        """
+        rate_limiter = get_rate_limiter()
+        controller = get_concurrency_controller()
+        if self.rate_limited and not rate_limiter.acquire(data['model'], budget.deadline):
+            raise APIException("超出请求时间预算（限流等待）")
+        if not controller.acquire(data['model'], budget.deadline):
+            raise APIException("超出请求时间预算（并发排队）")
+        if cancel is not None and cancel.is_set():
+            controller.cancel(data['model'])
+            raise RequestCancelled("请求已取消")
+        budget.start()
+        if budget.expired():
+            controller.cancel(data['model'])
+            raise APIException("超出请求时间预算")
+        timeout = budget.timeout(read_timeout)
+        start_time = time.time()
+        status_code = None
+        cancelled = False
+        succeeded = False
+        try:
+            response = self.session.post(
+                self.base_url,
+                headers=self._get_headers(),
+                json=data,
+                timeout=timeout,
+                stream=consume is not None
+            )
+            status_code = response.status_code
+            if self.rate_limited:
+                rate_limiter.observe(data['model'], status_code, response.headers)
+            self._record_circuit(data['model'], status_code)
+            if consume is not None:
+                response = consume(response)
+            if status_code == 200:
+                succeeded = True
+                get_hedge_policy().observe(data['model'], time.time() - start_time)
+            return response
+        except requests.exceptions.RequestException:
+            self._record_circuit(data['model'], None)
+            raise
+        except RequestCancelled:
+            cancelled = True
+            raise
+        finally:
+            latency = time.time() - start_time
+            if cancelled:
+                controller.cancel(data['model'])
+                window = None
+            else:
+                window = controller.release(data['model'], status_code, latency)
+                get_health_monitor().observe(data['model'], succeeded, latency)
+            if self._listeners:
+                self._emit('latency', model=data['model'], status_code=status_code, latency=latency)
+                if window is not None:
+                    self._emit('concurrency', model=data['model'], window=window)
+    
+    def ordered_fallback_models(self) -> List[str]:
+        """按健康监控的预计耗时排列的备用模型（根据近期分析请求和探测结果；没有数据时保持配置顺序）"""
+        return get_health_monitor().rank(self.fallback_models)
+    
+    def hedge_target(self, model: str) -> Optional[str]:
+        """对冲请求使用的模型：按健康排序的第一个熔断器正常的其他备用模型"""
+        circuit_breaker = get_circuit_breaker()
+        for fallback_model in self.ordered_fallback_models():
+            if fallback_model != model and circuit_breaker.state(fallback_model) == 'closed':
+                return fallback_model
+        return None
+    
+    def _hedge_request(self, data: Dict[str, Any], prompt: str, model_config: Dict[str, Any], candidate_name: str,
+                       delay: float) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """主请求超过对冲延迟仍未应答时调用（同步和异步客户端共用）：有可用备用模型且对冲配额允许时
+        返回 (对冲模型, 请求数据)，否则返回 None"""
+        hedge_model = self.hedge_target(data['model'])
+        if hedge_model is None or not get_hedge_policy().try_hedge():
+            return None
+        logger.info(f"主模型 {data['model']} 超过 {delay:.1f} 秒未应答，对冲请求 {hedge_model}")
+        if self._listeners:
+            self._emit('hedge', candidate_name=candidate_name, model=hedge_model, primary=data['model'], delay=delay)
+        hedge_config = model_config.copy()
+        hedge_config['model'] = hedge_model
+        return hedge_model, self._prepare_request_data(prompt, hedge_config)
+    
+    def _hedge_won(self, future, model: str, primary_model: str) -> bool:
+        """对冲中的一个请求（Future 或 asyncio.Task）完成时调用：成功时返回 True，对冲请求胜出时计入统计"""
+        error = future.exception()
+        if error is not None:
+            if model != primary_model:
+                logger.warning(f"对冲请求 {model} 失败: {error}")
+            return False
+        if model != primary_model:
+            get_hedge_policy().record_win()
+        return True
+    
+    def _request_hedged(self, data: Dict[str, Any], prompt: str, model_config: Dict[str, Any],
+                        candidate_name: str, budget: RequestBudget,
+                        on_field: Optional[Callable[[str, Any], None]] = None) -> Tuple[Dict[str, Any], str]:
+        """发送主请求并解析结果；超过对冲延迟仍未应答时向备用模型发送同一请求，返回 (先得到的有效结果, 其模型)
+
+        只有主请求的流式字段回调 on_field，避免两个模型的中间结果交错。
+        """
+        policy = get_hedge_policy()
+        policy.start_request()
+        delay = policy.delay(data['model'])
+        if delay is None:
+            return self._complete(data, budget, on_field), data['model']
+        
+        executor = ThreadPoolExecutor(max_workers=2)
+        # 得到结果后通知落后的请求关闭连接、释放并发名额
+        cancel = threading.Event()
+        try:
+            primary = executor.submit(self._complete, data, budget, on_field, None, cancel)
+            futures = {primary: data['model']}
+            done, _ = wait(futures, timeout=delay)
+            hedge = None if done else self._hedge_request(data, prompt, model_config, candidate_name, delay)
+            if hedge is not None:
+                hedge_model, hedge_data = hedge
+                futures[executor.submit(self._complete, hedge_data, budget, None, None, cancel)] = hedge_model
+            
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if self._hedge_won(future, futures[future], data['model']):
+                        return future.result(), futures[future]
+            raise primary.exception()
+        finally:
+            # 落后的请求在后台线程中收到下一块数据时关闭连接（非流式请求只能等其完成后丢弃结果）
+            cancel.set()
+            executor.shutdown(wait=False)
+    
+    def _record_circuit(self, model: str, status_code: Optional[int]):
+        """按请求结果更新模型熔断器：网络错误、超时、可重试状态码（429/5xx）和模型不可用（404/410）计为失败"""
+        success = (status_code is not None and status_code not in self.retry_status_codes
+                   and status_code not in self.unavailable_status_codes)
+        state = get_circuit_breaker().record(model, success)
+        if state is not None and self._listeners:
+            self._emit('circuit', model=model, state=state)
+    
+    def retry_delay(self, exception: Exception, attempt: int) -> float:
+        """重试前的等待时间（带随机抖动，避免并发请求同时重试）
+
+        使用限流器的端点收到 429 时由限流器在下次发送前等待，不再叠加退避；不限流的端点照常退避。
+        """
+        if self.rate_limited and isinstance(exception, APIException) and exception.status_code == 429:
+            return 0
+        delay = self.retry_delays[min(attempt - 1, len(self.retry_delays) - 1)]
+        return random.uniform(delay / 2, delay)
+    
+    def new_budget(self) -> RequestBudget:
+        """为一份简历创建请求时间预算"""
+        return RequestBudget(self.request_budget, self.connect_timeout, self.timeout)
+    
+    def request_key(self, data: Dict[str, Any]) -> str:
+        """请求合并用的键：接口地址、API密钥和请求内容都相同的请求视为同一请求"""
+        key_data = {
+            'url': self.base_url,
+            'api_key': hashlib.sha256((self.api_key or '').encode('utf-8')).hexdigest(),
+            'data': data
+        }
+        return hashlib.sha256(json.dumps(key_data, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+    
+    def call_api_with_retry(self, prompt: str, model_config: Dict[str, Any], candidate_name: str,
+                            on_field: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """带重试机制的API调用；其他会话或线程正在进行相同请求时等待并共享其结果
+
+        重试、退避、对冲和降级共用一个 request_budget 秒的时间预算，预算用尽时返回默认评分。
+        启用流式响应时，主模型输出的每个字段一完整就调用 on_field(字段名, 值)。
+        """
+        data = self._prepare_request_data(prompt, model_config)
+        result, shared = _single_flight.do(
+            self.request_key(data),
+            lambda: self._call_api_with_retry(data, prompt, model_config, candidate_name, self.new_budget(), on_field)
+        )
+        if shared and self._listeners:
+            self._emit('coalesced', candidate_name=candidate_name, model=data['model'])
+        result['candidate_name'] = candidate_name
+        return result
+    
+    def _call_api_with_retry(self, data: Dict[str, Any], prompt: str, model_config: Dict[str, Any],
+                             candidate_name: str, budget: RequestBudget,
+                             on_field: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
         last_exception = None
         
         for attempt in range(1, self.max_retries + 1):
+            blocked = self._attempt_blocked(data['model'], budget)
+            if blocked is not None:
+                last_exception = last_exception or blocked
+                break
             try:
                 logger.info(f"API调用尝试 {attempt}/{self.max_retries}")
-                
-                # 记录开始时间
                 start_time = time.time()
-                
-                response = self.session.post(
-                    self.base_url,
-                    headers=headers,
-                    json=data,
-                    timeout=self.timeout
-                )
-                
-                # 计算响应时间
-                response_time = time.time() - start_time
-                
-                result = self._handle_response(response)
-                result['candidate_name'] = candidate_name
-                result['_response_time'] = response_time  # 添加响应时间信息
-                
-                # 成功时清除之前的警告
-                if attempt > 1 and hasattr(st, 'success'):
-                    st.success(f"✅ API调用成功 (尝试 {attempt} 次)")
-                
-                return result
+                if self.enable_hedging:
+                    result, model = self._request_hedged(data, prompt, model_config, candidate_name, budget, on_field)
+                else:
+                    result, model = self._complete(data, budget, on_field), data['model']
+                return self._succeeded(result, candidate_name, model, attempt, model != data['model'], start_time)
                 
             except Exception as e:
                 last_exception = e
-                
-                if self._should_retry(e, attempt):
-                    delay = self.retry_delays[min(attempt - 1, len(self.retry_delays) - 1)]
-                    self._log_retry(attempt, e, delay)
-                    time.sleep(delay)
-                else:
+                delay = self._next_retry(e, attempt, budget, candidate_name)
+                if delay is None:
                     break
+                time.sleep(delay)
         
         # 所有重试都失败了，尝试降级策略
-        return self._fallback_strategy(prompt, model_config, candidate_name, last_exception)
+        return self._fallback_strategy(prompt, model_config, candidate_name, last_exception, budget)
     
-    def _fallback_strategy(self, prompt: str, model_config: Dict[str, Any], candidate_name: str, last_exception: Exception) -> Dict[str, Any]:
-        """降级策略：尝试其他模型或返回默认结果"""
-        logger.error(f"主要API调用失败，启动降级策略: {str(last_exception)}")
-        
-        # 如果当前不是免费模型，尝试切换到免费模型
-        current_model = model_config.get('model', '')
-        if current_model not in self.fallback_models:
-            for fallback_model in self.fallback_models:
-                try:
-                    logger.info(f"尝试降级模型: {fallback_model}")
-                    if hasattr(st, 'info'):
-                        st.info(f"🔄 尝试备用模型: {fallback_model}")
-                    
-                    fallback_config = model_config.copy()
-                    fallback_config['model'] = fallback_model
-                    
-                    # 使用更短的超时时间进行快速尝试
-                    original_timeout = self.timeout
-                    self.timeout = 15
-                    
-                    headers = self._get_headers()
-                    data = self._prepare_request_data(prompt, fallback_config)
-                    
-                    response = self.session.post(
-                        self.base_url,
-                        headers=headers,
-                        json=data,
-                        timeout=self.timeout
-                    )
-                    
-                    result = self._handle_response(response)
-                    result['candidate_name'] = candidate_name
-                    
-                    # 恢复原始超时时间
-                    self.timeout = original_timeout
-                    
-                    if hasattr(st, 'success'):
-                        st.success(f"✅ 备用模型调用成功: {fallback_model}")
-                    
-                    return result
-                    
-                except Exception as e:
-                    logger.warning(f"降级模型 {fallback_model} 也失败了: {str(e)}")
-                    self.timeout = original_timeout
-                    continue
+    def _fallback_strategy(self, prompt: str, model_config: Dict[str, Any], candidate_name: str, last_exception: Exception,
+                           budget: RequestBudget) -> Dict[str, Any]:
+        """降级策略：在剩余时间预算内尝试其他模型，否则返回默认结果"""
+        for fallback_model, data in self._fallback_requests(prompt, model_config, candidate_name, last_exception,
+                                                            budget):
+            # 使用更短的读取超时进行快速尝试，仍受剩余时间预算限制
+            start_time = time.time()
+            try:
+                result = self._complete(data, budget, read_timeout=API_CONFIG['fallback_read_timeout'])
+            except Exception as e:
+                logger.warning(f"降级模型 {fallback_model} 也失败了: {str(e)}")
+                continue
+            return self._succeeded(result, candidate_name, fallback_model, 1, True, start_time)
         
         # 所有降级策略都失败，返回默认结果
-        logger.error("所有API调用策略都失败，返回默认评分")
-        if hasattr(st, 'error'):
-            st.error(f"❌ API服务暂时不可用，使用默认评分。错误信息: {str(last_exception)}")
-        
-        return self._get_default_scores(candidate_name)
+        return self._all_failed(candidate_name, last_exception)
     
     def _get_default_scores(self, candidate_name: str) -> Dict[str, Any]:
         """返回默认评分（当所有API调用都失败时）"""
@@ -258,19 +1278,34 @@ class RobustAPIClient:
             'concerns': ['AI分析功能暂时不可用，可能影响评估准确性', '建议增加人工审核环节确保评估质量', '请注意核实简历信息的真实性和完整性'],
             'summary': '由于AI分析服务暂时不可用，无法提供详细的候选人评估报告。建议采用传统的人工审核方式，重点关注教育背景、工作经验、技能匹配度、项目经验等关键维度，并通过面试深入了解候选人的综合素质和发展潜力。',
             'interview_suggestions': 'AI分析服务不可用期间，建议面试官重点关注：1）核心技能的深度验证；2）项目经验的真实性和复杂度；3）学习能力和适应性评估；4）沟通协作能力考察。',
-            'development_potential': '无法通过AI分析评估发展潜力，建议通过面试深入了解候选人的学习意愿、职业规划、技能提升计划等方面，人工判断其成长空间和发展前景。'
+            'development_potential': '无法通过AI分析评估发展潜力，建议通过面试深入了解候选人的学习意愿、职业规划、技能提升计划等方面，人工判断其成长空间和发展前景。',
+            'analysis_status': 'default'  # 标记为默认评分，不应被缓存或复用
         }
     
-    def health_check(self, model: str = "deepseek/deepseek-chat-v3-0324:free") -> Dict[str, Any]:
-        """API健康检查"""
+    def has_credentials(self) -> bool:
+        """是否具备调用端点所需的API密钥（"free_model" 是未配置密钥时的占位值）"""
+        return not self.requires_api_key or bool(self.api_key and self.api_key != "free_model")
+    
+    def health_check(self, model: Optional[str] = None) -> Dict[str, Any]:
+        """API健康检查（默认探测端点的第一个可选模型）
+
+        探测请求与分析请求共用限流器和熔断器：模型熔断中或限流等待超过探测超时时不发送，
+        返回 status 为 skipped 的结果。
+        """
+        model = model or next(iter(self.endpoint['models']))
         try:
             # 检查是否有有效的API密钥
-            if not self.api_key or self.api_key == "free_model":
+            if not self.has_credentials():
                 return {
                     "status": "unhealthy",
                     "error": "需要有效的API密钥才能进行健康检查",
                     "timestamp": time.time()
                 }
+            if not get_circuit_breaker().allow(model):
+                return {"status": "skipped", "error": "模型熔断中，跳过探测", "timestamp": time.time()}
+            rate_limiter = get_rate_limiter()
+            if self.rate_limited and not rate_limiter.acquire(model, time.monotonic() + 10):
+                return {"status": "skipped", "error": "模型限流中，跳过探测", "timestamp": time.time()}
             
             # 发送一个简单的测试请求
             test_data = {
@@ -280,13 +1315,20 @@ class RobustAPIClient:
             }
             
             start_time = time.time()
-            response = self.session.post(
-                self.base_url,
-                headers=self._get_headers(),
-                json=test_data,
-                timeout=10
-            )
+            try:
+                response = self.session.post(
+                    self.base_url,
+                    headers=self._get_headers(),
+                    json=test_data,
+                    timeout=10
+                )
+            except requests.exceptions.RequestException:
+                self._record_circuit(model, None)
+                raise
             response_time = time.time() - start_time
+            if self.rate_limited:
+                rate_limiter.observe(model, response.status_code, response.headers)
+            self._record_circuit(model, response.status_code)
             
             return {
                 "status": "healthy" if response.status_code == 200 else "unhealthy",
@@ -1,18 +1,36 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import PyPDF2
 import requests
 import os
 from dotenv import load_dotenv
 import json
 import io
-from typing import List, Dict, Any
+import itertools
+import zipfile
+from typing import Callable, List, Dict, Any, Iterator, Optional, Tuple
 import time
 from datetime import datetime
-from api_client import RobustAPIClient, APIException
+from api_client import (RobustAPIClient, APIException, get_circuit_breaker, get_concurrency_controller, get_endpoint,
+                        get_hedge_policy, get_rate_limiter)
+from model_health import get_health_monitor
+from async_client import AsyncAnalysisClient, iterate_async
+from pdf_extractor import extract_document, extract_documents, read_pdf_bytes
+from extraction_cache import get_extraction_cache
+from response_cache import ResponseCache, get_response_cache
+from zip_ingest import ZipResumeArchive
+from resume_dedup import get_dedup_index
+from config import (API_CONFIG, CACHE_CONFIG, DEDUP_CONFIG, HEALTH_CONFIG, IDENTITY_CONFIG, PROMPT_CONFIG,
+                    SCORING_DIMENSIONS, SPECULATIVE_CONFIG, WATCH_CONFIG)
+from batch_triage import BatchTriage
+from candidate_identity import extract_identity, get_candidate_index
+from resume_segmenter import ResumeSegments
+from folder_watcher import WatchFolder, get_watch_folder
+from prefetch import SpeculativeBatch
+import hashlib
 # API秘钥检查功能
 def check_api_key_status(api_client: RobustAPIClient):
     """检查API秘钥状态，类似cherrystudio的秘钥检查"""
@@ -22,26 +40,21 @@ def check_api_key_status(api_client: RobustAPIClient):
     api_key = api_client.api_key if hasattr(api_client, 'api_key') else None
     base_url = api_client.base_url if hasattr(api_client, 'base_url') else "https://openrouter.ai/api/v1"
     
+    endpoint = api_client.endpoint
     if not api_key:
         st.error("❌ 未配置API秘钥")
-        st.info("请在环境变量中设置 OPENROUTER_API_KEY")
+        st.info(f"请在环境变量中设置 {endpoint['api_key_env']}")
         return
     
     # 显示秘钥信息（脱敏）
     masked_key = f"{api_key[:8]}...{api_key[-4:]}" if len(api_key) > 12 else "***"
     st.success(f"✅ API秘钥已配置: {masked_key}")
-    st.info(f"🌐 服务端点: {base_url}")
+    st.info(f"🌐 服务端点: {endpoint['name']} ({base_url})")
     
     # 模型选择和测试区域
     with st.expander("🔍 API秘钥测试", expanded=False):
-        # 免费模型列表
-        free_models = {
-            "deepseek/deepseek-chat-v3-0324:free": "🌟 DeepSeek Chat V3",
-            "deepseek/deepseek-r1-0528:free": "🔥 DeepSeek R1 (0528)",
-            "deepseek/deepseek-r1:free": "🚀 DeepSeek R1",
-            "qwen/qwen3-32b:free": "🎯 Qwen3-32B",
-            "google/gemini-2.0-flash-exp:free": "✨ Gemini 2.0 Flash (实验版)"
-        }
+        # 当前端点的可选模型
+        free_models = endpoint['models']
         
         selected_model = st.selectbox(
             "选择用于测试的模型:",
@@ -80,14 +93,54 @@ def check_api_key_status(api_client: RobustAPIClient):
                         else:
                             st.error("🌐 网络连接问题或服务不可用")
 
-
+    # 各模型的限流、并发和熔断状态（进程内所有会话共享）
+    with st.expander("📈 模型调用状态"):
+        rate_limits = get_rate_limiter().snapshot()
+        concurrency = get_concurrency_controller().snapshot()
+        circuits = get_circuit_breaker().snapshot()
+        health = get_health_monitor().snapshot()
+        circuit_labels = {'closed': '🟢 正常', 'open': '🔴 熔断', 'half_open': '🟡 试探中'}
+        open_models = [model for model, circuit in circuits.items() if circuit['state'] == 'open']
+        if open_models:
+            st.warning(f"以下模型熔断中，批量分析时将直接跳过: {', '.join(open_models)}")
+        models = list(dict.fromkeys([*rate_limits, *circuits, *health]))
+        if models:
+            st.dataframe(pd.DataFrame([
+                {
+                    '模型': model,
+                    '可用率': f"{health[model]['availability']:.0%}" if model in health else None,
+                    '应答耗时(秒)': (round(health[model]['latency'], 1)
+                                 if model in health and health[model]['latency'] is not None else None),
+                    '熔断状态': circuit_labels[circuits.get(model, {}).get('state', 'closed')],
+                    '近期失败率': f"{circuits.get(model, {}).get('failure_rate', 0):.0%}",
+                    '剩余冷却(秒)': round(circuits.get(model, {}).get('cooldown_remaining', 0)),
+                    '可用令牌': round(rate_limits.get(model, {}).get('tokens', 0), 1),
+                    '速率(次/分钟)': round(rate_limits.get(model, {}).get('rate_per_minute', 0), 1),
+                    '需等待(秒)': round(rate_limits.get(model, {}).get('wait_seconds', 0), 1),
+                    '并发窗口': round(concurrency.get(model, {}).get('window', 0), 1),
+                    '进行中': concurrency.get(model, {}).get('inflight', 0),
+                    '平均耗时(秒)': round(concurrency.get(model, {}).get('latency', 0), 1)
+                }
+                for model in models
+            ]), hide_index=True)
+            fallback_order = api_client.ordered_fallback_models()
+            st.caption(f"降级时的备用模型顺序: {' → '.join(fallback_order)}")
+            hedging = get_hedge_policy().snapshot()
+            if hedging['hedges']:
+                st.caption(f"⚡ 对冲请求: {hedging['hedges']} 次 / 主请求 {hedging['requests']} 次"
+                           f"（{hedging['hedge_rate']:.0%}），备用模型先返回 {hedging['wins']} 次")
+        else:
+            st.caption("尚未发送请求")
+        if get_health_monitor().watching() and st.button("🔄 立即探测所有模型", key="probe_models"):
+            get_health_monitor().probe_now()
+            st.info("已触发后台探测，稍后刷新查看结果")
     
     # 显示配置信息
     with st.expander("🔧 配置详情"):
         st.code(f"""
-API端点: {base_url}
+API端点: {endpoint['name']} ({base_url})
 API秘钥: {masked_key}
-配置来源: 环境变量 OPENROUTER_API_KEY
+配置来源: 环境变量 {endpoint['api_key_env']}
 """)
         
         st.markdown("""
@@ -227,6 +280,31 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# 提示词模板变化时递增，使已缓存的AI分析结果失效
+PROMPT_VERSION = 1
+
+def show_api_event(event: str, data: Dict[str, Any]):
+    """在界面上提示API客户端的重试/降级/失败事件（只在Streamlit脚本线程中显示，后台线程的事件忽略）"""
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return
+    if event == 'retry':
+        st.warning(f"API调用失败，{data['delay']:.1f}秒后重试... (尝试 {data['attempt']}/{data['max_retries']})")
+    elif event == 'fallback':
+        st.info(f"🔄 尝试备用模型: {data['model']}")
+    elif event == 'hedge':
+        st.info(f"⚡ 主模型应答较慢，同时请求备用模型: {data['model']}")
+    elif event == 'success' and data['fallback']:
+        st.success(f"✅ 备用模型调用成功: {data['model']}")
+    elif event == 'success' and data['attempt'] > 1:
+        st.success(f"✅ API调用成功 (尝试 {data['attempt']} 次)")
+    elif event == 'failure':
+        st.error(f"❌ API服务暂时不可用，使用默认评分。错误信息: {data['error']}")
+
+def _toggle_probing():
+    """关闭“后台探测模型健康”时停止探测（只在用户改变选项时调用，不影响其他会话开启的探测）"""
+    if not st.session_state.probe_models_enabled:
+        get_health_monitor().stop()
+
 class ResumeAnalyzer:
     def __init__(self, api_key=None):
         self.api_client = self._setup_api_client(api_key)
@@ -242,7 +320,7 @@ class ResumeAnalyzer:
         elif hasattr(st.session_state, 'api_key') and st.session_state.api_key:
             final_api_key = st.session_state.api_key
         else:
-            env_api_key = os.getenv('OPENROUTER_API_KEY')
+            env_api_key = os.getenv(get_endpoint()['api_key_env'])
             if env_api_key:
                 final_api_key = env_api_key
             else:
@@ -250,41 +328,75 @@ class ResumeAnalyzer:
                 final_api_key = "free_model"
         
         # 创建稳定的API客户端，包含重试机制和降级策略
-        return RobustAPIClient(
+        api_client = RobustAPIClient(
             api_key=final_api_key,
             max_retries=3,  # 最大重试次数
-            timeout=30      # 请求超时时间
+            timeout=30      # 单次读取超时时间（整体时间预算见 API_CONFIG）
         )
+        api_client.add_listener(show_api_event)
+        # 会话按密钥在进程内共用，重新运行脚本不会丢弃已建立的连接；首次使用该密钥时后台预连接
+        if API_CONFIG['preconnect']:
+            api_client.preconnect()
+            # 批量分析使用异步客户端的 aiohttp 会话，同样预先连接
+            AsyncAnalysisClient(api_client).preconnect()
+        return api_client
     
     def extract_text_from_pdf(self, pdf_file) -> str:
         """从PDF文件中提取文本"""
-        try:
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text.strip()
-        except Exception as e:
-            st.error(f"PDF解析失败: {str(e)}")
-            return ""
+        result = extract_document(read_pdf_bytes(pdf_file), get_extraction_cache())
+        self._report_extraction_result(getattr(pdf_file, 'name', 'PDF'), result)
+        return result['text']
     
-    def analyze_resume_with_ai(self, resume_text: str, candidate_name: str) -> Dict[str, Any]:
-        """使用稳定的API客户端分析简历"""
-        if not self.api_client:
-            return self._get_default_scores(candidate_name)
-        
-        # API调用开始
-        
-        # 获取模型配置
+    def _report_extraction_result(self, file_name: str, result: Dict[str, Any]):
+        """提示解析失败或被截断的文件（超时/超内存的文件已被跳过，不影响批次中其他文件）"""
+        if result['status'] in ('timeout', 'memory_exceeded'):
+            st.warning(f"⏱️ 已跳过 {file_name}: {result['error']}")
+        elif result['error']:
+            st.error(f"PDF解析失败 ({file_name}): {result['error']}")
+        elif result['truncated']:
+            st.caption(f"✂️ {file_name}: 共 {result['page_count']} 页，已解析 {result['pages_parsed']} 页，"
+                       f"跳过 {result['pages_skipped']} 页（超出长度预算）")
+    
+    def extract_texts_from_pdfs(self, pdf_files, archives=()) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """批量提取PDF文本（缓存命中直接返回，其余走进程池），按完成顺序返回 (文件名, 提取结果)
+
+        archives 为 ZipResumeArchive 列表，其成员逐个流式读取，内存占用与压缩包大小无关。
+        """
+        file_names = {}
+        
+        def _iter_sources():
+            sources = ((pdf_file.name, read_pdf_bytes(pdf_file)) for pdf_file in pdf_files)
+            for archive in archives:
+                sources = itertools.chain(sources, archive.iter_members())
+            for index, (file_name, pdf_bytes) in enumerate(sources):
+                file_names[index] = file_name
+                yield index, pdf_bytes
+        
+        for index, result in extract_documents(_iter_sources(), cache=get_extraction_cache()):
+            file_name = file_names.pop(index)
+            self._report_extraction_result(file_name, result)
+            yield file_name, result
+    
+    def get_analysis_context(self) -> str:
+        """当前分析上下文（岗位配置+模型配置）的指纹，只有上下文相同的分析结果才能复用"""
+        context = {
+            'job_config': st.session_state.get('job_config', {}),
+            'model_config': st.session_state.get('model_config', {})
+        }
+        return hashlib.sha256(json.dumps(context, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+    
+    def get_current_configs(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """当前会话的 (模型配置, 岗位配置)"""
         model_config = st.session_state.get('model_config', {
-            'model': 'deepseek/deepseek-chat-v3-0324:free',
+            'model': next(iter(get_endpoint()['models'])),
             'temperature': 0.3,
             'max_tokens': 2000
         })
-        
-        # 获取岗位配置
         job_config = st.session_state.get('job_config', {})
-        
+        return model_config, job_config
+    
+    def build_prompt(self, resume_text: str, job_config: Dict[str, Any]) -> str:
+        """构建简历分析提示词"""
         # 构建岗位要求部分
         job_context = ""
         if job_config.get('job_title') or job_config.get('job_requirements'):
@@ -370,17 +482,153 @@ class ResumeAnalyzer:
         
         注意：请确保分析客观、专业、有建设性，避免主观偏见，重点关注与岗位要求的匹配度。
         """
+        return prompt
+    
+    def analyze_resume_with_ai(self, resume_text: str, candidate_name: str,
+                               segments: Optional[ResumeSegments] = None,
+                               configs: Optional[Tuple[Dict[str, Any], Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """使用稳定的API客户端分析简历
+
+        传入分段信息时，超长简历只向提示词提供各评分维度相关段落的重点内容。
+        configs 为预先取得的 (模型配置, 岗位配置)，供后台线程使用；未传入时读取当前会话的配置。
+        """
+        if not self.api_client:
+            return self._get_default_scores(candidate_name)
+        
+        if segments is not None:
+            resume_text = segments.compose(PROMPT_CONFIG['max_resume_tokens'])
+        
+        # API调用开始
+        
+        # 获取模型配置和岗位配置
+        model_config, job_config = configs or self.get_current_configs()
+        
+        # 相同模型、岗位和简历内容的分析结果直接复用
+        response_cache = get_response_cache() if CACHE_CONFIG['enable_cache'] else None
+        cache_key = ResponseCache.key_for(model_config, job_config, resume_text, PROMPT_VERSION)
+        cached = response_cache.get(cache_key) if response_cache else None
+        if cached is not None:
+            cached['candidate_name'] = candidate_name
+            return cached
+        
+        prompt = self.build_prompt(resume_text, job_config)
         
         # 使用稳定的API客户端进行调用，包含重试机制和降级策略
         try:
             result = self.api_client.call_api_with_retry(prompt, model_config, candidate_name)
             # API调用成功
             response_time = result.pop('_response_time', 1.0)
+            if response_cache:
+                response_cache.put(cache_key, result)
             return result
         except Exception as e:
             # API调用失败，使用默认评分
             return self._get_default_scores(candidate_name)
     
+    def analyze_extraction(self, file_name: str, extraction: Dict[str, Any],
+                           configs: Optional[Tuple[Dict[str, Any], Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """分析一份已提取文本的简历（按分段信息组装提示词），附带文本统计"""
+        segments = ResumeSegments(extraction['text'], extraction['segments'])
+        result = self.analyze_resume_with_ai(extraction['text'], file_name.replace('.pdf', ''), segments, configs)
+        result['text_stats'] = extraction['text_stats']
+        return result
+    
+    def analyze_many(self, items: List[Tuple[Any, str, Dict[str, Any]]],
+                     configs: Optional[Tuple[Dict[str, Any], Dict[str, Any]]] = None,
+                     on_field: Optional[Callable[[Any, str, Any], None]] = None) -> Iterator[Tuple[Any, Dict[str, Any]]]:
+        """并发分析多份已提取文本的简历，items 为 (key, 文件名, 提取结果)，按完成顺序返回 (key, 分析结果)
+
+        流式响应的中间结果通过 on_field(key, 字段名, 值) 通知，用于在分析完成前显示已生成的评分。
+        """
+        model_config, job_config = configs or self.get_current_configs()
+        response_cache = get_response_cache() if CACHE_CONFIG['enable_cache'] else None
+        requests_data = []
+        stats = {}
+        cache_keys = {}
+        for key, file_name, extraction in items:
+            candidate_name = file_name.replace('.pdf', '')
+            resume_text = ResumeSegments(extraction['text'], extraction['segments']).compose(PROMPT_CONFIG['max_resume_tokens'])
+            stats[key] = extraction['text_stats']
+            cache_keys[key] = ResponseCache.key_for(model_config, job_config, resume_text, PROMPT_VERSION)
+            # 缓存命中的结果直接返回，只有未命中的简历发送请求
+            cached = response_cache.get(cache_keys[key]) if response_cache else None
+            if cached is not None:
+                cached.update(candidate_name=candidate_name, text_stats=stats[key])
+                yield key, cached
+                continue
+            requests_data.append((key, self.build_prompt(resume_text, job_config), candidate_name))
+        
+        if not requests_data:
+            return
+        async_client = AsyncAnalysisClient(self.api_client)
+        for key, result in iterate_async(async_client.analyze_many(requests_data, model_config, on_field)):
+            result.pop('_response_time', None)
+            if response_cache:
+                response_cache.put(cache_keys[key], result)
+            result['text_stats'] = stats[key]
+            yield key, result
+    
+    def prepare_speculative_batch(self, uploaded_files, analyze: bool) -> SpeculativeBatch:
+        """获取当前上传文件的后台预处理批次；上传文件或分析上下文变化时丢弃旧批次并重新开始"""
+        context = self.get_analysis_context()
+        fingerprint = [(f.name, f.size, getattr(f, 'file_id', '')) for f in uploaded_files]
+        key = hashlib.sha256(json.dumps([fingerprint, context, analyze]).encode('utf-8')).hexdigest()
+        batch = st.session_state.get('speculative_batch')
+        if batch is not None and batch.key == key:
+            return batch
+        if batch is not None:
+            batch.cancel()
+        
+        def _sources():
+            # 后台线程使用独立的字节流，不与前台共享上传文件的读取位置
+            for f in uploaded_files:
+                if not f.name.lower().endswith('.zip'):
+                    yield f.name, f.getvalue()
+                    continue
+                try:
+                    archive = ZipResumeArchive(io.BytesIO(f.getvalue()))
+                except zipfile.BadZipFile:
+                    continue
+                yield from archive.iter_members()
+                archive.close()
+        
+        # 后台线程无法访问会话状态，预先取得配置和索引
+        configs = self.get_current_configs() if analyze else None
+        dedup_index = get_dedup_index() if analyze and DEDUP_CONFIG['enable_dedup'] else None
+        candidate_index = (get_candidate_index()
+                           if analyze and IDENTITY_CONFIG['enable_identity_check'] else None)
+        
+        def _analyze(file_name, extraction):
+            # 已有可复用结果（同一候选人或近似重复）的简历不预先调用API
+            if candidate_index is not None:
+                previous = candidate_index.lookup(extract_identity(extraction['text']), context)
+                if previous and (previous['sha256'] == extraction['sha256']
+                                 or not IDENTITY_CONFIG['reanalyze_new_versions']):
+                    return None
+            if dedup_index is not None and dedup_index.query(dedup_index.signature(extraction['text']), context):
+                return None
+            return self.analyze_extraction(file_name, extraction, configs)
+        
+        batch = SpeculativeBatch(key, _sources(), _analyze if analyze else None).start()
+        st.session_state.speculative_batch = batch
+        return batch
+    
+    def poll_watch_folder(self, watcher: WatchFolder) -> Optional[Dict[str, int]]:
+        """轮询一次监控文件夹，只分析新增或内容变化的简历"""
+        status_text = st.empty()
+        
+        def _on_progress(file_name):
+            status_text.text(f"📂 正在处理监控文件夹中的: {file_name}")
+        
+        def _analyze(file_name, extraction):
+            result = self.analyze_extraction(file_name, extraction)
+            result['source'] = 'watch_folder'
+            return result
+        
+        stats = watcher.poll(self.get_analysis_context(), _analyze, on_progress=_on_progress)
+        status_text.empty()
+        return stats
+    
     def _get_default_scores(self, candidate_name: str) -> Dict[str, Any]:
         """返回默认评分（当AI不可用时）"""
         return {
@@ -399,7 +647,8 @@ class ResumeAnalyzer:
             'concerns': ['AI分析功能暂时不可用，可能影响评估准确性', '建议增加人工审核环节确保评估质量', '请注意核实简历信息的真实性和完整性'],
             'summary': '由于AI分析服务暂时不可用，无法提供详细的候选人评估报告。建议采用传统的人工审核方式，重点关注教育背景、工作经验、技能匹配度、项目经验等关键维度，并通过面试深入了解候选人的综合素质和发展潜力。',
             'interview_suggestions': 'AI分析服务不可用期间，建议面试官重点关注：1）核心技能的深度验证；2）项目经验的真实性和复杂度；3）学习能力和适应性评估；4）沟通协作能力考察。',
-            'development_potential': '无法通过AI分析评估发展潜力，建议通过面试深入了解候选人的学习意愿、职业规划、技能提升计划等方面，人工判断其成长空间和发展前景。'
+            'development_potential': '无法通过AI分析评估发展潜力，建议通过面试深入了解候选人的学习意愿、职业规划、技能提升计划等方面，人工判断其成长空间和发展前景。',
+            'analysis_status': 'default'  # 标记为默认评分，不应被缓存或复用
         }
     
     def export_candidate_to_pdf(self, candidate_data: Dict[str, Any], interview_questions: List[tuple]) -> bytes:
@@ -476,7 +725,7 @@ def main():
         st.metric("📅 当前时间", datetime.now().strftime("%H:%M:%S"))
     with col2:
         # 动态显示当前选择的模型
-        current_model = st.session_state.get('model_config', {}).get('model', 'deepseek/deepseek-chat-v3-0324:free')
+        current_model = st.session_state.get('model_config', {}).get('model', next(iter(get_endpoint()['models'])))
         model_display_names = {
             "deepseek/deepseek-r1-0528:free": "DeepSeek-R1",
             "deepseek/deepseek-chat-v3-0324:free": "DeepSeek-Chat-V3",
@@ -599,12 +848,14 @@ def main():
         # API配置区域（收起）
         with st.expander("🔑 API配置", expanded=False):
             # API Key输入（带缓存功能）
+            endpoint = get_endpoint()
             api_key = st.text_input(
-                "OpenRouter API Key",
+                f"{endpoint['name']} API Key",
                 value=st.session_state.api_key_cache,
                 type="password",
-                placeholder="输入您的OpenRouter API Key (必需)",
+                placeholder=f"输入您的{endpoint['name']} API Key" + (" (必需)" if endpoint['auth'] != 'none' else " (可选)"),
                 help="OpenRouter所有模型（包括免费模型）都需要配置API Key。获取API Key: https://openrouter.ai/keys"
+                if endpoint['auth'] != 'none' else f"当前端点 {endpoint['api_base']} 不需要API Key"
             )
             
             # 保存API Key到缓存和session state
@@ -623,7 +874,8 @@ def main():
                 st.info("💡 使用缓存的API Key")
             else:
                 st.session_state.api_key = None
-                st.warning("⚠️ 请配置OpenRouter API Key以使用AI模型")
+                if endpoint['auth'] != 'none':
+                    st.warning(f"⚠️ 请配置{endpoint['name']} API Key以使用AI模型")
         
         # API状态监控
         # API秘钥检查功能
@@ -632,25 +884,9 @@ def main():
         
         # 模型配置区域（收起）
         with st.expander("🤖 AI模型配置", expanded=False):
-            # OpenRouter免费模型列表
-            free_models = {
-                "deepseek/deepseek-chat-v3-0324:free": "🌟 DeepSeek Chat V3",
-                "deepseek/deepseek-r1-0528:free": "🔥 DeepSeek R1 (0528)",
-                "deepseek/deepseek-r1:free": "🚀 DeepSeek R1",
-                "deepseek/deepseek-r1-0528-qwen3-8b:free": "💫 DeepSeek R1 Qwen3-8B",
-                "qwen/qwen3-32b:free": "🎯 Qwen3-32B",
-                "qwen/qwen3-235b-a22b:free": "⭐ Qwen3-235B-A22B",
-                "qwen/qwen3-30b-a3b:free": "💎 Qwen3-30B-A3B",
-                "qwen/qwen3-8b:free": "🔷 Qwen3-8B",
-                "google/gemini-2.0-flash-exp:free": "✨ Gemini 2.0 Flash (实验版)"
-            }
-            
-            paid_models = {
-                "anthropic/claude-3-5-sonnet": "🧠 Claude-3.5-Sonnet (付费)",
-                "openai/gpt-4o": "🤖 GPT-4o (付费)",
-                "openai/gpt-3.5-turbo": "⚡ GPT-3.5-Turbo (付费)",
-                "google/gemini-pro": "✨ Gemini-Pro (付费)"
-            }
+            # 当前端点的可选模型，paid_models 只在配置了API Key时显示
+            free_models = endpoint['models']
+            paid_models = endpoint['paid_models']
             
             # 根据是否有API Key显示不同的模型选项
             if st.session_state.api_key:
@@ -658,7 +894,8 @@ def main():
                 model_help = "已配置API Key，可使用所有模型。免费模型无额外费用，付费模型按使用量计费。"
             else:
                 all_models = free_models
-                model_help = "⚠️ 需要配置API Key才能使用模型。OpenRouter所有模型都需要API Key认证。"
+                model_help = ("⚠️ 需要配置API Key才能使用模型。OpenRouter所有模型都需要API Key认证。"
+                              if endpoint['auth'] != 'none' else f"{endpoint['name']}的可用模型")
             
             selected_model = st.selectbox(
                 "选择AI模型",
@@ -701,6 +938,28 @@ def main():
                 'temperature': temperature,
                 'max_tokens': max_tokens
             })
+            
+            analyzer.api_client.enable_hedging = st.checkbox(
+                "⚡ 对冲慢请求",
+                value=API_CONFIG['enable_hedging'],
+                help=f"主模型应答明显慢于平时时，同时请求一个备用模型并采用先返回的结果"
+                     f"（额外请求不超过总请求的{API_CONFIG['hedge_max_rate']:.0%}）"
+            )
+        
+        # 降级顺序按近期分析请求的可用率和耗时排列；可选后台定期探测，没有分析请求的模型也有数据
+        probe_models = st.checkbox(
+            "🩺 后台探测模型健康",
+            value=HEALTH_CONFIG['enable_monitor'],
+            key="probe_models_enabled",
+            on_change=_toggle_probing,
+            help=f"每{HEALTH_CONFIG['probe_interval'] // 60}分钟用最小请求探测所选模型和备用模型，"
+                 f"降级时优先尝试最可能快速应答的模型（探测会消耗请求额度）"
+        )
+        if probe_models:
+            get_health_monitor().watch(
+                analyzer.api_client,
+                [st.session_state.model_config['model']] + analyzer.api_client.fallback_models
+            )
         
         # 添加缓存管理
         with st.expander("🗑️ 缓存管理", expanded=False):
@@ -747,6 +1006,34 @@ def main():
                 st.info(f"👥 招聘需求: 已缓存 ({len(cached_items)}/5 项)")
             else:
                 st.info("👥 招聘需求: 未缓存")
+            
+            extraction_stats = get_extraction_cache().stats()
+            st.info(
+                f"📄 简历文本: {extraction_stats['entries']} 份 "
+                f"({extraction_stats['size_bytes'] / 1024 / 1024:.1f}MB)，"
+                f"命中 {extraction_stats['hits']} / 未命中 {extraction_stats['misses']}"
+            )
+            if st.button("🗑️ 清除简历文本缓存", help="清除已解析的简历文本，下次上传时重新解析PDF"):
+                get_extraction_cache().clear()
+                st.success("✅ 简历文本缓存已清除")
+                st.rerun()
+            
+            response_stats = get_response_cache().stats()
+            st.info(
+                f"🤖 AI分析结果: {response_stats['disk_entries']} 条，"
+                f"命中率 {response_stats['hit_rate']:.0%}（命中 {response_stats['hits']} / 未命中 {response_stats['misses']}）"
+            )
+            if st.button("🗑️ 清除AI分析结果缓存", help="清除后，相同简历和岗位将重新调用AI分析"):
+                get_response_cache().clear()
+                st.success("✅ AI分析结果缓存已清除")
+                st.rerun()
+            
+            st.info(f"🔁 重复简历索引: {len(get_dedup_index())} 份简历，{len(get_candidate_index())} 位候选人")
+            if st.button("🗑️ 清除重复简历索引", help="清除后，与历史简历相似或同一候选人的新简历将重新调用AI分析"):
+                get_dedup_index().clear()
+                get_candidate_index().clear()
+                st.success("✅ 重复简历索引已清除")
+                st.rerun()
         
         st.markdown("---")
         
@@ -801,46 +1088,208 @@ def main():
     with tab1:
         st.header("上传简历文件")
         
+        # 监控文件夹：轮询ATS导出目录，分析结果持久化并自动并入评分结果
+        watcher = None
+        with st.expander("📂 监控文件夹", expanded=bool(st.session_state.get('watch_folder', WATCH_CONFIG['folder']))):
+            watch_folder = st.text_input(
+                "监控文件夹路径",
+                value=st.session_state.get('watch_folder', WATCH_CONFIG['folder']),
+                help="ATS导出简历的目录。每次轮询只解析和分析新增或内容变化的PDF，未变化的文件不产生任何开销"
+            ).strip()
+            st.session_state.watch_folder = watch_folder
+            
+            if watch_folder and not os.path.isdir(watch_folder):
+                st.error(f"❌ 文件夹不存在: {watch_folder}")
+            elif watch_folder:
+                watcher = get_watch_folder(watch_folder)
+                
+                col1, col2 = st.columns(2)
+                with col1:
+                    auto_poll = st.checkbox(f"自动轮询（每{WATCH_CONFIG['poll_interval']}秒）", key='watch_auto_poll')
+                with col2:
+                    poll_now = st.button("🔄 立即扫描")
+                
+                if poll_now:
+                    stats = analyzer.poll_watch_folder(watcher)
+                    if stats is None:
+                        st.info("其他会话正在扫描该文件夹，请稍后")
+                    else:
+                        st.success(f"✅ 扫描完成：新分析 {stats['analyzed']} 份，"
+                                   f"需人工处理 {stats['manual_review']} 份，内容未变化 {stats['unchanged']} 份")
+                
+                if auto_poll and hasattr(st, 'fragment'):
+                    @st.fragment(run_every=WATCH_CONFIG['poll_interval'])
+                    def _auto_poll_watch_folder():
+                        stats = analyzer.poll_watch_folder(watcher)
+                        if stats and (stats['analyzed'] or stats['manual_review']):
+                            # 有新结果时刷新整个页面，评分结果和对比分析随之更新
+                            st.rerun()
+                        if watcher.last_poll:
+                            st.caption(f"上次轮询: {datetime.fromtimestamp(watcher.last_poll).strftime('%H:%M:%S')}")
+                    
+                    _auto_poll_watch_folder()
+                elif auto_poll:
+                    st.info("当前Streamlit版本不支持自动轮询（需要1.37及以上），请使用“立即扫描”")
+                
+                manual_files = watcher.manual_review_files()
+                st.caption(f"已跟踪 {len(watcher)} 份PDF"
+                           + (f"，其中 {len(manual_files)} 份需要OCR/人工处理" if manual_files else ""))
+                if st.button("🗑️ 重置监控状态", help="清除后，下次轮询将重新分析文件夹中的全部简历"):
+                    watcher.clear()
+                    st.rerun()
+        
+        if watcher:
+            # 持久化的监控结果替换会话中上一次并入的监控结果
+            watched_results = watcher.results(analyzer.get_analysis_context())
+            uploaded_results = [r for r in st.session_state.get('analysis_results', []) if r.get('source') != 'watch_folder']
+            st.session_state.analysis_results = uploaded_results + watched_results
+        
         uploaded_files = st.file_uploader(
-            "选择PDF简历文件",
-            type=['pdf'],
+            "选择PDF简历文件或ZIP压缩包",
+            type=['pdf', 'zip'],
             accept_multiple_files=True,
-            help="支持同时上传多个PDF格式的简历文件"
+            help="支持同时上传多个PDF格式的简历文件，或包含大量PDF简历的ZIP压缩包"
         )
         
         if uploaded_files:
             st.success(f"已上传 {len(uploaded_files)} 个文件")
             
+            pdf_files = [f for f in uploaded_files if not f.name.lower().endswith('.zip')]
+            archives = []
+            for f in uploaded_files:
+                if f.name.lower().endswith('.zip'):
+                    try:
+                        archives.append(ZipResumeArchive(f))
+                    except zipfile.BadZipFile:
+                        st.error(f"❌ 无法读取压缩包: {f.name}")
+            total_files = len(pdf_files) + sum(len(archive) for archive in archives)
+            
             # 显示上传的文件列表
-            for i, file in enumerate(uploaded_files):
+            for i, file in enumerate(pdf_files):
                 st.write(f"{i+1}. {file.name}")
+            for archive in archives:
+                st.write(f"📦 {archive.name}: {len(archive)} 份PDF简历")
+            
+            # 预处理（可选）：上传后立即在后台提取文本，并可按当前岗位配置预先调用AI分析
+            speculative = None
+            prefetch = st.checkbox(
+                "⚡ 上传后立即预处理",
+                value=SPECULATIVE_CONFIG['enable_prefetch'],
+                help="不等点击“开始分析”，上传后立即在后台解析简历文本，点击后直接复用已完成的部分"
+            )
+            if prefetch:
+                prefetch_analysis = st.checkbox(
+                    "🤖 同时预先进行AI分析",
+                    value=SPECULATIVE_CONFIG['prefetch_analysis'],
+                    help="按当前岗位和模型配置在后台预先调用AI分析（会消耗API额度）；上传文件或配置变化时预分析结果作废"
+                )
+                speculative = analyzer.prepare_speculative_batch(uploaded_files, prefetch_analysis)
+                st.caption(f"⚡ 预处理{'已完成' if speculative.done else '中'}：已解析 {speculative.extracted}/{total_files} 份"
+                           + (f"，已预分析 {speculative.analyzed} 份" if prefetch_analysis else ""))
+            elif st.session_state.get('speculative_batch') is not None:
+                st.session_state.speculative_batch.cancel()
+                st.session_state.speculative_batch = None
             
             if st.button("🚀 开始分析", type="primary"):
                 # 存储分析结果
                 if 'analysis_results' not in st.session_state:
                     st.session_state.analysis_results = []
                 
-                st.session_state.analysis_results.clear()
+                # 保留监控文件夹的结果，只替换上一批上传简历的结果
+                st.session_state.analysis_results = [
+                    r for r in st.session_state.analysis_results if r.get('source') == 'watch_folder'
+                ]
+                # 图片型/空白PDF单独归类，不调用AI分析
+                st.session_state.manual_review_files = []
+                # 重复简历分组（同一候选人或近似重复）：原简历名 -> [(重复简历名, 原因)]
+                st.session_state.duplicate_groups = {}
+                dedup_index = get_dedup_index() if DEDUP_CONFIG['enable_dedup'] else None
+                candidate_index = get_candidate_index() if IDENTITY_CONFIG['enable_identity_check'] else None
+                triage = BatchTriage(analyzer.get_analysis_context(), dedup_index, candidate_index,
+                                     st.session_state.analysis_results, st.session_state.duplicate_groups)
                 
                 progress_bar = st.progress(0)
                 status_text = st.empty()
                 
-                for i, file in enumerate(uploaded_files):
-                    status_text.text(f"正在分析: {file.name}")
+                status_text.text("正在并行解析PDF...")
+                if speculative:
+                    # 后台已解析的文件直接命中提取缓存，剩余文件由前台处理
+                    speculative.hand_over()
+                
+                # 进程池并行提取PDF文本（压缩包成员逐个流式读取），按完成顺序逐个分拣
+                for i, (file_name, extraction) in enumerate(analyzer.extract_texts_from_pdfs(pdf_files, archives)):
+                    status_text.text(f"正在解析: {file_name} ({i + 1}/{total_files})")
                     
-                    # 提取PDF文本
-                    resume_text = analyzer.extract_text_from_pdf(file)
+                    if not extraction['error'] and extraction['content_kind'] != 'text':
+                        st.session_state.manual_review_files.append({
+                            'file_name': file_name,
+                            'content_kind': extraction['content_kind'],
+                            'page_count': extraction['page_count'],
+                            'image_count': extraction['image_count']
+                        })
+                    elif extraction['text']:
+                        job = triage.triage(file_name, extraction)
+                        if job is not None:
+                            # 优先复用后台预分析的结果，其余等解析完成后并发分析
+                            result = speculative.take_analysis(extraction['sha256']) if speculative else None
+                            if result is not None:
+                                triage.record(job, result)
+                            else:
+                                triage.queue(job)
                     
-                    if resume_text:
-                        # AI分析
-                        candidate_name = file.name.replace('.pdf', '')
-                        result = analyzer.analyze_resume_with_ai(resume_text, candidate_name)
-                        st.session_state.analysis_results.append(result)
+                    progress_bar.progress(min((i + 1) / max(total_files, 1), 1.0))
+                
+                pending_analyses = triage.pending
+                if pending_analyses:
+                    # 并发调用API（受并发上限约束），按完成顺序记录结果
+                    progress_bar.progress(0)
+                    status_text.text(f"正在并发分析 {len(pending_analyses)} 份简历...")
+                    jobs = [(key, job[0], job[1]) for key, job in pending_analyses.items()]
+                    # 流式分析时，各维度评分一生成就显示，不必等待整份分析完成
+                    score_labels = {f"{dim}_score": info['name'] for dim, info in SCORING_DIMENSIONS.items()}
+                    live_scores = {}
+                    live_table = st.empty()
+                    
+                    def _show_score(key, field, value):
+                        if field in score_labels:
+                            live_scores.setdefault(pending_analyses[key][0], {})[score_labels[field]] = value
+                            live_table.dataframe(pd.DataFrame.from_dict(live_scores, orient='index'))
                     
-                    progress_bar.progress((i + 1) / len(uploaded_files))
+                    for done, (key, result) in enumerate(analyzer.analyze_many(jobs, on_field=_show_score), 1):
+                        status_text.text(f"已完成分析: {pending_analyses[key][0]} ({done}/{len(jobs)})")
+                        triage.record(pending_analyses[key], result)
+                        progress_bar.progress(done / len(jobs))
+                    live_table.empty()
                 
+                progress_bar.progress(1.0)
+                if dedup_index is not None:
+                    dedup_index.save()
+                if candidate_index is not None:
+                    candidate_index.save()
+                for archive in archives:
+                    for member_name, reason in archive.skipped:
+                        st.warning(f"⚠️ 已跳过 {archive.name}/{member_name}: {reason}")
                 status_text.text("✅ 分析完成！")
                 st.success("所有简历分析完成，请查看评分结果和对比分析。")
+            
+            # 需要OCR或人工处理的简历
+            manual_review_files = st.session_state.get('manual_review_files', [])
+            if manual_review_files:
+                with st.expander(f"🖼️ 需要OCR/人工处理 ({len(manual_review_files)}份)", expanded=True):
+                    st.caption("以下文件几乎没有可提取的文字（扫描件或空白PDF），已跳过AI分析")
+                    for item in manual_review_files:
+                        reason = "图片型PDF，需要OCR" if item['content_kind'] == 'image_only' else "未提取到文本"
+                        st.write(f"- {item['file_name']}: {reason}（{item['page_count']} 页，{item['image_count']} 张图片）")
+            
+            # 重复简历分组
+            duplicate_groups = st.session_state.get('duplicate_groups', {})
+            if duplicate_groups:
+                duplicate_count = sum(len(items) for items in duplicate_groups.values())
+                with st.expander(f"🔁 重复简历 ({len(duplicate_groups)}组，{duplicate_count}份已复用分析结果)", expanded=False):
+                    for original_name, items in duplicate_groups.items():
+                        st.write(f"**{original_name}**")
+                        for duplicate_name, reason in items:
+                            st.write(f"- {duplicate_name}（{reason}）")
     
     with tab2:
         st.header("📊 详细评分结果")
@@ -1010,6 +1459,12 @@ def main():
                         score_badges += f'<span class="score-badge {class_name}">{name}: {numeric_score:.1f}</span>'
                     
                     st.markdown(score_badges, unsafe_allow_html=True)
+                    if result.get('text_stats'):
+                        text_stats = result['text_stats']
+                        st.caption(
+                            f"📉 简历文本规范化: {text_stats['raw_chars']} → {text_stats['chars']} 字符，"
+                            f"约 {text_stats['raw_tokens']} → {text_stats['tokens']} tokens"
+                        )
                     st.markdown("<br>", unsafe_allow_html=True)
                     
                     col1, col2 = st.columns([1, 1])
@@ -0,0 +1,449 @@
+# -*- coding: utf-8 -*-
+"""
+异步API客户端
+在信号量限制下并发调用API端点分析多份简历，按完成顺序返回结果，
+批次耗时约等于最慢的单个请求；重试和降级语义与 RobustAPIClient 一致。
+安装了 aiohttp 时使用原生异步HTTP，否则在线程池中执行同步会话的请求。
+"""
+
+import asyncio
+import atexit
+import copy
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import AsyncIterator, Awaitable, Callable, Dict, Any, Hashable, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from api_client import (RobustAPIClient, APIException, RequestBudget, get_concurrency_controller,
+                        get_hedge_policy, get_rate_limiter, get_single_flight)
+from model_health import get_health_monitor
+from stream_parser import IncrementalJSONParser, sse_data
+from config import API_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# 可重试的网络错误：同步会话（线程池方式）和 aiohttp 的连接、超时错误
+_NETWORK_ERRORS = (asyncio.TimeoutError, requests.exceptions.RequestException)
+if aiohttp is not None:
+    _NETWORK_ERRORS += (aiohttp.ClientError,)
+
+
+class AsyncSessionPool:
+    """可复用的事件循环及其 aiohttp 会话：每个事件循环为每个API地址保留一个会话，批次之间复用已建立的TCP/TLS连接
+
+    aiohttp 会话只能在创建它的事件循环中使用，因此事件循环用完后不关闭而是放回池中（最多保留 max_idle 个）；
+    同一时刻一个事件循环只由一个线程运行，同时进行的批次（多个Streamlit会话）各自取用空闲的事件循环。
+    """
+
+    def __init__(self, pool_size: int = 32, max_idle: int = 4, keepalive_timeout: float = 120):
+        self.pool_size = pool_size
+        self.max_idle = max_idle
+        self.keepalive_timeout = keepalive_timeout
+        self._lock = threading.Lock()
+        self._idle: List[asyncio.AbstractEventLoop] = []
+        self._sessions: Dict[asyncio.AbstractEventLoop, Dict[str, Any]] = {}
+        self._preconnected = set()
+
+    @contextmanager
+    def loop(self) -> Iterator[asyncio.AbstractEventLoop]:
+        """取用一个空闲的事件循环（没有时新建），用完后放回池中"""
+        with self._lock:
+            loop = self._idle.pop() if self._idle else asyncio.new_event_loop()
+        try:
+            yield loop
+        finally:
+            with self._lock:
+                keep = not loop.is_closed() and len(self._idle) < self.max_idle
+                if keep:
+                    self._idle.append(loop)
+            if not keep:
+                self._close(loop)
+
+    def session(self, base_url: str):
+        """当前事件循环中 base_url 的会话，不存在时创建（须在该事件循环的协程中调用）"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            sessions = self._sessions.setdefault(loop, {})
+            session = sessions.get(base_url)
+            if session is None or session.closed:
+                # 连接层的重试和超时统一由调用方按时间预算控制
+                connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=self.keepalive_timeout)
+                session = sessions[base_url] = aiohttp.ClientSession(connector=connector)
+            return session
+
+    def preconnect(self, base_url: str, timeout: float = 5):
+        """在后台线程中用池中事件循环的会话预先建立到 base_url 所在主机的连接（每个地址只做一次）"""
+        parsed = urlsplit(base_url)
+        origin = f"{parsed.scheme}://{parsed.netloc}/"
+        with self._lock:
+            if base_url in self._preconnected:
+                return
+            self._preconnected.add(base_url)
+
+        async def _connect():
+            # 只需要建立连接，响应内容无关紧要；读完响应后连接回到该会话的连接池
+            async with self.session(base_url).head(origin, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                await response.read()
+
+        def _run():
+            try:
+                with self.loop() as loop:
+                    loop.run_until_complete(_connect())
+            except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                logger.info(f"预连接 {origin} 失败: {e}")
+                with self._lock:
+                    self._preconnected.discard(base_url)
+
+        threading.Thread(target=_run, name='aiohttp-preconnect', daemon=True).start()
+
+    def _close(self, loop: asyncio.AbstractEventLoop):
+        with self._lock:
+            sessions = self._sessions.pop(loop, {})
+        if not loop.is_closed():
+            for session in sessions.values():
+                loop.run_until_complete(session.close())
+            loop.close()
+
+    def close(self):
+        """关闭池中所有空闲的事件循环及其会话（进程退出时调用）"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for loop in idle:
+            self._close(loop)
+
+
+_session_pool: Optional[AsyncSessionPool] = None
+_session_pool_lock = threading.Lock()
+
+
+def get_async_session_pool() -> AsyncSessionPool:
+    """获取进程级共享的事件循环和 aiohttp 会话池"""
+    global _session_pool
+    with _session_pool_lock:
+        if _session_pool is None:
+            _session_pool = AsyncSessionPool(
+                API_CONFIG['connection_pool_size'],
+                keepalive_timeout=API_CONFIG['async_keepalive_timeout']
+            )
+            atexit.register(_session_pool.close)
+        return _session_pool
+
+
+class AsyncAnalysisClient:
+    """RobustAPIClient 的异步版本，复用其请求构造、响应解析、重试状态码和备用模型配置"""
+
+    def __init__(self, client: RobustAPIClient, max_concurrency: Optional[int] = None):
+        self.client = client
+        self.max_concurrency = max_concurrency or API_CONFIG['max_concurrent_requests']
+
+    def preconnect(self):
+        """后台预先建立批量分析所用的 aiohttp 会话到API服务器的连接（没有API密钥或未安装 aiohttp 时不连接）"""
+        if aiohttp is not None and self.client.api_key:
+            get_async_session_pool().preconnect(self.client.base_url, timeout=self.client.connect_timeout)
+
+    async def _post(self, http, data: Dict[str, Any], budget: RequestBudget,
+                    consume: Optional[Callable[[Any], Awaitable[Any]]] = None,
+                    read_timeout: Optional[float] = None) -> Any:
+        """在时间预算内发送一次请求，返回 (状态码, 响应正文)；传入 consume 时返回 await consume(response) 的结果
+
+        http 为 aiohttp.ClientSession；未安装 aiohttp 时为执行同步请求的线程池（此时不支持 consume）。
+        预算的计时方式与同步客户端相同：请求发出时开始计时，首次发送前的本地排队不计入。
+        """
+        if aiohttp is None:
+            # 同步客户端的 _post 自行通知耗时
+            response = await asyncio.get_running_loop().run_in_executor(
+                http, partial(self.client._post, data, budget, read_timeout=read_timeout)
+            )
+            return response.status_code, response.text
+        rate_limiter = get_rate_limiter()
+        wait = rate_limiter.reserve(data['model'], budget.deadline) if self.client.rate_limited else 0
+        if wait is None:
+            raise APIException("超出请求时间预算（限流等待）")
+        if wait > 0:
+            logger.info(f"模型 {data['model']} 限流，等待 {wait:.1f} 秒")
+            await asyncio.sleep(wait)
+        controller = get_concurrency_controller()
+        if not await controller.acquire_async(data['model'], budget.deadline):
+            raise APIException("超出请求时间预算（并发排队）")
+        budget.start()
+        if budget.expired():
+            controller.cancel(data['model'])
+            raise APIException("超出请求时间预算")
+        timeout = budget.timeout(read_timeout)
+        total = budget.remaining()
+        start_time = time.time()
+        status_code = None
+        cancelled = False
+        succeeded = False
+        try:
+            # 连接和两次读取之间的间隔分别限时，整个请求（含流式读取）不超过剩余预算
+            client_timeout = aiohttp.ClientTimeout(total=total, sock_connect=timeout[0], sock_read=timeout[1])
+            async with http.post(self.client.base_url, headers=self.client._get_headers(), json=data,
+                                 timeout=client_timeout) as response:
+                status_code = response.status
+                if self.client.rate_limited:
+                    rate_limiter.observe(data['model'], status_code, response.headers)
+                self.client._record_circuit(data['model'], status_code)
+                if consume is not None:
+                    result = await consume(response)
+                else:
+                    result = status_code, await response.text()
+                if status_code == 200:
+                    succeeded = True
+                    get_hedge_policy().observe(data['model'], time.time() - start_time)
+                return result
+        except (asyncio.TimeoutError, aiohttp.ClientError):
+            self.client._record_circuit(data['model'], None)
+            raise
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            latency = time.time() - start_time
+            if cancelled:
+                # 被取消的请求（对冲中落后的一方、提前停止的批次）不作为拥塞信号
+                controller.cancel(data['model'])
+                window = None
+            else:
+                window = controller.release(data['model'], status_code, latency)
+                get_health_monitor().observe(data['model'], succeeded, latency)
+            if self.client._listeners:
+                self.client._emit('latency', model=data['model'], status_code=status_code, latency=latency)
+                if window is not None:
+                    self.client._emit('concurrency', model=data['model'], window=window)
+
+    async def call_api_with_retry(self, http, prompt: str, model_config: Dict[str, Any], candidate_name: str,
+                                  on_field: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """带重试机制的API调用；与同步客户端共用进程级请求合并，相同请求同时只向上游发送一次
+
+        启用流式响应时，主模型输出的每个字段一完整就在事件循环中调用 on_field(字段名, 值)。
+        """
+        data = self.client._prepare_request_data(prompt, model_config)
+        key = self.client.request_key(data)
+        single_flight = get_single_flight()
+        while True:
+            call, leader = single_flight.begin(key)
+            if leader:
+                try:
+                    result = await self._call_api_with_retry(http, data, prompt, model_config, candidate_name,
+                                                             self.client.new_budget(), on_field)
+                except BaseException as e:
+                    single_flight.finish(key, call, error=e)
+                    raise
+                single_flight.finish(key, call, result)
+                result = copy.deepcopy(result)
+                break
+            # 等待其他线程或任务中的相同请求完成，不阻塞事件循环
+            await asyncio.get_running_loop().run_in_executor(None, call.done.wait)
+            if call.error is None:
+                result = copy.deepcopy(call.result)
+                if self.client._listeners:
+                    self.client._emit('coalesced', candidate_name=candidate_name, model=data['model'])
+                break
+        result['candidate_name'] = candidate_name
+        return result
+
+    async def _call_api_with_retry(self, http, data: Dict[str, Any], prompt: str, model_config: Dict[str, Any],
+                                   candidate_name: str, budget: RequestBudget,
+                                   on_field: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """与同步客户端相同的重试流程，重试决策和降级顺序由 RobustAPIClient 的共用方法给出"""
+        last_exception = None
+
+        for attempt in range(1, self.client.max_retries + 1):
+            blocked = self.client._attempt_blocked(data['model'], budget)
+            if blocked is not None:
+                last_exception = last_exception or blocked
+                break
+            try:
+                start_time = time.time()
+                if self.client.enable_hedging:
+                    result, model = await self._request_hedged(http, data, prompt, model_config, candidate_name,
+                                                               budget, on_field)
+                else:
+                    result, model = await self._request(http, data, budget, on_field), data['model']
+                return self.client._succeeded(result, candidate_name, model, attempt, model != data['model'],
+                                              start_time)
+
+            except Exception as e:
+                last_exception = e
+                delay = self.client._next_retry(e, attempt, budget, candidate_name, _NETWORK_ERRORS)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+
+        # 所有重试都失败了，尝试降级策略
+        return await self._fallback_strategy(http, prompt, model_config, candidate_name, last_exception, budget)
+
+    async def _request(self, http, data: Dict[str, Any], budget: RequestBudget,
+                       on_field: Optional[Callable[[str, Any], None]] = None,
+                       read_timeout: Optional[float] = None) -> Dict[str, Any]:
+        """在时间预算内发送一次请求并解析分析结果；启用流式响应时边接收边解析"""
+        if budget.expired():
+            raise APIException("超出请求时间预算")
+        if not self.client.enable_streaming:
+            status_code, response_text = await self._post(http, data, budget, read_timeout=read_timeout)
+            return self.client._parse_response(status_code, response_text)
+        stream_data = dict(data, stream=True)
+        if aiohttp is None:
+            # 在线程池中用同步客户端读取流，字段回调转回事件循环所在线程执行
+            loop = asyncio.get_running_loop()
+            field_callback = None
+            if on_field:
+                field_callback = lambda field, value: loop.call_soon_threadsafe(on_field, field, value)
+            return await loop.run_in_executor(http, partial(
+                self.client._post, stream_data, budget,
+                lambda response: self.client._read_stream(response, field_callback, budget.deadline),
+                read_timeout
+            ))
+        # consume 在请求发出（预算开始计时）后才调用
+        return await self._post(http, stream_data, budget, read_timeout=read_timeout,
+                                consume=lambda response: self._read_stream(response, on_field, budget.deadline))
+
+    async def _read_stream(self, response, on_field: Optional[Callable[[str, Any], None]] = None,
+                           deadline: Optional[float] = None) -> Dict[str, Any]:
+        """与同步客户端的 _read_stream 相同：逐块解析SSE，JSON对象闭合后立即关闭连接，超过 deadline 时停止读取"""
+        if response.status != 200:
+            return self.client._parse_response(response.status, await response.text())
+        parser = IncrementalJSONParser()
+        try:
+            async for line in response.content:
+                payload = sse_data(line.decode('utf-8').strip())
+                if payload is None:
+                    continue
+                if payload == '[DONE]':
+                    break
+                for field, value in parser.feed(self.client._stream_delta(payload)):
+                    if on_field:
+                        on_field(field, value)
+                if parser.complete:
+                    break
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise APIException("超出请求时间预算（流式读取）")
+        finally:
+            response.close()
+        return self.client._stream_result(parser)
+
+    async def _request_hedged(self, http, data: Dict[str, Any], prompt: str, model_config: Dict[str, Any],
+                              candidate_name: str, budget: RequestBudget,
+                              on_field: Optional[Callable[[str, Any], None]] = None) -> Tuple[Dict[str, Any], str]:
+        """与同步客户端的对冲请求相同，先得到有效结果后取消落后的请求"""
+        policy = get_hedge_policy()
+        policy.start_request()
+        delay = policy.delay(data['model'])
+        if delay is None:
+            return await self._request(http, data, budget, on_field), data['model']
+
+        primary = asyncio.ensure_future(self._request(http, data, budget, on_field))
+        tasks = {primary: data['model']}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            hedge = None if done else self.client._hedge_request(data, prompt, model_config, candidate_name, delay)
+            if hedge is not None:
+                hedge_model, hedge_data = hedge
+                tasks[asyncio.ensure_future(self._request(http, hedge_data, budget))] = hedge_model
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if self.client._hedge_won(task, tasks[task], data['model']):
+                        return task.result(), tasks[task]
+            raise primary.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _fallback_strategy(self, http, prompt: str, model_config: Dict[str, Any], candidate_name: str,
+                                 last_exception: Exception, budget: RequestBudget) -> Dict[str, Any]:
+        """降级策略：在剩余时间预算内尝试其他模型，否则返回默认结果"""
+        for fallback_model, data in self.client._fallback_requests(prompt, model_config, candidate_name,
+                                                                   last_exception, budget):
+            # 使用更短的读取超时进行快速尝试，仍受剩余时间预算限制
+            start_time = time.time()
+            try:
+                result = await self._request(http, data, budget, read_timeout=API_CONFIG['fallback_read_timeout'])
+            except Exception as e:
+                logger.warning(f"降级模型 {fallback_model} 也失败了: {str(e)}")
+                continue
+            return self.client._succeeded(result, candidate_name, fallback_model, 1, True, start_time)
+
+        # 所有降级策略都失败，返回默认结果
+        return self.client._all_failed(candidate_name, last_exception)
+
+    async def analyze_many(self, items: Iterable[Tuple[Hashable, str, str]], model_config: Dict[str, Any],
+                           on_field: Optional[Callable[[Hashable, str, Any], None]] = None
+                           ) -> AsyncIterator[Tuple[Hashable, Dict[str, Any]]]:
+        """并发分析：items 为 (key, 提示词, 候选人姓名)，按完成顺序生成 (key, 结果)
+
+        同时处理的简历数不超过 max_concurrency，也不超过所选模型当前的自适应并发窗口，
+        其余简历在开始计算时间预算之前排队。
+        启用流式响应时，每份简历的字段一完整就调用 on_field(key, 字段名, 值)。
+        """
+        controller = get_concurrency_controller()
+        slots = asyncio.Condition()
+        active = 0
+
+        def _has_slot() -> bool:
+            return active < min(self.max_concurrency, controller.limit(model_config['model']))
+
+        async def _analyze_one(http, key, prompt, candidate_name):
+            nonlocal active
+            async with slots:
+                await slots.wait_for(_has_slot)
+                active += 1
+            try:
+                result = await self.call_api_with_retry(http, prompt, model_config, candidate_name,
+                                                        partial(on_field, key) if on_field else None)
+            except Exception as e:
+                logger.error(f"分析失败 {candidate_name}: {e}")
+                result = self.client._get_default_scores(candidate_name)
+            finally:
+                async with slots:
+                    active -= 1
+                    # 请求结束时并发窗口可能已变化，唤醒所有等待者重新判断
+                    slots.notify_all()
+            return key, result
+
+        # aiohttp 会话在进程内按事件循环和API地址共用，批次结束后不关闭，保留已建立的连接
+        http = (get_async_session_pool().session(self.client.base_url) if aiohttp is not None
+                else ThreadPoolExecutor(self.max_concurrency))
+        try:
+            tasks = [asyncio.ensure_future(_analyze_one(http, *item)) for item in items]
+            try:
+                for future in asyncio.as_completed(tasks):
+                    yield await future
+            finally:
+                # 调用方提前停止迭代时取消剩余请求
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            if aiohttp is None:
+                http.shutdown(wait=False)
+
+
+def iterate_async(async_iterator: AsyncIterator) -> Iterator:
+    """在同步代码（如Streamlit脚本）中逐个消费异步迭代器，事件循环只在取下一个结果时运行
+
+    事件循环取自进程级的池，用完后连同其 aiohttp 会话留给下一个批次。
+    """
+    with get_async_session_pool().loop() as loop:
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(async_iterator.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(async_iterator.aclose())
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+批次分拣
+一个分析批次中，每份提取出文本的简历依次与候选人索引、近似重复索引和本批次中等待分析的简历比较：
+有可复用的分析结果时直接复用，与本批次中等待分析的简历重复时归入先出现的那份，其余简历排队等待AI分析。
+分析完成后记录结果，并更新重复简历索引和候选人索引（同一候选人的新版本简历标记版本号）。
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+
+from candidate_identity import CandidateIndex, extract_identity
+from config import DEDUP_CONFIG, IDENTITY_CONFIG
+from resume_dedup import NearDuplicateIndex
+
+# 等待分析的简历：(文件名, 提取结果, 身份标识, MinHash签名)
+Job = Tuple[str, Dict[str, Any], Optional[Dict[str, Any]], Any]
+
+
+class BatchTriage:
+    """一个分析批次的去重分拣（不依赖界面，结果和重复分组写入传入的列表和字典）
+
+    索引定义了 __len__，空索引为假值，因此一律用 is None 判断是否启用。
+    """
+
+    def __init__(self, context: str, dedup_index: Optional[NearDuplicateIndex] = None,
+                 candidate_index: Optional[CandidateIndex] = None,
+                 results: Optional[List[Dict[str, Any]]] = None,
+                 duplicate_groups: Optional[Dict[str, List[Tuple[str, str]]]] = None):
+        self.context = context
+        self.dedup_index = dedup_index
+        self.candidate_index = candidate_index
+        # 本批次展示的分析结果
+        self.results = results if results is not None else []
+        # 重复简历分组（同一候选人或近似重复）：原简历名 -> [(重复简历名, 原因)]
+        self.duplicate_groups = duplicate_groups if duplicate_groups is not None else {}
+        # 等待并发分析的简历：序号 -> Job
+        self.pending: Dict[int, Job] = {}
+        self._batch_names = set()
+        # 本批次中等待分析的简历的身份标识和签名，与其重复的后续简历直接归入先出现的那份
+        self._pending_candidates = CandidateIndex() if candidate_index is not None else None
+        self._pending_index = NearDuplicateIndex(
+            threshold=DEDUP_CONFIG['jaccard_threshold'],
+            num_perm=DEDUP_CONFIG['num_perm'],
+            shingle_size=DEDUP_CONFIG['shingle_size']
+        ) if dedup_index is not None else None
+
+    def _find_reusable(self, identity, signature, sha256: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """在候选人索引和近似重复索引中查找可复用的分析结果，返回 (结果, 原因)"""
+        previous = self.candidate_index.lookup(identity, self.context) if self.candidate_index is not None else None
+        if previous and (previous['sha256'] == sha256 or not IDENTITY_CONFIG['reanalyze_new_versions']):
+            # 同一候选人（姓名和联系方式一致）：复用已有分析结果，不再调用API
+            if previous['sha256'] == sha256:
+                return previous['analysis'], "同一候选人"
+            return previous['analysis'], "同一候选人的新版本简历，沿用已有分析"
+        if self.dedup_index is not None:
+            duplicate = self.dedup_index.query(signature, self.context)
+            if duplicate:
+                # 近似重复：复用已有分析结果，不再调用API
+                _, similarity, reused = duplicate
+                return reused, f"相似度 {similarity:.0%}"
+        return None, None
+
+    def _find_batch_duplicate(self, identity, signature, sha256: str) -> Optional[Tuple[str, str]]:
+        """查找本批次中等待分析的重复简历，返回 (原简历名, 原因)"""
+        pending = None
+        if self._pending_candidates is not None:
+            pending = self._pending_candidates.lookup(identity, self.context)
+        if pending:
+            if pending['sha256'] == sha256:
+                return pending['file_name'], "同一候选人"
+            if not IDENTITY_CONFIG['reanalyze_new_versions']:
+                return pending['file_name'], "同一候选人的新版本简历，沿用已有分析"
+        if self._pending_index is not None:
+            duplicate = self._pending_index.query(signature, self.context)
+            if duplicate:
+                return duplicate[2]['candidate_name'], f"相似度 {duplicate[1]:.0%}"
+        return None
+
+    def _group(self, original_name: str, candidate_name: str, reason: str):
+        if original_name != candidate_name:
+            self.duplicate_groups.setdefault(original_name, []).append((candidate_name, reason))
+
+    def triage(self, file_name: str, extraction: Dict[str, Any]) -> Optional[Job]:
+        """分拣一份提取出文本的简历：复用已有结果或归入本批次的重复简历时返回 None，需要分析时返回 Job"""
+        candidate_name = file_name.replace('.pdf', '')
+        resume_text = extraction['text']
+        identity = extract_identity(resume_text) if self.candidate_index is not None else None
+        signature = self.dedup_index.signature(resume_text) if self.dedup_index is not None else None
+
+        reused, reason = self._find_reusable(identity, signature, extraction['sha256'])
+        if reused is not None:
+            original_name = reused['candidate_name']
+            self._group(original_name, candidate_name, reason)
+            # 原简历不在本批次中时，将复用的结果作为本批次的候选人展示
+            if original_name not in self._batch_names:
+                result = dict(reused, candidate_name=candidate_name)
+                if original_name != candidate_name:
+                    result['duplicate_of'] = original_name
+                result['text_stats'] = extraction['text_stats']
+                self.results.append(result)
+                self._batch_names.add(original_name)
+            return None
+
+        batch_duplicate = self._find_batch_duplicate(identity, signature, extraction['sha256'])
+        if batch_duplicate:
+            # 与本批次中等待分析的简历重复，共用其分析结果
+            self._group(batch_duplicate[0], candidate_name, batch_duplicate[1])
+            return None
+
+        self._batch_names.add(candidate_name)
+        return file_name, extraction, identity, signature
+
+    def queue(self, job: Job) -> int:
+        """把需要分析的简历排入待分析队列，返回其序号"""
+        file_name, extraction, identity, signature = job
+        candidate_name = file_name.replace('.pdf', '')
+        key = len(self.pending)
+        self.pending[key] = job
+        if self._pending_candidates is not None and not self._pending_candidates.find(identity):
+            # file_name 位置记录简历名称，重复简历按它归组
+            self._pending_candidates.record(identity, self.context, candidate_name, extraction['sha256'], {})
+        if self._pending_index is not None:
+            self._pending_index.add(extraction['sha256'], signature, self.context, {'candidate_name': candidate_name})
+        return key
+
+    def record(self, job: Job, result: Dict[str, Any]):
+        """记录分析结果，成功的结果加入重复简历索引和候选人索引"""
+        file_name, extraction, identity, signature = job
+        self.results.append(result)
+        if result.get('analysis_status') == 'default':
+            return
+        if self.dedup_index is not None:
+            self.dedup_index.add(extraction['sha256'], signature, self.context, result)
+        if self.candidate_index is not None:
+            version, previous = self.candidate_index.record(identity, self.context, file_name,
+                                                            extraction['sha256'], result)
+            if version > 1 and previous is not None:
+                # 同一候选人的新版本简历已重新分析（上一版本可能是本批次中先完成的那份）
+                result['resume_version'] = version
+                result['duplicate_of'] = (previous['analysis'].get('candidate_name')
+                                          or previous['file_name'].replace('.pdf', ''))
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+候选人身份识别
+用正则从简历开头的联系信息区提取邮箱、手机号和姓名，按联系方式的哈希建立跨会话持久化的候选人索引，
+在调用API之前识别同一候选人的重复投递（文件名不同、简历版本不同）。
+招聘网站页脚、推荐人电话等共用的联系方式可能出现在不同候选人的简历中，
+因此只有姓名一致，或没有可比较的姓名但至少两项联系方式相同时才认定为同一候选人。
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from config import IDENTITY_CONFIG
+from resume_segmenter import detect_heading
+
+logger = logging.getLogger(__name__)
+
+_EMAIL_RE = re.compile(r'[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}')
+# 中国大陆手机号（可带+86及空格/短横线分隔）
+_CN_MOBILE_RE = re.compile(r'(?<!\d)(?:\+?86[\s\-]?)?(1[3-9]\d)[\s\-]?(\d{4})[\s\-]?(\d{4})(?!\d)')
+# 其他国际号码：+区号开头，至少10位数字
+_INTL_PHONE_RE = re.compile(r'(?<![\d+])\+\d[\d\s\-()]{8,18}\d(?!\d)')
+_NAME_LABEL_RE = re.compile(r'(?:姓\s*名|name)\s*[:：]\s*([\u4e00-\u9fff·]{2,5}|[A-Za-z][A-Za-z.\- ]{1,40}[A-Za-z])', re.IGNORECASE)
+_CN_NAME_LINE_RE = re.compile(r'^([\u4e00-\u9fff]{2,4})(?:[\s|｜,，/]|$)')
+_EN_NAME_LINE_RE = re.compile(r'^([A-Z][a-z]+(?: [A-Z][a-z]+){1,2})(?:[\s|,/]|$)')
+# 只在简历开头几行中寻找无标签的姓名
+_NAME_SEARCH_LINES = 5
+_NOT_NAMES = {'个人简历', '简历', '求职简历', '个人信息', '基本信息', 'Curriculum Vitae', 'Resume'}
+# 联系信息区：简历开头到第一个非个人信息标题为止，最多这么多个非空行
+_CONTACT_BLOCK_LINES = 15
+_CONTACT_HEADING_RE = re.compile(r'个人信息|基本信息|联系方式|personal information|contact', re.IGNORECASE)
+# 招聘网站、客服等公共邮箱，不能代表候选人
+_SHARED_EMAIL_DOMAINS = {'zhaopin.com', '51job.com', 'liepin.com', 'lagou.com', 'zhipin.com', '58.com',
+                         'linkedin.com', 'chinahr.com', 'dajie.com'}
+_SHARED_EMAIL_USERS = {'service', 'support', 'noreply', 'no-reply', 'kefu', 'admin', 'info', 'help', 'hr',
+                       'jobs', 'career', 'careers', 'recruit', 'webmaster', 'postmaster'}
+
+
+def _contact_block(text: str) -> str:
+    """简历开头的联系信息区（正文中的推荐人电话、页脚的招聘网站邮箱等不在其中）"""
+    lines = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        if detect_heading(line) is not None and not _CONTACT_HEADING_RE.search(line):
+            break
+        lines.append(line)
+        if len(lines) >= _CONTACT_BLOCK_LINES:
+            break
+    return '\n'.join(lines)
+
+
+def _is_shared_email(email: str) -> bool:
+    user, _, domain = email.partition('@')
+    return user in _SHARED_EMAIL_USERS or any(domain == d or domain.endswith('.' + d) for d in _SHARED_EMAIL_DOMAINS)
+
+
+def _normalize_name(name: Optional[str]) -> Optional[str]:
+    return re.sub(r'\s+', '', name).lower() if name else None
+
+
+def extract_identity(text: str) -> Dict[str, Any]:
+    """从联系信息区提取候选人身份标识：{'name': 姓名或None, 'emails': [...], 'phones': [...]}"""
+    block = _contact_block(text)
+    emails = sorted({email.lower().rstrip('.') for email in _EMAIL_RE.findall(block)})
+    emails = [email for email in emails if not _is_shared_email(email)]
+    phones = {''.join(match) for match in _CN_MOBILE_RE.findall(block)}
+    for match in _INTL_PHONE_RE.findall(block):
+        digits = re.sub(r'\D', '', match)
+        if digits.startswith('86') and len(digits) == 13:
+            digits = digits[2:]
+        phones.add(digits)
+
+    name = None
+    label = _NAME_LABEL_RE.search(block)
+    if label:
+        name = label.group(1).strip()
+    else:
+        for line in block.splitlines()[:_NAME_SEARCH_LINES]:
+            line = line.strip()
+            match = _CN_NAME_LINE_RE.match(line) or _EN_NAME_LINE_RE.match(line)
+            if match and match.group(1) not in _NOT_NAMES:
+                name = match.group(1)
+                break
+    return {'name': name, 'emails': emails, 'phones': sorted(phones)}
+
+
+def identity_keys(identity: Dict[str, Any]) -> List[str]:
+    """身份标识的哈希键（只使用邮箱和手机号，姓名重名率高不作为匹配依据；索引中不保存明文联系方式）"""
+    raw_keys = [f"email:{email}" for email in identity.get('emails', [])]
+    raw_keys += [f"phone:{phone}" for phone in identity.get('phones', [])]
+    return [hashlib.sha256(key.encode('utf-8')).hexdigest() for key in raw_keys]
+
+
+class CandidateIndex:
+    """持久化的候选人索引：身份哈希 -> 候选人记录（含各分析上下文下最新版本简历的分析结果）
+
+    同一联系方式可能属于多个候选人记录；只有姓名一致（双方都识别出姓名时），
+    或至少两项联系方式相同（任一方没有姓名时）才视为同一候选人。
+    """
+
+    def __init__(self, index_file: Optional[str] = None, max_candidates: int = 10000):
+        self.index_file = index_file
+        self.max_candidates = max_candidates
+        self._lock = threading.Lock()
+        # 身份哈希 -> 候选人ID列表
+        self._keys: Dict[str, List[str]] = {}
+        self._candidates: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _match(self, identity: Dict[str, Any]) -> Optional[str]:
+        """同一候选人的ID（调用方持有锁）"""
+        shared: Dict[str, int] = {}
+        for key in identity_keys(identity):
+            for candidate_id in self._keys.get(key, ()):
+                if candidate_id in self._candidates:
+                    shared[candidate_id] = shared.get(candidate_id, 0) + 1
+        name = _normalize_name(identity.get('name'))
+        for candidate_id, count in sorted(shared.items(), key=lambda item: -item[1]):
+            other = _normalize_name(self._candidates[candidate_id].get('name'))
+            if name and other:
+                if name == other:
+                    return candidate_id
+            elif count >= 2:
+                return candidate_id
+        return None
+
+    def find(self, identity: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """按邮箱/手机号和姓名查找同一候选人"""
+        with self._lock:
+            candidate_id = self._match(identity)
+            return self._candidates[candidate_id] if candidate_id is not None else None
+
+    def lookup(self, identity: Dict[str, Any], context: str) -> Optional[Dict[str, Any]]:
+        """查找同一候选人在指定分析上下文下的最新记录 {'file_name', 'sha256', 'version', 'analysis'}"""
+        candidate = self.find(identity)
+        if candidate is None:
+            return None
+        return candidate['versions'].get(context)
+
+    def record(self, identity: Dict[str, Any], context: str, file_name: str, sha256: str,
+               analysis: Dict[str, Any]) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """记录一次分析，返回 (该候选人在此上下文下的简历版本号, 被替换的上一版本记录或None)"""
+        keys = identity_keys(identity)
+        if not keys:
+            return 1, None
+        with self._lock:
+            candidate_id = self._match(identity)
+            if candidate_id is None:
+                candidate_id = uuid.uuid4().hex
+                self._candidates[candidate_id] = {'name': identity.get('name'), 'keys': [], 'versions': {}}
+            candidate = self._candidates[candidate_id]
+            for key in keys:
+                if key not in candidate['keys']:
+                    candidate['keys'].append(key)
+                    self._keys.setdefault(key, []).append(candidate_id)
+            previous = candidate['versions'].get(context)
+            version = 1
+            if previous is not None:
+                version = previous['version'] if previous['sha256'] == sha256 else previous['version'] + 1
+            candidate['versions'][context] = {
+                'file_name': file_name,
+                'sha256': sha256,
+                'version': version,
+                'analysis': analysis,
+                'updated_at': time.time()
+            }
+            candidate['name'] = identity.get('name') or candidate['name']
+            # 挪到末尾，超出上限时淘汰最久未更新的候选人
+            self._candidates[candidate_id] = self._candidates.pop(candidate_id)
+            while len(self._candidates) > self.max_candidates:
+                stale_id = next(iter(self._candidates))
+                for key in self._candidates.pop(stale_id)['keys']:
+                    owners = self._keys.get(key, [])
+                    if stale_id in owners:
+                        owners.remove(stale_id)
+                    if not owners:
+                        self._keys.pop(key, None)
+            return version, previous
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+            self._candidates.clear()
+        self.save()
+
+    def __len__(self) -> int:
+        return len(self._candidates)
+
+    def _load(self):
+        if not self.index_file or not os.path.exists(self.index_file):
+            return
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                self._candidates = json.load(f)
+            for candidate_id, candidate in self._candidates.items():
+                for key in candidate['keys']:
+                    self._keys.setdefault(key, []).append(candidate_id)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"候选人索引加载失败: {e}")
+            self._keys, self._candidates = {}, {}
+
+    def save(self):
+        """持久化索引（写临时文件后原子替换）"""
+        if not self.index_file:
+            return
+        with self._lock:
+            data = json.dumps(self._candidates, ensure_ascii=False)
+        try:
+            tmp_path = f"{self.index_file}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.index_file)
+        except OSError as e:
+            logger.warning(f"候选人索引保存失败: {e}")
+
+
+_index: Optional[CandidateIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_candidate_index() -> CandidateIndex:
+    """获取进程级共享的候选人索引"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = CandidateIndex(IDENTITY_CONFIG['index_file'], max_candidates=IDENTITY_CONFIG['max_candidates'])
+        return _index
@@ -1,33 +1,131 @@
 # 简历分析配置文件
 
+import os
+
 # 评分维度配置
 SCORING_DIMENSIONS = {
     'education': {
         'name': '教育背景',
         'weight': 0.2,  # 权重
-        'description': '学历层次、学校声誉、专业匹配度'
+        'description': '学历层次、学校声誉、专业匹配度',
+        'sections': ['education']  # 该维度评分依据的简历段落
     },
     'experience': {
         'name': '工作经验',
         'weight': 0.3,
-        'description': '工作年限、职位层级、行业相关性'
+        'description': '工作年限、职位层级、行业相关性',
+        'sections': ['experience']
     },
     'skills': {
         'name': '技能匹配',
         'weight': 0.25,
-        'description': '专业技能、技术能力、证书资质'
+        'description': '专业技能、技术能力、证书资质',
+        'sections': ['skills']
     },
     'projects': {
         'name': '项目经验',
         'weight': 0.15,
-        'description': '项目复杂度、成果展示、创新性'
+        'description': '项目复杂度、成果展示、创新性',
+        'sections': ['projects']
     },
     'overall': {
         'name': '综合素质',
         'weight': 0.1,
-        'description': '沟通能力、领导力、学习能力'
+        'description': '沟通能力、领导力、学习能力',
+        'sections': ['other', 'experience', 'projects']
+    }
+}
+
+# 提示词配置
+PROMPT_CONFIG = {
+    'max_resume_tokens': 6000  # 简历内容超过此估算token数时，按评分维度权重只保留各段落的重点内容
+}
+
+# API调用配置
+API_CONFIG = {
+    'max_concurrent_requests': 16,  # 每个模型同时发送的请求数上限（实际并发由自适应窗口控制）
+    'initial_concurrency_window': 4,  # 自适应并发窗口的初始大小
+    'min_concurrency_window': 1,
+    'latency_spike_factor': 3,  # 耗时超过平均值的倍数视为拥塞，窗口减半
+    'circuit_failure_rate': 0.5,  # 模型近期请求失败比例达到该值时熔断，跳过该模型
+    'circuit_min_requests': 4,  # 统计失败比例所需的最少请求数
+    'circuit_window': 10,  # 统计最近多少次请求
+    'circuit_cooldown': 60,  # 熔断后多少秒放行一个试探请求
+    'request_budget': 90,  # 每份简历的总时间预算（秒），包含重试、退避和降级
+    'connect_timeout': 5,  # 建立连接的超时（秒）
+    'fallback_read_timeout': 15,  # 降级模型快速尝试的读取超时（秒）
+    'connection_pool_size': 32,  # 每个API密钥的会话保持的连接数上限，应不小于同时进行的请求数
+    'max_pooled_sessions': 8,  # 最多为多少个API密钥保留会话
+    'preconnect': True,  # 配置API密钥后在后台预先建立连接
+    'async_keepalive_timeout': 120,  # 批量分析的 aiohttp 空闲连接保留秒数，下一个批次可直接复用
+    'enable_streaming': True,  # 流式接收模型输出，字段完整即显示，JSON对象闭合后立即结束
+    'enable_hedging': False,  # 主模型应答过慢时向备用模型发送对冲请求，取先到的有效结果
+    'hedge_percentile': 0.9,  # 主模型超过其历史耗时的该分位数仍未应答时对冲
+    'hedge_min_samples': 10,  # 模型至少有多少次成功耗时记录后才对冲
+    'hedge_max_rate': 0.1,  # 对冲请求数不超过主请求数的该比例
+    'rate_limit_per_minute': 20,  # 免费模型（:free）每分钟最多发送的请求数（收到限流响应后自动下调）
+    'rate_limit_burst': 5,  # 免费模型允许的突发请求数
+    'min_rate_limit_per_minute': 2,  # 自动下调的下限
+    'max_rate_limit_per_minute': 600  # 按响应头调整的速率上限；付费模型初始即为该速率，收到限流信号后才放慢
+}
+
+# API端点配置：任意OpenAI兼容的 /chat/completions 接口，部署时用环境变量 RESUME_API_ENDPOINT 选择
+# auth：bearer（Authorization: Bearer 密钥）、header（密钥放在 auth_header 指定的请求头中）、none（不需要密钥）
+# models 为界面中可选的模型，paid_models 只在配置了API密钥时显示；fallback_models 为该端点的降级顺序
+# rate_limit 为 False 时不做客户端限流（自建服务由自适应并发窗口控制负载）
+ENDPOINTS = {
+    'openrouter': {
+        'name': 'OpenRouter',
+        'api_base': os.getenv('OPENROUTER_BASE_URL', 'https://openrouter.ai/api/v1'),
+        'auth': 'bearer',
+        'api_key_env': 'OPENROUTER_API_KEY',
+        'extra_headers': {
+            'HTTP-Referer': 'https://github.com/your-repo/resume-analyzer',
+            'X-Title': 'Resume Analyzer'
+        },
+        'models': {
+            'deepseek/deepseek-chat-v3-0324:free': '🌟 DeepSeek Chat V3',
+            'deepseek/deepseek-r1-0528:free': '🔥 DeepSeek R1 (0528)',
+            'deepseek/deepseek-r1:free': '🚀 DeepSeek R1',
+            'deepseek/deepseek-r1-0528-qwen3-8b:free': '💫 DeepSeek R1 Qwen3-8B',
+            'qwen/qwen3-32b:free': '🎯 Qwen3-32B',
+            'qwen/qwen3-235b-a22b:free': '⭐ Qwen3-235B-A22B',
+            'qwen/qwen3-30b-a3b:free': '💎 Qwen3-30B-A3B',
+            'qwen/qwen3-8b:free': '🔷 Qwen3-8B',
+            'google/gemini-2.0-flash-exp:free': '✨ Gemini 2.0 Flash (实验版)'
+        },
+        'paid_models': {
+            'anthropic/claude-3-5-sonnet': '🧠 Claude-3.5-Sonnet (付费)',
+            'openai/gpt-4o': '🤖 GPT-4o (付费)',
+            'openai/gpt-3.5-turbo': '⚡ GPT-3.5-Turbo (付费)',
+            'google/gemini-pro': '✨ Gemini-Pro (付费)'
+        },
+        'fallback_models': [
+            'deepseek/deepseek-chat-v3-0324:free',
+            'deepseek/deepseek-r1:free',
+            'qwen/qwen3-32b:free',
+            'google/gemini-2.0-flash-exp:free'
+        ],
+        'rate_limit': True
+    },
+    # 局域网或本机的自建推理服务（llama.cpp server、vLLM 等）
+    'local': {
+        'name': '本地推理服务',
+        'api_base': os.getenv('LOCAL_API_BASE_URL', 'http://127.0.0.1:8000/v1'),
+        'auth': os.getenv('LOCAL_API_AUTH', 'none'),
+        'auth_header': os.getenv('LOCAL_API_AUTH_HEADER', 'api-key'),
+        'api_key_env': 'LOCAL_API_KEY',
+        'models': {
+            model.strip(): f'🖥️ {model.strip()}'
+            for model in os.getenv('LOCAL_API_MODELS', 'local-model').split(',') if model.strip()
+        },
+        'paid_models': {},
+        'fallback_models': [model.strip() for model in os.getenv('LOCAL_API_FALLBACK_MODELS', '').split(',')
+                            if model.strip()],
+        'rate_limit': False
     }
 }
+ACTIVE_ENDPOINT = os.getenv('RESUME_API_ENDPOINT', 'openrouter')
 
 # OpenAI API配置
 OPENAI_CONFIG = {
@@ -112,13 +210,67 @@ UI_CONFIG = {
 # 文件处理配置
 FILE_CONFIG = {
     'max_file_size': 10 * 1024 * 1024,  # 10MB
-    'allowed_extensions': ['.pdf'],
-    'max_files': 10
+    'allowed_extensions': ['.pdf', '.zip'],
+    'max_files': 10,
+    'max_zip_members': 1000,  # 单个ZIP压缩包最多导入的PDF数量
+    'extraction_workers': 0,  # PDF解析进程数，0表示按CPU核数自动选择
+    'extraction_timeout': 30,  # 单个文件解析超时（秒）
+    'extraction_max_memory_mb': 512,  # 单个解析进程内存上限（MB），0表示不限制
+    'max_pages': 15,  # 每份简历最多解析的页数，超出部分直接跳过
+    'max_text_chars': 30000,  # 提取文本字符上限，达到后停止解析后续页面
+    'max_text_tokens': 12000,  # 提取文本估算token上限
+    'min_chars_per_page': 30,  # 每页平均有效字符低于此值视为图片型/空白PDF，跳过AI分析
+    'extraction_cache_dir': '.extraction_cache',  # 提取结果磁盘缓存目录
+    'extraction_cache_max_entries': 2000,
+    'extraction_cache_max_bytes': 200 * 1024 * 1024  # 200MB
 }
 
 # 分析结果缓存配置
 CACHE_CONFIG = {
     'enable_cache': True,
     'cache_ttl': 3600,  # 1小时
-    'max_cache_size': 100
+    'max_cache_size': 100,  # 内存中保留的条目数
+    'max_disk_entries': 5000,  # 磁盘中保留的条目数
+    'cache_dir': '.response_cache'
+}
+
+# 近似重复简历检测配置
+DEDUP_CONFIG = {
+    'enable_dedup': True,
+    'jaccard_threshold': 0.85,  # 估算Jaccard相似度不低于此值视为重复简历
+    'num_perm': 128,  # MinHash签名长度
+    'shingle_size': 5,  # 字符n-gram长度
+    'index_file': '.dedup_index.json',  # 跨会话持久化的索引文件
+    'max_entries': 5000
+}
+
+# 候选人身份识别配置
+IDENTITY_CONFIG = {
+    'enable_identity_check': True,
+    'index_file': '.candidate_index.json',  # 跨会话持久化的候选人索引（只保存联系方式的哈希）
+    'max_candidates': 10000,
+    'reanalyze_new_versions': False  # 同一候选人上传了内容不同的新版简历时，是否重新调用AI分析
+}
+
+# 上传后预处理配置（默认关闭，可在界面中开启）
+SPECULATIVE_CONFIG = {
+    'enable_prefetch': False,  # 上传后立即在后台解析简历文本
+    'prefetch_analysis': False  # 同时按当前配置预先调用AI分析（会消耗API额度）
+}
+
+# 监控文件夹配置（轮询ATS导出目录，只分析新增或变化的简历）
+WATCH_CONFIG = {
+    'folder': '',  # 默认监控的文件夹，为空时在界面中填写
+    'poll_interval': 30,  # 自动轮询间隔（秒）
+    'settle_seconds': 2,  # 修改时间距今不足该秒数的文件视为仍在写入，下次轮询再处理
+    'recursive': False,  # 是否包含子目录
+    'state_dir': '.watch_state'  # 各监控文件夹的持久化状态（含分析结果）
+}
+
+# 模型健康监控配置
+HEALTH_CONFIG = {
+    'enable_monitor': False,  # 后台定期探测所选模型和备用模型，降级时优先尝试最可能快速应答的模型（探测会消耗请求额度）
+    'probe_interval': 1800,  # 探测间隔（秒）；每轮每个模型发送一个最小请求
+    'window': 10,  # 按最近多少次探测统计可用率和耗时
+    'failure_penalty': 15  # 探测失败折算的耗时（秒），与降级请求的超时时间相当
 }
\ No newline at end of file
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+简历文本提取缓存
+以上传文件内容的SHA-256为键，将规范化后的提取结果（含段落索引）持久化到磁盘，重复上传的简历无需再次解析PDF
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from config import FILE_CONFIG
+from pdf_extractor import extraction_options
+from text_normalizer import NORMALIZER_VERSION
+from resume_segmenter import SEGMENTER_VERSION
+
+logger = logging.getLogger(__name__)
+
+# 提取逻辑变化时递增，使旧缓存自动失效
+CACHE_FORMAT_VERSION = 5
+
+
+class ExtractionCache:
+    """基于内容哈希的磁盘缓存，按最近使用顺序(LRU)和总大小淘汰"""
+
+    def __init__(self, cache_dir: str, max_entries: int = 2000, max_bytes: int = 200 * 1024 * 1024,
+                 signature: str = ''):
+        self.cache_dir = cache_dir
+        # 提取参数签名（页数/字符预算等），参数变化后旧条目视为未命中
+        self.signature = signature
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> 文件大小，按最近使用时间从旧到新排列
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._load_index()
+
+    @staticmethod
+    def key_for(pdf_bytes: bytes) -> str:
+        """计算缓存键（文件内容的SHA-256）"""
+        return hashlib.sha256(pdf_bytes).hexdigest()
+
+    def _path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _load_index(self):
+        """扫描缓存目录，按修改时间重建LRU索引"""
+        entries = []
+        if os.path.isdir(self.cache_dir):
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    if not name.endswith('.json'):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, name[:-5], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存，命中时刷新其LRU位置"""
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            path = self._path_for(key)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+                if entry.get('version') != CACHE_FORMAT_VERSION or entry.get('signature') != self.signature:
+                    raise ValueError("缓存版本或提取参数不匹配")
+                os.utime(path, None)
+            except (OSError, ValueError) as e:
+                logger.warning(f"提取缓存读取失败，已丢弃: {key[:12]} ({e})")
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            self.hits += 1
+            return {
+                'text': entry['text'],
+                'text_stats': entry['text_stats'],
+                'segments': [tuple(span) for span in entry['segments']],
+                'content_kind': entry['content_kind'],
+                'image_count': entry['image_count'],
+                'page_count': entry['page_count'],
+                'pages_parsed': entry['pages_parsed'],
+                'pages_skipped': entry['pages_skipped'],
+                'truncated': entry['truncated'],
+                'error': None,
+                'status': 'ok'
+            }
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """写入提取结果（只缓存成功的结果）"""
+        if result.get('error'):
+            return
+        entry = {
+            'version': CACHE_FORMAT_VERSION,
+            'signature': self.signature,
+            'text': result.get('text', ''),
+            'text_stats': result.get('text_stats', {}),
+            'segments': result.get('segments', []),
+            'content_kind': result.get('content_kind', 'text'),
+            'image_count': result.get('image_count', 0),
+            'page_count': result.get('page_count', 0),
+            'pages_parsed': result.get('pages_parsed', 0),
+            'pages_skipped': result.get('pages_skipped', 0),
+            'truncated': result.get('truncated', False)
+        }
+        data = json.dumps(entry, ensure_ascii=False).encode('utf-8')
+        path = self._path_for(key)
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"提取缓存写入失败: {e}")
+                return
+            self._total_bytes -= self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def _remove(self, key: str):
+        self._total_bytes -= self._index.pop(key, 0)
+        try:
+            os.remove(self._path_for(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """淘汰最久未使用的条目，直到条目数和总大小都在限制内"""
+        while self._index and (len(self._index) > self.max_entries or self._total_bytes > self.max_bytes):
+            oldest_key = next(iter(self._index))
+            self._remove(oldest_key)
+
+    def clear(self):
+        """清空缓存并重置计数"""
+        with self._lock:
+            for key in list(self._index):
+                self._remove(key)
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计信息"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': len(self._index),
+                'size_bytes': self._total_bytes
+            }
+
+
+_cache: Optional[ExtractionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_extraction_cache() -> ExtractionCache:
+    """获取进程级共享的提取缓存"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ExtractionCache(
+                FILE_CONFIG['extraction_cache_dir'],
+                max_entries=FILE_CONFIG['extraction_cache_max_entries'],
+                max_bytes=FILE_CONFIG['extraction_cache_max_bytes'],
+                signature=json.dumps({**extraction_options(), 'normalizer': NORMALIZER_VERSION, 'segmenter': SEGMENTER_VERSION}, sort_keys=True)
+            )
+        return _cache
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+监控文件夹导入
+轮询ATS导出目录，按修改时间+文件大小发现可能变化的PDF，再按内容哈希确认，
+只有新增或内容变化的简历才走提取和AI分析流程；分析结果持久化，未变化的文件不产生任何开销
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Callable, Dict, Any, List, Optional
+
+from config import WATCH_CONFIG
+from pdf_extractor import extract_documents
+from extraction_cache import get_extraction_cache
+
+logger = logging.getLogger(__name__)
+
+STATE_FORMAT_VERSION = 1
+
+
+class WatchFolder:
+    """被监控的文件夹及其持久化状态：相对路径 -> {mtime_ns, size, sha256, context, content_kind, result}"""
+
+    def __init__(self, folder: str, state_file: Optional[str] = None, recursive: bool = False,
+                 settle_seconds: float = 2):
+        self.folder = os.path.abspath(folder)
+        self.state_file = state_file
+        self.recursive = recursive
+        self.settle_seconds = settle_seconds
+        self.last_poll: Optional[float] = None
+        self._lock = threading.Lock()
+        # 同一时刻只允许一个会话执行轮询
+        self._poll_lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _iter_pdf_files(self):
+        """生成 (相对路径, os.stat_result)"""
+        for root, dirs, files in os.walk(self.folder):
+            if not self.recursive:
+                dirs.clear()
+            for name in files:
+                if name.startswith('.') or not name.lower().endswith('.pdf'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    yield os.path.relpath(path, self.folder), os.stat(path)
+                except OSError:
+                    continue
+
+    def scan(self, context: str) -> List[str]:
+        """只看目录项（不读文件内容），返回修改时间/大小变化、新增或分析上下文变化的文件；已删除文件的记录一并移除"""
+        now = time.time()
+        changed = []
+        seen = set()
+        for rel_path, stat in self._iter_pdf_files():
+            seen.add(rel_path)
+            # 刚修改过的文件可能仍在写入，留到下次轮询
+            if now - stat.st_mtime < self.settle_seconds:
+                continue
+            entry = self._entries.get(rel_path)
+            if (entry is None or entry['mtime_ns'] != stat.st_mtime_ns or entry['size'] != stat.st_size
+                    or entry['context'] != context):
+                changed.append(rel_path)
+        with self._lock:
+            for rel_path in set(self._entries) - seen:
+                del self._entries[rel_path]
+        return sorted(changed)
+
+    def poll(self, context: str, analyze: Callable[[str, Dict[str, Any]], Optional[Dict[str, Any]]],
+             on_progress: Optional[Callable[[str], None]] = None) -> Optional[Dict[str, int]]:
+        """轮询一次：变化的文件先按内容哈希确认，再提取并调用 analyze(文件名, 提取结果)
+
+        analyze 返回 None 或默认评分（分析失败）时不记录该文件，下次轮询重试。
+        另一个会话正在轮询时直接返回 None。
+        """
+        if not self._poll_lock.acquire(blocking=False):
+            return None
+        try:
+            stats = {'changed': 0, 'analyzed': 0, 'unchanged': 0, 'manual_review': 0}
+            changed = self.scan(context)
+            pending = {}
+
+            def _sources():
+                for rel_path in changed:
+                    path = os.path.join(self.folder, rel_path)
+                    try:
+                        stat = os.stat(path)
+                        with open(path, 'rb') as f:
+                            pdf_bytes = f.read()
+                    except OSError as e:
+                        logger.warning(f"读取监控文件失败 {rel_path}: {e}")
+                        continue
+                    digest = hashlib.sha256(pdf_bytes).hexdigest()
+                    entry = self._entries.get(rel_path)
+                    if entry is not None and entry['sha256'] == digest and entry['context'] == context:
+                        # 只是修改时间变了（如被重新复制），内容未变，无需重新分析
+                        with self._lock:
+                            entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                        stats['unchanged'] += 1
+                        continue
+                    pending[rel_path] = (stat, digest)
+                    stats['changed'] += 1
+                    yield rel_path, pdf_bytes
+
+            for rel_path, extraction in extract_documents(_sources(), cache=get_extraction_cache()):
+                stat, digest = pending.pop(rel_path)
+                file_name = os.path.basename(rel_path)
+                if on_progress:
+                    on_progress(file_name)
+                result = None
+                if extraction['text'] and extraction['content_kind'] == 'text':
+                    result = analyze(file_name, extraction)
+                    if result is None or result.get('analysis_status') == 'default':
+                        continue
+                    stats['analyzed'] += 1
+                elif extraction['status'] in ('timeout', 'memory_exceeded'):
+                    # 超时/超内存可能是临时资源紧张，下次轮询重试
+                    continue
+                else:
+                    stats['manual_review'] += 1
+                with self._lock:
+                    self._entries[rel_path] = {
+                        'mtime_ns': stat.st_mtime_ns,
+                        'size': stat.st_size,
+                        'sha256': digest,
+                        'context': context,
+                        'content_kind': extraction['content_kind'],
+                        'error': extraction['error'],
+                        'result': result
+                    }
+                # 每分析完一个文件就持久化，中途中断不会丢失已付费的分析结果
+                self.save()
+
+            self.last_poll = time.time()
+            self.save()
+            return stats
+        finally:
+            self._poll_lock.release()
+
+    def results(self, context: str) -> List[Dict[str, Any]]:
+        """指定分析上下文下所有已分析简历的结果"""
+        with self._lock:
+            return [
+                entry['result'] for _, entry in sorted(self._entries.items())
+                if entry['result'] is not None and entry['context'] == context
+            ]
+
+    def manual_review_files(self) -> List[str]:
+        """没有可提取文字或解析失败、需要人工处理的文件"""
+        with self._lock:
+            return [rel_path for rel_path, entry in sorted(self._entries.items()) if entry['result'] is None]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        self.save()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _load(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == STATE_FORMAT_VERSION and data.get('folder') == self.folder:
+                self._entries = data['entries']
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"监控文件夹状态加载失败: {e}")
+
+    def save(self):
+        """持久化状态（写临时文件后原子替换）"""
+        if not self.state_file:
+            return
+        with self._lock:
+            data = json.dumps(
+                {'version': STATE_FORMAT_VERSION, 'folder': self.folder, 'entries': self._entries},
+                ensure_ascii=False
+            )
+        try:
+            os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+            tmp_path = f"{self.state_file}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.state_file)
+        except OSError as e:
+            logger.warning(f"监控文件夹状态保存失败: {e}")
+
+
+_watchers: Dict[str, WatchFolder] = {}
+_watchers_lock = threading.Lock()
+
+
+def get_watch_folder(folder: str) -> WatchFolder:
+    """获取进程级共享的监控文件夹（同一目录只有一个实例，状态文件按目录路径区分）"""
+    folder = os.path.abspath(folder)
+    with _watchers_lock:
+        if folder not in _watchers:
+            state_name = hashlib.sha256(folder.encode('utf-8')).hexdigest()[:16]
+            _watchers[folder] = WatchFolder(
+                folder,
+                state_file=os.path.join(WATCH_CONFIG['state_dir'], f"{state_name}.json"),
+                recursive=WATCH_CONFIG['recursive'],
+                settle_seconds=WATCH_CONFIG['settle_seconds']
+            )
+        return _watchers[folder]
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+模型健康监控
+被动记录每次分析请求的结果和耗时；可选的后台线程定期用最小请求探测所选模型和备用模型
+（与分析请求共用限流器和熔断器）。按滚动窗口统计每个模型的可用率和响应耗时，
+降级时按评分重新排列备用模型，优先尝试最可能快速应答的模型
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+from config import HEALTH_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class ModelHealthMonitor:
+    """滚动窗口内每个模型最近 window 次分析请求和最近 window 次探测的 (是否成功, 耗时)
+
+    探测请求很短，耗时与分析请求不可比，两者分开统计；有分析请求数据的模型按其评分，否则按探测结果。
+    启用后台探测时每 interval 秒探测一轮。
+    """
+
+    def __init__(self, interval: float = 300, window: int = 10, failure_penalty: float = 15):
+        self.interval = interval
+        self.window = window
+        # 探测失败的代价（秒），与降级请求的超时时间相当
+        self.failure_penalty = failure_penalty
+        self._lock = threading.Lock()
+        self._stats: Dict[str, "deque[tuple]"] = {}
+        self._requests: Dict[str, "deque[tuple]"] = {}
+        self._client = None
+        self._models: List[str] = []
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_probe: Optional[float] = None
+
+    def _append(self, stats: Dict[str, "deque[tuple]"], model: str, success: bool, latency: float):
+        with self._lock:
+            samples = stats.get(model)
+            if samples is None:
+                samples = stats[model] = deque(maxlen=self.window)
+            samples.append((success, latency))
+
+    def record(self, model: str, success: bool, latency: float):
+        """记录一次探测结果"""
+        self._append(self._stats, model, success, latency)
+
+    def observe(self, model: str, success: bool, latency: float):
+        """记录一次分析请求的结果和耗时（由API客户端在每次请求结束时调用，被取消的请求不记录）"""
+        self._append(self._requests, model, success, latency)
+
+    def _samples(self, model: str):
+        return self._requests.get(model) or self._stats.get(model)
+
+    def _summarize(self, samples) -> tuple:
+        """(可用率, 成功探测的平均耗时或None, 预计耗时)"""
+        if not samples:
+            return None, None, self.failure_penalty
+        latencies = [latency for success, latency in samples if success]
+        availability = len(latencies) / len(samples)
+        latency = sum(latencies) / len(latencies) if latencies else None
+        return availability, latency, (latency or self.failure_penalty) + (1 - availability) * self.failure_penalty
+
+    def expected_cost(self, model: str) -> float:
+        """预计得到应答的耗时：成功请求的平均耗时 + 失败率 × 失败代价；没有数据时按一次失败代价估计"""
+        with self._lock:
+            return self._summarize(self._samples(model))[2]
+
+    def rank(self, models: List[str]) -> List[str]:
+        """按预计耗时从低到高排列模型（评分相同时保持原顺序，因此没有任何数据时保持配置顺序）"""
+        return sorted(models, key=self.expected_cost)
+
+    def watch(self, client, models: List[str]):
+        """设置探测用的API客户端和模型列表，后台线程未运行时启动
+
+        没有API密钥（或只有占位密钥）时不探测；已有其他密钥的客户端时保留原客户端，
+        不用最近一个会话的密钥探测。
+        """
+        if not client.has_credentials():
+            return
+        with self._lock:
+            if self._client is not None and self._client.api_key != client.api_key:
+                return
+            self._client = client
+            self._models = list(dict.fromkeys(models))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='model-health-monitor', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """停止后台探测（已收集的统计保留，之后可以再次 watch）"""
+        with self._lock:
+            self._client = None
+            self._models = []
+        self._wakeup.set()
+
+    def watching(self) -> bool:
+        """后台探测是否在运行"""
+        with self._lock:
+            return self._client is not None and self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._client is None:
+                    return
+            self.probe_all()
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def probe_all(self):
+        """探测一轮所有模型（已停止探测时不做任何事）"""
+        with self._lock:
+            client, models = self._client, list(self._models)
+        if client is None:
+            return
+        for model in models:
+            result = client.health_check(model)
+            if result.get('status') == 'skipped':
+                # 熔断中或限流中的模型本轮不探测，不计入统计
+                continue
+            success = result.get('status') == 'healthy'
+            self.record(model, success, result.get('response_time', self.failure_penalty))
+            if not success:
+                logger.info(f"模型探测失败 {model}: {result.get('error') or result.get('status_code')}")
+        self.last_probe = time.time()
+
+    def probe_now(self):
+        """立即开始下一轮探测"""
+        self._wakeup.set()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """各模型的分析请求数、探测次数，以及排序所依据数据的可用率、平均耗时和预计耗时，用于监控"""
+        snapshot = {}
+        with self._lock:
+            for model in dict.fromkeys([*self._requests, *self._stats]):
+                availability, latency, cost = self._summarize(self._samples(model))
+                snapshot[model] = {
+                    'requests': len(self._requests.get(model, ())),
+                    'probes': len(self._stats.get(model, ())),
+                    'availability': availability,
+                    'latency': latency,
+                    'expected_cost': cost
+                }
+        return snapshot
+
+
+_monitor: Optional[ModelHealthMonitor] = None
+_monitor_lock = threading.Lock()
+
+
+def get_health_monitor() -> ModelHealthMonitor:
+    """获取进程级共享的模型健康监控"""
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = ModelHealthMonitor(
+                HEALTH_CONFIG['probe_interval'],
+                window=HEALTH_CONFIG['window'],
+                failure_penalty=HEALTH_CONFIG['failure_penalty']
+            )
+        return _monitor
@@ -0,0 +1,463 @@
+# -*- coding: utf-8 -*-
+"""
+PDF文本提取模块
+使用常驻进程池并行解析简历PDF，避免CPU密集的解析阻塞Streamlit脚本线程；
+每个文件的解析受超时和内存预算约束，异常文件不会拖住整个批次
+"""
+
+import io
+import os
+import time
+import atexit
+import logging
+import threading
+import multiprocessing
+import multiprocessing.connection
+from collections import deque
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple, Hashable
+
+import PyPDF2
+
+from config import FILE_CONFIG
+from text_normalizer import estimate_tokens, normalize_pages, text_stats
+from resume_segmenter import segment_text
+
+logger = logging.getLogger(__name__)
+
+
+def read_pdf_bytes(pdf_file) -> bytes:
+    """读取上传文件/文件对象/字节串的完整内容"""
+    if isinstance(pdf_file, (bytes, bytearray)):
+        return bytes(pdf_file)
+    if hasattr(pdf_file, 'getvalue'):
+        return pdf_file.getvalue()
+    pdf_file.seek(0)
+    return pdf_file.read()
+
+
+def _failed_result(status: str, error: str) -> Dict[str, Any]:
+    """构造结构化的提取失败结果"""
+    return {'text': '', 'text_stats': text_stats('', ''), 'segments': [], 'content_kind': 'empty', 'image_count': 0,
+            'page_count': 0, 'pages_parsed': 0, 'pages_skipped': 0, 'truncated': False,
+            'error': error, 'status': status}
+
+
+def inspect_page_content(page) -> Tuple[bool, int]:
+    """检查页面资源字典：是否引用了字体（无字体的页面不可能包含可提取文本）以及图片数量"""
+    resources = page.get('/Resources')
+    resources = resources.get_object() if resources is not None else {}
+    has_fonts = bool(resources.get('/Font'))
+    image_count = 0
+    xobjects = resources.get('/XObject')
+    if xobjects is not None:
+        for xobject in xobjects.get_object().values():
+            xobject = xobject.get_object()
+            subtype = xobject.get('/Subtype')
+            if subtype == '/Image':
+                image_count += 1
+            elif subtype == '/Form':
+                form_resources = xobject.get('/Resources')
+                if form_resources is not None and form_resources.get_object().get('/Font'):
+                    has_fonts = True
+    return has_fonts, image_count
+
+
+def iter_pdf_pages(pdf_reader: PyPDF2.PdfReader, max_pages: int = 0) -> Iterator[Tuple[str, int]]:
+    """逐页生成 (页面文本, 图片数)，max_pages>0 时只解析前N页
+
+    没有字体资源的页面（扫描件）直接跳过文本解析。
+    """
+    for index, page in enumerate(pdf_reader.pages):
+        if max_pages and index >= max_pages:
+            return
+        has_fonts, image_count = inspect_page_content(page)
+        yield (page.extract_text() or "") if has_fonts else "", image_count
+
+
+def classify_content(raw_text: str, pages_parsed: int, image_count: int, min_chars_per_page: int) -> str:
+    """根据每页文本密度判断PDF类型：'text'、'image_only'（扫描件，需OCR）或 'empty'"""
+    if not min_chars_per_page or not pages_parsed:
+        return 'text' if raw_text else 'empty'
+    density = len(''.join(raw_text.split())) / pages_parsed
+    if density >= min_chars_per_page:
+        return 'text'
+    return 'image_only' if image_count else 'empty'
+
+
+def extract_pdf_text(pdf_bytes: bytes, max_pages: int = 0, max_chars: int = 0, max_tokens: int = 0,
+                     min_chars_per_page: int = 0) -> Dict[str, Any]:
+    """从PDF字节内容中提取文本
+
+    逐页解析，达到页数、字符或token预算后立即停止，剩余页面不再解析（0表示不限制）；
+    解析出的文本经过规范化（去除页眉页脚、页码、重复行等），text_stats记录规范化前后的长度，
+    segments为段落索引 [(段落类型, 起始偏移, 结束偏移)]；
+    每页文本密度低于 min_chars_per_page 的文件标记为图片型（content_kind='image_only'）或空文件。
+    该函数为模块级函数，可以被进程池序列化后在子进程中执行；
+    通常应通过 PDFExtractionPool 在受限子进程中调用。
+    返回 {'text', 'text_stats', 'segments', 'content_kind', 'image_count', 'page_count'(总页数),
+          'pages_parsed', 'pages_skipped', 'truncated', 'error'}
+    """
+    try:
+        pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+        page_count = len(pdf_reader.pages)
+        page_texts = []
+        pages_parsed = 0
+        total_chars = 0
+        total_tokens = 0
+        image_count = 0
+        truncated = False
+        for page_text, page_images in iter_pdf_pages(pdf_reader, max_pages):
+            pages_parsed += 1
+            image_count += page_images
+            if max_chars and total_chars + len(page_text) > max_chars:
+                # total_chars 含页间换行，可能已超过 max_chars
+                remaining = max(0, max_chars - total_chars)
+                if remaining:
+                    page_texts.append(page_text[:remaining])
+                truncated = True
+                break
+            page_texts.append(page_text)
+            total_chars += len(page_text) + 1
+            if max_tokens:
+                total_tokens += estimate_tokens(page_text)
+                if total_tokens >= max_tokens:
+                    break
+        raw_text = "\n".join(page_texts).strip()
+        text = normalize_pages(page_texts)
+        return {
+            'text': text,
+            'text_stats': text_stats(raw_text, text),
+            'segments': segment_text(text),
+            'content_kind': classify_content(raw_text, pages_parsed, image_count, min_chars_per_page),
+            'image_count': image_count,
+            'page_count': page_count,
+            'pages_parsed': pages_parsed,
+            'pages_skipped': page_count - pages_parsed,
+            'truncated': truncated or pages_parsed < page_count,
+            'error': None
+        }
+    except MemoryError:
+        # 子进程的地址空间上限（见 _limit_address_space）阻止了超大分配
+        return _failed_result('memory_exceeded', "解析内存超限（分配失败）")
+    except Exception as e:
+        return _failed_result('extraction_failed', str(e))
+
+
+def _limit_address_space(max_bytes: int):
+    """设置当前进程的地址空间上限（仅POSIX），轮询间隔内的瞬时大分配直接失败而不是耗尽内存"""
+    try:
+        import resource
+    except ImportError:
+        # Windows 没有 resource 模块，只依靠父进程轮询RSS
+        return
+    try:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            max_bytes = min(max_bytes, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (max_bytes, hard))
+    except (ValueError, OSError) as e:
+        logger.warning(f"无法设置解析进程的内存上限: {e}")
+
+
+def _extraction_worker(conn, options: Dict[str, Any], max_memory_bytes: int = 0):
+    """子进程主循环：逐个接收PDF字节并返回提取结果，收到None时退出"""
+    if max_memory_bytes:
+        _limit_address_space(max_memory_bytes)
+    while True:
+        try:
+            pdf_bytes = conn.recv()
+        except (EOFError, OSError):
+            break
+        except MemoryError:
+            # 文件本身超出地址空间上限，管道中的剩余数据无法再读取，报告后退出
+            conn.send(_failed_result('memory_exceeded', "解析内存超限（文件过大）"))
+            break
+        if pdf_bytes is None:
+            break
+        conn.send(extract_pdf_text(pdf_bytes, **options))
+
+
+def extraction_options() -> Dict[str, Any]:
+    """从FILE_CONFIG读取提取参数（页数/字符/token上限、图片型PDF判定阈值）"""
+    return {
+        'max_pages': FILE_CONFIG.get('max_pages', 0),
+        'max_chars': FILE_CONFIG.get('max_text_chars', 0),
+        'max_tokens': FILE_CONFIG.get('max_text_tokens', 0),
+        'min_chars_per_page': FILE_CONFIG.get('min_chars_per_page', 0)
+    }
+
+
+def _get_process_rss(pid: int) -> Optional[int]:
+    """读取进程常驻内存(RSS，字节)，无法读取时返回None"""
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except ImportError:
+        pass
+    except Exception:
+        return None
+    try:
+        with open(f"/proc/{pid}/status", 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class _SandboxWorker:
+    """单个解析子进程及其通信管道"""
+
+    def __init__(self, ctx, options: Dict[str, Any], max_memory_bytes: int = 0):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_extraction_worker, args=(child_conn, options, max_memory_bytes),
+                                   daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.task_key = None
+        self.started_at = 0.0
+
+    def submit(self, task_key, pdf_bytes: bytes):
+        self.task_key = task_key
+        self.started_at = time.monotonic()
+        self.conn.send(pdf_bytes)
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.join(timeout=1)
+        except Exception:
+            pass
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+            self.process.join(timeout=2)
+        except Exception:
+            pass
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self.conn.close()
+
+
+class PDFExtractionPool:
+    """常驻的PDF解析进程池，跨Streamlit重跑复用
+
+    每个文件在独立的子进程中解析，并受墙钟超时和内存(RSS)预算约束，
+    POSIX 系统上子进程的地址空间同时被限制在内存预算内，轮询间隔内的瞬时大分配直接失败；
+    超出预算的子进程会被强制结束并替换，该文件返回结构化的失败结果，批次中其余文件不受影响。
+    结果中的 status 字段为 'ok'、'extraction_failed'、'timeout' 或 'memory_exceeded'。
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, timeout: float = 30,
+                 max_memory_mb: int = 512, poll_interval: float = 0.2,
+                 options: Optional[Dict[str, Any]] = None):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.options = options or {}
+        self.timeout = timeout
+        self.max_memory_bytes = max_memory_mb * 1024 * 1024 if max_memory_mb else 0
+        self.poll_interval = poll_interval
+        self._ctx = multiprocessing.get_context('spawn')
+        self._idle: List[_SandboxWorker] = []
+        self._worker_count = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def _acquire_worker(self, block: bool) -> Optional[_SandboxWorker]:
+        """借出一个空闲子进程，不足时按需启动新进程"""
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("PDF解析进程池已关闭")
+                if self._idle:
+                    return self._idle.pop()
+                if self._worker_count < self.max_workers:
+                    self._worker_count += 1
+                    break
+                if not block:
+                    return None
+                self._cond.wait()
+        try:
+            return _SandboxWorker(self._ctx, self.options, self.max_memory_bytes)
+        except Exception:
+            with self._cond:
+                self._worker_count -= 1
+                self._cond.notify()
+            raise
+
+    def _release_worker(self, worker: _SandboxWorker):
+        worker.task_key = None
+        with self._cond:
+            if self._closed:
+                worker.stop()
+                self._worker_count -= 1
+            else:
+                self._idle.append(worker)
+            self._cond.notify()
+
+    def _discard_worker(self, worker: _SandboxWorker):
+        """强制结束子进程（超时/超内存/崩溃），释放其名额"""
+        worker.kill()
+        with self._cond:
+            self._worker_count -= 1
+            self._cond.notify()
+
+    def _check_budget(self, worker: _SandboxWorker, now: float) -> Optional[Dict[str, Any]]:
+        """检查子进程是否超出时间或内存预算"""
+        if self.timeout and now - worker.started_at > self.timeout:
+            return _failed_result('timeout', f"解析超时（超过 {self.timeout} 秒）")
+        if self.max_memory_bytes:
+            rss = _get_process_rss(worker.process.pid)
+            if rss is not None and rss > self.max_memory_bytes:
+                return _failed_result('memory_exceeded',
+                                      f"解析内存超限（{rss // (1024 * 1024)}MB > {self.max_memory_bytes // (1024 * 1024)}MB）")
+        return None
+
+    def extract(self, pdf_bytes: bytes) -> Dict[str, Any]:
+        """在子进程中提取单个PDF"""
+        for _, result in self.extract_many([(0, pdf_bytes)]):
+            return result
+
+    def extract_many(self, items: Iterable[Tuple[Hashable, bytes]]) -> Iterator[Tuple[Hashable, Dict[str, Any]]]:
+        """批量提取PDF文本，按完成顺序逐个返回 (key, result)
+
+        items 可以是惰性迭代器：只有在有空闲子进程时才读取下一个文件，
+        因此同一时刻驻留内存的PDF不超过工作进程数。
+        """
+        pending = iter(items)
+        exhausted = False
+        busy: Dict[Any, _SandboxWorker] = {}
+        try:
+            while not exhausted or busy:
+                # 分配任务：没有进行中的任务时阻塞等待空闲进程，否则只取现成的
+                while not exhausted:
+                    worker = self._acquire_worker(block=not busy)
+                    if worker is None:
+                        break
+                    try:
+                        task_key, pdf_bytes = next(pending)
+                    except StopIteration:
+                        exhausted = True
+                        self._release_worker(worker)
+                        break
+                    except BaseException:
+                        self._release_worker(worker)
+                        raise
+                    try:
+                        worker.submit(task_key, pdf_bytes)
+                    except (OSError, ValueError) as e:
+                        self._discard_worker(worker)
+                        yield task_key, _failed_result('extraction_failed', f"解析进程异常: {str(e)}")
+                        continue
+                    busy[worker.conn] = worker
+
+                if not busy:
+                    continue
+
+                for conn in multiprocessing.connection.wait(list(busy), timeout=self.poll_interval):
+                    worker = busy.pop(conn)
+                    task_key = worker.task_key
+                    try:
+                        result = conn.recv()
+                    except (EOFError, OSError) as e:
+                        self._discard_worker(worker)
+                        yield task_key, _failed_result('extraction_failed', f"解析进程异常退出: {str(e) or 'EOF'}")
+                        continue
+                    if result.get('status') == 'memory_exceeded':
+                        # 触及地址空间上限的子进程可能已退出或内存碎片化，换一个新进程
+                        self._discard_worker(worker)
+                    else:
+                        self._release_worker(worker)
+                    result.setdefault('status', 'extraction_failed' if result['error'] else 'ok')
+                    yield task_key, result
+
+                now = time.monotonic()
+                for conn, worker in list(busy.items()):
+                    failure = self._check_budget(worker, now)
+                    if failure is not None:
+                        del busy[conn]
+                        logger.warning(f"PDF解析超出预算，已终止子进程: {failure['error']}")
+                        self._discard_worker(worker)
+                        yield worker.task_key, failure
+        finally:
+            # 调用方提前停止迭代时，进行中的子进程无法取消，直接终止
+            for worker in busy.values():
+                self._discard_worker(worker)
+
+    def shutdown(self):
+        """关闭进程池"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._worker_count -= len(idle)
+            self._cond.notify_all()
+        for worker in idle:
+            worker.stop()
+
+
+_pool: Optional[PDFExtractionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_extraction_pool() -> PDFExtractionPool:
+    """获取进程级共享的PDF解析进程池"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PDFExtractionPool(
+                FILE_CONFIG.get('extraction_workers') or None,
+                timeout=FILE_CONFIG['extraction_timeout'],
+                max_memory_mb=FILE_CONFIG['extraction_max_memory_mb'],
+                options=extraction_options()
+            )
+            atexit.register(_pool.shutdown)
+        return _pool
+
+
+def extract_document(pdf_bytes: bytes, cache=None, pool: Optional[PDFExtractionPool] = None) -> Dict[str, Any]:
+    """提取单个PDF（在受限子进程中执行），命中缓存时跳过PyPDF2解析"""
+    key = cache.key_for(pdf_bytes) if cache is not None else None
+    result = cache.get(key) if cache is not None else None
+    cached = result is not None
+    if result is None:
+        result = (pool or get_extraction_pool()).extract(pdf_bytes)
+        if cache is not None:
+            cache.put(key, result)
+    return {**result, 'sha256': key, 'cached': cached}
+
+
+def extract_documents(items: Iterable[Tuple[Hashable, bytes]], cache=None,
+                      pool: Optional[PDFExtractionPool] = None) -> Iterator[Tuple[Hashable, Dict[str, Any]]]:
+    """批量提取PDF：缓存命中的直接返回，其余交给进程池并按完成顺序返回
+
+    items 按需惰性读取，适用于压缩包等流式来源。
+    """
+    hashes = {}
+    ready = deque()
+
+    def _misses():
+        for item_key, pdf_bytes in items:
+            if cache is None:
+                yield item_key, pdf_bytes
+                continue
+            digest = cache.key_for(pdf_bytes)
+            result = cache.get(digest)
+            if result is not None:
+                ready.append((item_key, {**result, 'sha256': digest, 'cached': True}))
+            else:
+                hashes[item_key] = digest
+                yield item_key, pdf_bytes
+
+    pool = pool or get_extraction_pool()
+    for item_key, result in pool.extract_many(_misses()):
+        while ready:
+            yield ready.popleft()
+        digest = hashes.pop(item_key, None)
+        if cache is not None:
+            cache.put(digest, result)
+        yield item_key, {**result, 'sha256': digest, 'cached': False}
+    while ready:
+        yield ready.popleft()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+上传后的预处理
+文件一上传就在后台线程中提取文本（结果写入提取缓存），可选地预先调用AI分析；
+用户点击“开始分析”时直接复用已完成的结果，只处理剩余的文件。
+上传文件或分析上下文变化时，旧批次被取消并丢弃，已在进行中的单个文件处理完即停止。
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, Any, Iterable, Optional, Tuple
+
+from pdf_extractor import extract_documents
+from extraction_cache import get_extraction_cache
+
+logger = logging.getLogger(__name__)
+
+
+class SpeculativeBatch:
+    """一批上传文件的后台预处理：提取文本，并按需对文本型简历调用 analyze(文件名, 提取结果)"""
+
+    def __init__(self, key: str, sources: Iterable[Tuple[str, bytes]],
+                 analyze: Optional[Callable[[str, Dict[str, Any]], Optional[Dict[str, Any]]]] = None):
+        self.key = key
+        self._sources = sources
+        self._analyze = analyze
+        self._cond = threading.Condition()
+        self._cancelled = threading.Event()
+        # 用户已开始正式分析：不再启动新的AI分析，进行中的分析完成后交给前台
+        self._handed_over = threading.Event()
+        # 提取结果的sha256 -> 分析结果
+        self._analyses: Dict[str, Dict[str, Any]] = {}
+        self._in_flight: Optional[str] = None
+        self.extracted = 0
+        self.analyzed = 0
+        self.done = False
+        self._thread = threading.Thread(target=self._run, name='speculative-batch', daemon=True)
+
+    def start(self) -> 'SpeculativeBatch':
+        self._thread.start()
+        return self
+
+    def _iter_sources(self):
+        for file_name, pdf_bytes in self._sources:
+            if self._cancelled.is_set() or self._handed_over.is_set():
+                return
+            yield file_name, pdf_bytes
+
+    def _run(self):
+        try:
+            # 提取结果由 extract_documents 写入提取缓存，正式分析时即为缓存命中
+            for file_name, extraction in extract_documents(self._iter_sources(), cache=get_extraction_cache()):
+                self.extracted += 1
+                if (self._analyze is None or self._cancelled.is_set() or self._handed_over.is_set()
+                        or not extraction['text'] or extraction['content_kind'] != 'text'):
+                    continue
+                digest = extraction['sha256']
+                with self._cond:
+                    if digest in self._analyses:
+                        continue
+                    self._in_flight = digest
+                try:
+                    result = self._analyze(file_name, extraction)
+                except Exception as e:
+                    logger.warning(f"预分析失败 {file_name}: {e}")
+                    result = None
+                with self._cond:
+                    self._in_flight = None
+                    # 失败的结果不保留，正式分析时重新调用
+                    if result is not None and result.get('analysis_status') != 'default' and not self._cancelled.is_set():
+                        self._analyses[digest] = result
+                        self.analyzed += 1
+                    self._cond.notify_all()
+        except Exception as e:
+            logger.warning(f"预处理中止: {e}")
+        finally:
+            with self._cond:
+                self.done = True
+                self._cond.notify_all()
+
+    def hand_over(self):
+        """正式分析开始：后台只完成正在进行的提取和分析，剩余文件由前台处理"""
+        self._handed_over.set()
+
+    def take_analysis(self, digest: str) -> Optional[Dict[str, Any]]:
+        """取出预分析结果；该文件正在后台分析时等待其完成，避免重复调用API"""
+        with self._cond:
+            while self._in_flight == digest and not self._cancelled.is_set():
+                self._cond.wait()
+            return self._analyses.pop(digest, None)
+
+    def cancel(self):
+        """丢弃该批次：不再处理新文件，已完成的结果全部作废"""
+        self._cancelled.set()
+        with self._cond:
+            self._analyses.clear()
+            self._cond.notify_all()
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+AI分析结果缓存
+以 模型/温度/提示词模板版本/岗位配置/简历文本哈希 为键缓存成功的分析结果，
+同一份简历针对同一岗位重复分析时不再调用API；内存LRU在前，磁盘JSON文件在后，条目超过TTL后失效
+"""
+
+import os
+import copy
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from config import CACHE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# 缓存条目格式变化时递增
+CACHE_FORMAT_VERSION = 1
+
+
+class ResponseCache:
+    """两级分析结果缓存：内存LRU（max_memory_entries条）+ 磁盘（max_disk_entries条），ttl秒后过期（0为不过期）"""
+
+    def __init__(self, cache_dir: str, ttl: float = 3600, max_memory_entries: int = 100,
+                 max_disk_entries: int = 5000):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> (写入时间, 分析结果)
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        # 磁盘条目，按写入时间从旧到新排列
+        self._disk_index: "OrderedDict[str, None]" = OrderedDict()
+        self._load_index()
+
+    @staticmethod
+    def key_for(model_config: Dict[str, Any], job_config: Dict[str, Any], resume_text: str,
+                prompt_version: int) -> str:
+        """计算缓存键"""
+        key_data = {
+            'model': model_config.get('model'),
+            'temperature': model_config.get('temperature'),
+            'max_tokens': model_config.get('max_tokens'),
+            'prompt_version': prompt_version,
+            'job_config': job_config,
+            'resume': hashlib.sha256(resume_text.encode('utf-8')).hexdigest()
+        }
+        return hashlib.sha256(json.dumps(key_data, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _load_index(self):
+        """扫描缓存目录，按修改时间重建磁盘索引"""
+        entries = []
+        if os.path.isdir(self.cache_dir):
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    if not name.endswith('.json'):
+                        continue
+                    try:
+                        entries.append((os.path.getmtime(os.path.join(root, name)), name[:-5]))
+                    except OSError:
+                        continue
+        for _, key in sorted(entries):
+            self._disk_index[key] = None
+
+    def _expired(self, created_at: float) -> bool:
+        return bool(self.ttl) and time.time() - created_at > self.ttl
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存：先查内存，再查磁盘（磁盘命中后提升到内存）"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None and key in self._disk_index:
+                entry = self._read_disk(key)
+                if entry is not None:
+                    self._remember(key, entry)
+            if entry is None or self._expired(entry[0]):
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._memory.move_to_end(key)
+            self.hits += 1
+            # 返回副本，调用方修改结果（如候选人姓名）不影响缓存
+            return copy.deepcopy(entry[1])
+
+    def _read_disk(self, key: str) -> Optional[tuple]:
+        try:
+            with open(self._path_for(key), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != CACHE_FORMAT_VERSION:
+                raise ValueError("缓存版本不匹配")
+            return data['created_at'], data['result']
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"分析结果缓存读取失败，已丢弃: {key[:12]} ({e})")
+            self._remove(key)
+            return None
+
+    def _remember(self, key: str, entry: tuple):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """写入分析结果（默认评分等失败结果不缓存）"""
+        if result.get('analysis_status') == 'default':
+            return
+        created_at = time.time()
+        result = copy.deepcopy(result)
+        data = json.dumps({'version': CACHE_FORMAT_VERSION, 'created_at': created_at, 'result': result},
+                          ensure_ascii=False)
+        path = self._path_for(key)
+        with self._lock:
+            self._remember(key, (created_at, result))
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"分析结果缓存写入失败: {e}")
+                return
+            self._disk_index.pop(key, None)
+            self._disk_index[key] = None
+            while len(self._disk_index) > self.max_disk_entries:
+                self._remove(next(iter(self._disk_index)))
+
+    def _remove(self, key: str):
+        self._memory.pop(key, None)
+        if key in self._disk_index:
+            del self._disk_index[key]
+            try:
+                os.remove(self._path_for(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        """清空缓存并重置计数"""
+        with self._lock:
+            self._memory.clear()
+            for key in list(self._disk_index):
+                self._remove(key)
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计信息"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'memory_entries': len(self._memory),
+                'disk_entries': len(self._disk_index)
+            }
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """获取进程级共享的分析结果缓存"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                CACHE_CONFIG['cache_dir'],
+                ttl=CACHE_CONFIG['cache_ttl'],
+                max_memory_entries=CACHE_CONFIG['max_cache_size'],
+                max_disk_entries=CACHE_CONFIG['max_disk_entries']
+            )
+        return _cache
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+近似重复简历检测
+基于规范化文本的MinHash签名和LSH分桶索引，同一候选人通过不同渠道投递的略有差异的简历可直接复用已有分析结果
+"""
+
+import os
+import json
+import zlib
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from config import DEDUP_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# 固定随机种子，保证签名在不同进程和会话之间一致，可持久化
+_SEED = 20240601
+
+
+def _shingles(text: str, size: int) -> set:
+    """去除空白后按字符n-gram切片（同时适用于中英文）"""
+    compact = ''.join(text.split()).lower()
+    if len(compact) <= size:
+        return {compact} if compact else set()
+    return {compact[i:i + size] for i in range(len(compact) - size + 1)}
+
+
+def _choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """选择LSH分带参数 (bands, rows)：使候选阈值 (1/b)^(1/r) 不高于相似度阈值且尽量接近"""
+    best = (num_perm, 1)
+    best_gap = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        candidate_threshold = (1.0 / bands) ** (1.0 / rows)
+        if candidate_threshold > threshold:
+            continue
+        gap = threshold - candidate_threshold
+        if best_gap is None or gap < best_gap:
+            best, best_gap = (bands, rows), gap
+    return best
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH近似重复索引，条目按分析上下文（岗位+模型配置）隔离并持久化到磁盘"""
+
+    def __init__(self, index_file: Optional[str] = None, threshold: float = 0.85, num_perm: int = 128,
+                 shingle_size: int = 5, max_entries: int = 5000):
+        self.index_file = index_file
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.max_entries = max_entries
+        self.bands, self.rows = _choose_bands(num_perm, threshold)
+        rng = np.random.RandomState(_SEED)
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._lock = threading.Lock()
+        # entry_id -> {'context', 'signature', 'payload'}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # (context, band_index, band_hash) -> [entry_id]
+        self._buckets: Dict[Tuple[str, int, int], List[str]] = defaultdict(list)
+        self._load()
+
+    def signature(self, text: str) -> np.ndarray:
+        """计算文本的MinHash签名"""
+        shingles = _shingles(text, self.shingle_size)
+        if not shingles:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+        permuted = ((np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE_PRIME) & _MAX_HASH
+        return permuted.min(axis=1)
+
+    @staticmethod
+    def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+        """由签名估算Jaccard相似度"""
+        return float(np.mean(sig_a == sig_b))
+
+    def _band_keys(self, context: str, signature: np.ndarray):
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows]
+            yield (context, band, hash(chunk.tobytes()))
+
+    def query(self, signature: np.ndarray, context: str) -> Optional[Tuple[str, float, Dict[str, Any]]]:
+        """查找同一分析上下文中最相似的已有条目，返回 (entry_id, 相似度, payload)"""
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(context, signature):
+                candidates.update(self._buckets.get(key, ()))
+            best = None
+            for entry_id in candidates:
+                entry = self._entries.get(entry_id)
+                if entry is None:
+                    continue
+                score = self.similarity(signature, entry['signature'])
+                if score >= self.threshold and (best is None or score > best[1]):
+                    best = (entry_id, score, entry['payload'])
+            return best
+
+    def add(self, entry_id: str, signature: np.ndarray, context: str, payload: Dict[str, Any]):
+        """加入索引（payload为可复用的分析结果）"""
+        with self._lock:
+            self._remove(entry_id)
+            self._entries[entry_id] = {'context': context, 'signature': signature, 'payload': payload}
+            for key in self._band_keys(context, signature):
+                self._buckets[key].append(entry_id)
+            # 超出上限时淘汰最早加入的条目
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id: str):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for key in self._band_keys(entry['context'], entry['signature']):
+            bucket = self._buckets.get(key)
+            if bucket and entry_id in bucket:
+                bucket.remove(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+        self.save()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _load(self):
+        if not self.index_file or not os.path.exists(self.index_file):
+            return
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('num_perm') != self.num_perm or data.get('shingle_size') != self.shingle_size:
+                logger.info("近似重复索引参数已变化，忽略旧索引")
+                return
+            for entry_id, entry in data.get('entries', {}).items():
+                self.add(entry_id, np.array(entry['signature'], dtype=np.uint64), entry['context'], entry['payload'])
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"近似重复索引加载失败: {e}")
+
+    def save(self):
+        """持久化索引（写临时文件后原子替换）"""
+        if not self.index_file:
+            return
+        with self._lock:
+            data = {
+                'num_perm': self.num_perm,
+                'shingle_size': self.shingle_size,
+                'entries': {
+                    entry_id: {
+                        'context': entry['context'],
+                        'signature': entry['signature'].tolist(),
+                        'payload': entry['payload']
+                    }
+                    for entry_id, entry in self._entries.items()
+                }
+            }
+        try:
+            tmp_path = f"{self.index_file}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_file)
+        except OSError as e:
+            logger.warning(f"近似重复索引保存失败: {e}")
+
+
+_index: Optional[NearDuplicateIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_dedup_index() -> NearDuplicateIndex:
+    """获取进程级共享的近似重复索引"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = NearDuplicateIndex(
+                DEDUP_CONFIG['index_file'],
+                threshold=DEDUP_CONFIG['jaccard_threshold'],
+                num_perm=DEDUP_CONFIG['num_perm'],
+                shingle_size=DEDUP_CONFIG['shingle_size'],
+                max_entries=DEDUP_CONFIG['max_entries']
+            )
+        return _index
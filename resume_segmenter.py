@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+简历分段
+基于中英文标题启发式规则，将简历文本切分为 教育/工作经验/技能/项目/其他 五类段落，
+用于只向提示词提供与评分维度相关的内容，压缩长简历的token
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from config import SCORING_DIMENSIONS
+from text_normalizer import estimate_tokens
+
+# 分段规则变化时递增，作为提取缓存签名的一部分
+SEGMENTER_VERSION = 2
+
+SECTION_NAMES = {
+    'education': '教育背景',
+    'experience': '工作经验',
+    'skills': '技能',
+    'projects': '项目经验',
+    'other': '其他信息'
+}
+
+SECTION_HEADINGS = {
+    'education': [
+        '教育背景', '教育经历', '学习经历', '教育', '学历',
+        'education', 'educational background', 'academic background'
+    ],
+    'experience': [
+        '工作经历', '工作经验', '实习经历', '实习经验', '职业经历', '工作履历', '任职经历',
+        'work experience', 'professional experience', 'employment history', 'work history',
+        'employment', 'experience', 'internships', 'internship'
+    ],
+    'skills': [
+        '专业技能', '技能特长', '个人技能', '技能证书', '技术栈', '技能', '资格证书', '证书', '语言能力',
+        'technical skills', 'skill set', 'skills', 'certifications', 'certificates', 'languages'
+    ],
+    'projects': [
+        '项目经验', '项目经历', '项目', '科研经历', '研究经历', '科研项目',
+        'project experience', 'projects', 'research experience', 'research'
+    ],
+    'other': [
+        '个人信息', '基本信息', '自我评价', '个人评价', '个人总结', '获奖情况', '荣誉奖项', '获奖经历',
+        '兴趣爱好', '求职意向', '校园经历', '社会实践',
+        'personal information', 'about me', 'summary', 'profile', 'objective', 'awards', 'honors',
+        'interests', 'activities'
+    ]
+}
+
+# 标题行的最大长度（去除修饰符后）
+_MAX_HEADING_LENGTH = 30
+# 标题关键字后的括号补充说明允许的字符数（如 “工作经历（3年）”）
+_HEADING_SUFFIX = 16
+# 中英对照标题之间的分隔符（如 “教育背景 / Education”）
+_BILINGUAL_SEPARATORS = ' /|-–—·'
+_DECORATION_RE = re.compile(r'^[\s#*•·●■◆▶►\-–—|【\[（(]+|[\s:：*|】\]）)]+$')
+
+_KEYWORDS: List[Tuple[str, str]] = sorted(
+    ((keyword, section) for section, keywords in SECTION_HEADINGS.items() for keyword in keywords),
+    key=lambda item: -len(item[0])
+)
+_KEYWORD_SET = {keyword for keyword, _ in _KEYWORDS}
+
+
+def detect_heading(line: str) -> Optional[str]:
+    """判断一行是否为段落标题，是则返回段落类型"""
+    cleaned = _DECORATION_RE.sub('', line.strip()).lower()
+    if not cleaned or len(cleaned) > _MAX_HEADING_LENGTH:
+        return None
+    for keyword, section in _KEYWORDS:
+        if cleaned == keyword:
+            return section
+        if cleaned.startswith(keyword):
+            rest = cleaned[len(keyword):].lstrip(_BILINGUAL_SEPARATORS)
+            # 允许括号补充说明，或本身就是另一种语言标题关键字的对照标题（“教育背景 Education”）；
+            # “Skills: Python”、“Experience 3年Java开发” 这类行内字段和以关键字开头的正文不算标题
+            if rest[:1] in ('(', '（') and len(cleaned) - len(keyword) <= _HEADING_SUFFIX:
+                return section
+            if rest in _KEYWORD_SET and rest.isascii() != keyword.isascii():
+                return section
+    return None
+
+
+def segment_text(text: str) -> List[Tuple[str, int, int]]:
+    """切分简历文本，返回段落索引 [(段落类型, 起始偏移, 结束偏移)]，第一个标题之前的内容归为 other"""
+    spans: List[Tuple[str, int, int]] = []
+    current, start = 'other', 0
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        section = detect_heading(line)
+        if section is not None:
+            if offset > start:
+                spans.append((current, start, offset))
+            current, start = section, offset
+        offset += len(line)
+    if offset > start:
+        spans.append((current, start, offset))
+    return spans
+
+
+class ResumeSegments:
+    """分段后的简历：按段落类型访问内容，并按评分维度权重组装受token预算约束的提示词内容"""
+
+    def __init__(self, text: str, spans: Optional[List[Tuple[str, int, int]]] = None):
+        self.text = text
+        self.spans = [tuple(span) for span in spans] if spans is not None else segment_text(text)
+        self.sections: Dict[str, str] = {}
+        for section, start, end in self.spans:
+            chunk = text[start:end].strip()
+            if chunk:
+                self.sections[section] = f"{self.sections[section]}\n{chunk}" if section in self.sections else chunk
+
+    def get(self, section: str) -> str:
+        return self.sections.get(section, '')
+
+    def section_weights(self) -> Dict[str, float]:
+        """按 SCORING_DIMENSIONS 的权重和 sections 映射计算各段落的重要性"""
+        weights = {section: 0.0 for section in SECTION_NAMES}
+        for dimension in SCORING_DIMENSIONS.values():
+            related = dimension.get('sections', [])
+            for section in related:
+                weights[section] += dimension['weight'] / len(related)
+        return weights
+
+    def compose(self, max_tokens: int = 0) -> str:
+        """组装提示词用的简历内容
+
+        未超出预算时原样返回全文；超出时按段落重要性分配token预算，
+        每段截断到各自预算内并加上段落标题，短段落未用完的预算分配给其他段落。
+        """
+        if not max_tokens or estimate_tokens(self.text) <= max_tokens or not self.sections:
+            return self.text
+
+        weights = self.section_weights()
+        present = {section: text for section, text in self.sections.items() if weights.get(section, 0) > 0}
+        if not present:
+            return self.text
+        budgets: Dict[str, int] = {}
+        remaining_tokens = max_tokens
+        remaining = dict(present)
+        # 先满足需求小于平均分配额度的段落，再把剩余预算按权重分给长段落
+        while remaining:
+            total_weight = sum(weights[section] for section in remaining)
+            fits = {
+                section: estimate_tokens(text) for section, text in remaining.items()
+                if estimate_tokens(text) <= remaining_tokens * weights[section] / total_weight
+            }
+            if not fits:
+                for section in remaining:
+                    budgets[section] = int(remaining_tokens * weights[section] / total_weight)
+                break
+            for section, tokens in fits.items():
+                budgets[section] = tokens
+                remaining_tokens -= tokens
+                del remaining[section]
+
+        blocks = []
+        for section in SECTION_NAMES:
+            if section not in present:
+                continue
+            text = present[section]
+            tokens = estimate_tokens(text)
+            if tokens > budgets[section]:
+                text = text[:max(0, int(len(text) * budgets[section] / tokens))].rstrip() + '…'
+            blocks.append(f"【{SECTION_NAMES[section]}】\n{text}")
+        return '\n\n'.join(blocks)
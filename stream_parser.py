@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+流式响应解析
+逐块接收模型输出（SSE增量内容），定位其中第一个顶层JSON对象，
+每个顶层字段的值一完整就立即返回，对象闭合后即可停止读取，不再等待模型的多余输出
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def sse_data(line: str) -> Optional[str]:
+    """SSE行中的数据部分；注释行、事件名等其他行返回 None"""
+    if not line.startswith('data:'):
+        return None
+    return line[5:].strip()
+
+
+class IncrementalJSONParser:
+    """增量JSON对象解析器：feed() 返回本次新完成的 (字段名, 值)，complete 为 True 时 result 为完整对象
+
+    每次只扫描新收到的内容；括号配对但无法解析的片段（如 “好的 {按要求} 如下”）被跳过，从其后继续寻找。
+    """
+
+    def __init__(self):
+        self.complete = False
+        self.result: Optional[Dict[str, Any]] = None
+        self._chunks: List[str] = []
+        # 当前候选对象（从 “{” 开始）和当前顶层成员的字符
+        self._object: List[str] = []
+        self._member: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def text(self) -> str:
+        """目前收到的全部输出"""
+        return ''.join(self._chunks)
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self._chunks.append(chunk)
+        if self.complete:
+            return []
+        fields = []
+        pending = chunk
+        while pending:
+            pending = self._scan(pending, fields)
+        return fields
+
+    def _scan(self, text: str, fields: List[Tuple[str, Any]]) -> str:
+        """扫描一段内容，新完成的字段加入 fields；候选对象无法解析时返回需要重新扫描的内容"""
+        for i, c in enumerate(text):
+            if not self._object:
+                # 跳过对象之前的内容（如 ```json 标记）
+                if c == '{':
+                    self._object.append(c)
+                    self._depth = 1
+                continue
+            self._object.append(c)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+            elif c == '"':
+                self._in_string = True
+            elif c in '{[':
+                self._depth += 1
+            elif c in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    fields += self._take_member()
+                    try:
+                        self.result = json.loads(''.join(self._object))
+                        self.complete = True
+                        return ''
+                    except ValueError:
+                        # 不是JSON对象：从这个 “{” 之后重新寻找
+                        rest = ''.join(self._object[1:]) + text[i + 1:]
+                        self._object = []
+                        return rest
+            elif c == ',' and self._depth == 1:
+                fields += self._take_member()
+                continue
+            self._member.append(c)
+        return ''
+
+    def _take_member(self) -> List[Tuple[str, Any]]:
+        """解析一个顶层成员 "key": value"""
+        member = ''.join(self._member).strip()
+        self._member = []
+        if not member:
+            return []
+        try:
+            return list(json.loads('{' + member + '}').items())
+        except ValueError:
+            return []
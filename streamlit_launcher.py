@@ -1,5 +1,6 @@
 
 import streamlit.web.cli as stcli
+import multiprocessing
 import sys
 import os
 from pathlib import Path
@@ -23,4 +24,6 @@ def main():
     stcli.main()
 
 if __name__ == "__main__":
+    # 打包为exe后PDF解析进程池需要此调用才能正常启动子进程
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""异步客户端：流式读取受请求时间预算限制"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from api_client import APIException, RobustAPIClient
+from async_client import AsyncAnalysisClient
+
+
+class _TrickleResponse:
+    """每0.1秒给出一个SSE数据块、迟迟不闭合JSON对象的流式响应"""
+
+    status = 200
+
+    def __init__(self, padding: int):
+        self.closed = False
+        self.content = self._lines(padding)
+
+    async def _lines(self, padding):
+        for piece in ['{"overall_score": 8'] + [' '] * padding + ['}']:
+            await asyncio.sleep(0.1)
+            yield f"data: {json.dumps({'choices': [{'delta': {'content': piece}}]})}\n".encode('utf-8')
+
+    def close(self):
+        self.closed = True
+
+
+def test_stream_read_stops_at_deadline():
+    client = AsyncAnalysisClient(RobustAPIClient())
+    response = _TrickleResponse(50)
+    start = time.monotonic()
+    with pytest.raises(APIException, match='流式读取'):
+        asyncio.run(client._read_stream(response, deadline=time.monotonic() + 0.5))
+    assert time.monotonic() - start < 2
+    assert response.closed
+
+
+def test_stream_read_without_deadline_completes():
+    client = AsyncAnalysisClient(RobustAPIClient())
+    fields = []
+    result = asyncio.run(client._read_stream(_TrickleResponse(3), on_field=lambda *field: fields.append(field)))
+    assert result == {'overall_score': 8}
+    assert fields == [('overall_score', 8)]
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""批次分拣：同一候选人的多个版本、跨批次复用和本批次内的重复简历"""
+
+import hashlib
+
+import pytest
+
+import config
+from batch_triage import BatchTriage
+from candidate_identity import CandidateIndex
+
+
+def _extraction(body: str, header: str = "张三\n电话：138 1234 5678\n邮箱：zhangsan@example.com\n") -> dict:
+    text = f"{header}教育背景\n{body}\n"
+    return {'text': text, 'sha256': hashlib.sha256(text.encode('utf-8')).hexdigest(), 'text_stats': {}}
+
+
+def _analysis(job, score=8):
+    return {'candidate_name': job[0].replace('.pdf', ''), 'overall_score': score}
+
+
+@pytest.fixture
+def reanalyze(monkeypatch):
+    def _set(value):
+        monkeypatch.setitem(config.IDENTITY_CONFIG, 'reanalyze_new_versions', value)
+    return _set
+
+
+def test_two_versions_in_one_batch_are_both_analyzed(reanalyze):
+    reanalyze(True)
+    triage = BatchTriage('ctx', candidate_index=CandidateIndex())
+    first = triage.triage('张三_v1.pdf', _extraction("北京大学 计算机 本科"))
+    second = triage.triage('张三_v2.pdf', _extraction("北京大学 计算机 硕士"))
+    assert first is not None and second is not None
+    triage.queue(first)
+    triage.queue(second)
+    # 按完成顺序记录：先完成的是第二版
+    triage.record(second, _analysis(second))
+    triage.record(first, _analysis(first, score=7))
+    assert 'resume_version' not in triage.results[0]
+    assert triage.results[1]['resume_version'] == 2
+    assert triage.results[1]['duplicate_of'] == '张三_v2'
+
+
+def test_new_version_in_same_batch_reuses_pending_analysis(reanalyze):
+    reanalyze(False)
+    triage = BatchTriage('ctx', candidate_index=CandidateIndex())
+    first = triage.triage('张三_v1.pdf', _extraction("北京大学 计算机 本科"))
+    triage.queue(first)
+    assert triage.triage('张三_v2.pdf', _extraction("北京大学 计算机 硕士")) is None
+    assert triage.duplicate_groups == {'张三_v1': [('张三_v2', "同一候选人的新版本简历，沿用已有分析")]}
+    assert list(triage.pending) == [0]
+
+
+@pytest.mark.parametrize('reanalyze_new_versions', [True, False])
+def test_new_version_in_later_batch(reanalyze, reanalyze_new_versions):
+    reanalyze(reanalyze_new_versions)
+    index = CandidateIndex()
+    earlier = BatchTriage('ctx', candidate_index=index)
+    job = earlier.triage('张三.pdf', _extraction("北京大学 计算机 本科"))
+    earlier.record(job, _analysis(job))
+
+    later = BatchTriage('ctx', candidate_index=index)
+    job = later.triage('张三_新版.pdf', _extraction("北京大学 计算机 硕士"))
+    if reanalyze_new_versions:
+        later.record(job, _analysis(job))
+        assert later.results[0]['resume_version'] == 2
+        assert later.results[0]['duplicate_of'] == '张三'
+    else:
+        assert job is None
+        assert later.results[0]['duplicate_of'] == '张三'
+        assert later.results[0]['candidate_name'] == '张三_新版'
+
+
+def test_same_file_in_later_batch_is_reused(reanalyze):
+    reanalyze(True)
+    index = CandidateIndex()
+    earlier = BatchTriage('ctx', candidate_index=index)
+    job = earlier.triage('张三.pdf', _extraction("北京大学 计算机 本科"))
+    earlier.record(job, _analysis(job))
+
+    later = BatchTriage('ctx', candidate_index=index)
+    assert later.triage('张三.pdf', _extraction("北京大学 计算机 本科")) is None
+    assert later.results == [{'candidate_name': '张三', 'overall_score': 8, 'text_stats': {}}]
+
+
+def test_default_scores_are_not_recorded():
+    index = CandidateIndex()
+    triage = BatchTriage('ctx', candidate_index=index)
+    job = triage.triage('张三.pdf', _extraction("北京大学 计算机 本科"))
+    triage.record(job, dict(_analysis(job), analysis_status='default'))
+    assert len(index) == 0
+
+
+def test_different_candidates_are_not_merged(reanalyze):
+    reanalyze(False)
+    triage = BatchTriage('ctx', candidate_index=CandidateIndex())
+    first = triage.triage('张三.pdf', _extraction("北京大学"))
+    triage.queue(first)
+    other = _extraction("清华大学", header="李四\n电话：139 8765 4321\n邮箱：lisi@example.com\n")
+    assert triage.triage('李四.pdf', other) is not None
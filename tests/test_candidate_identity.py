@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""候选人身份识别和跨会话的候选人索引"""
+
+from candidate_identity import CandidateIndex, extract_identity
+
+_RESUME = """张三
+电话：+86 138-1234-5678  邮箱：ZhangSan@Example.com
+教育背景
+北京大学 计算机科学 本科
+工作经历
+某公司 后端开发
+推荐人：王经理 139 8765 4321
+"""
+
+
+def _identity(name='张三', emails=('zhangsan@example.com',), phones=('13812345678',)):
+    return {'name': name, 'emails': list(emails), 'phones': list(phones)}
+
+
+def test_extract_identity_reads_only_the_contact_block():
+    identity = extract_identity(_RESUME)
+    assert identity == _identity()
+
+
+def test_extract_identity_ignores_recruiting_site_emails():
+    identity = extract_identity("李四\nservice@zhaopin.com\nlisi@zhaopin.com\nlisi@example.com\n")
+    assert identity['emails'] == ['lisi@example.com']
+
+
+def test_record_and_lookup():
+    index = CandidateIndex()
+    assert index.lookup(_identity(), 'ctx') is None
+    assert index.record(_identity(), 'ctx', '张三.pdf', 'sha-1', {'candidate_name': '张三'}) == (1, None)
+    record = index.lookup(_identity(), 'ctx')
+    assert (record['file_name'], record['sha256'], record['version']) == ('张三.pdf', 'sha-1', 1)
+    # 分析上下文（岗位、模型等）不同时不复用
+    assert index.lookup(_identity(), 'other') is None
+
+
+def test_versions():
+    index = CandidateIndex()
+    index.record(_identity(), 'ctx', 'v1.pdf', 'sha-1', {'candidate_name': 'v1'})
+    # 同一文件重复记录不增加版本号
+    assert index.record(_identity(), 'ctx', 'v1.pdf', 'sha-1', {'candidate_name': 'v1'})[0] == 1
+    version, previous = index.record(_identity(), 'ctx', 'v2.pdf', 'sha-2', {'candidate_name': 'v2'})
+    assert version == 2
+    assert previous['file_name'] == 'v1.pdf' and previous['analysis'] == {'candidate_name': 'v1'}
+    assert index.lookup(_identity(), 'ctx')['sha256'] == 'sha-2'
+    assert len(index) == 1
+
+
+def test_different_names_sharing_a_phone_are_different_candidates():
+    index = CandidateIndex()
+    index.record(_identity(), 'ctx', '张三.pdf', 'sha-1', {})
+    other = _identity(name='李四', emails=('lisi@example.com',))
+    assert index.lookup(other, 'ctx') is None
+    index.record(other, 'ctx', '李四.pdf', 'sha-2', {})
+    assert len(index) == 2
+    assert index.lookup(_identity(), 'ctx')['file_name'] == '张三.pdf'
+
+
+def test_without_name_two_matching_keys_are_required():
+    index = CandidateIndex()
+    index.record(_identity(), 'ctx', '张三.pdf', 'sha-1', {})
+    assert index.lookup(_identity(name=None, emails=()), 'ctx') is None
+    assert index.lookup(_identity(name=None), 'ctx')['file_name'] == '张三.pdf'
+
+
+def test_identity_without_contact_details_is_not_recorded():
+    index = CandidateIndex()
+    assert index.record(_identity(emails=(), phones=()), 'ctx', '张三.pdf', 'sha-1', {}) == (1, None)
+    assert len(index) == 0
+
+
+def test_index_is_persisted(tmp_path):
+    index_file = str(tmp_path / 'candidates.json')
+    index = CandidateIndex(index_file)
+    index.record(_identity(), 'ctx', '张三.pdf', 'sha-1', {'candidate_name': '张三'})
+    index.save()
+    assert 'zhangsan' not in open(index_file, encoding='utf-8').read()
+    assert CandidateIndex(index_file).lookup(_identity(), 'ctx')['analysis'] == {'candidate_name': '张三'}
+
+
+def test_oldest_candidates_are_evicted():
+    index = CandidateIndex(max_candidates=2)
+    for i in range(3):
+        index.record(_identity(name=f'候选人{i}', emails=(f'c{i}@example.com',), phones=(f'1381234000{i}',)),
+                     'ctx', f'{i}.pdf', f'sha-{i}', {})
+    assert len(index) == 2
+    assert index.lookup(_identity(name='候选人0', emails=('c0@example.com',), phones=('13812340000',)), 'ctx') is None
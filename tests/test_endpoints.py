@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""OpenAI兼容端点：用本地替身服务验证认证方式和按端点配置的降级顺序"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import api_client
+import async_client
+from api_client import APIException, RobustAPIClient, get_circuit_breaker, get_concurrency_controller, get_hedge_policy
+from async_client import AsyncAnalysisClient, iterate_async
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """最小的 /v1/chat/completions 替身：校验请求头，failing 中的模型返回400，retired 中的模型返回404，
+    flaky 中的模型第一次请求返回503
+
+    请求 stream 时以SSE返回；slow 中的模型先发送若干填充块再返回结果，被客户端中途断开的流记入 aborted。
+    """
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append({'path': self.path, 'headers': dict(self.headers), 'model': body['model'],
+                                     'stream': bool(body.get('stream'))})
+        if any(self.headers.get(name) != value for name, value in self.server.required_headers.items()):
+            self._reply(401, {'error': {'message': 'unauthorized'}})
+        elif body['model'] in self.server.failing:
+            self._reply(400, {'error': {'message': 'invalid request'}})
+        elif body['model'] in self.server.retired:
+            self._reply(404, {'error': {'message': 'model not found'}})
+        elif body['model'] in self.server.flaky:
+            self.server.flaky.discard(body['model'])
+            self._reply(503, {'error': {'message': 'overloaded'}})
+        elif body.get('stream'):
+            self._stream(body['model'])
+        else:
+            content = json.dumps({'overall_score': 8, 'model': body['model']})
+            self._reply(200, {'choices': [{'message': {'content': content}}]})
+
+    def _stream(self, model):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        # 填充块不短于 requests.iter_lines 的读取块（512字节），每块都能及时到达客户端
+        padding = (': ' + ' ' * 512 + '\n').encode('utf-8')
+        content = json.dumps({'overall_score': 8, 'model': model})
+        chunk = json.dumps({'choices': [{'delta': {'content': content}}]})
+        try:
+            for _ in range(40 if model in self.server.slow else 0):
+                self.wfile.write(padding)
+                self.wfile.flush()
+                time.sleep(0.05)
+            self.wfile.write(f'data: {chunk}\n\ndata: [DONE]\n\n'.encode('utf-8'))
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            self.server.aborted.append(model)
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+    server.requests = []
+    server.failing = set()
+    server.retired = set()
+    server.flaky = set()
+    server.slow = set()
+    server.aborted = []
+    server.required_headers = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_client(stub_server, monkeypatch):
+    """创建指向替身服务的客户端（端点配置临时加入 ENDPOINTS）"""
+    def _make(api_key=None, auth='none', fallback_models=(), rate_limit=False):
+        monkeypatch.setitem(api_client.ENDPOINTS, 'stub', {
+            'name': '替身服务',
+            'api_base': f'http://127.0.0.1:{stub_server.server_port}/v1',
+            'auth': auth,
+            'auth_header': 'api-key',
+            'api_key_env': 'STUB_API_KEY',
+            'models': {'stub/main': 'main'},
+            'paid_models': {},
+            'fallback_models': list(fallback_models),
+            'rate_limit': rate_limit
+        })
+        client = RobustAPIClient(api_key, endpoint='stub')
+        client.enable_streaming = False
+        client.retry_delays = [0.01]
+        return client
+    return _make
+
+
+def test_no_auth_sends_no_credentials(stub_server, make_client):
+    client = make_client('free_model')
+    result = client.call_api_with_retry('简历 no-auth', {'model': 'stub/none'}, '候选人')
+    assert result['overall_score'] == 8
+    request = stub_server.requests[-1]
+    assert request['path'] == '/v1/chat/completions'
+    assert 'Authorization' not in request['headers'] and 'api-key' not in request['headers']
+
+
+def test_bearer_auth(stub_server, make_client):
+    stub_server.required_headers = {'Authorization': 'Bearer secret'}
+    client = make_client('secret', auth='bearer')
+    assert client.call_api_with_retry('简历 bearer', {'model': 'stub/bearer'}, '候选人')['overall_score'] == 8
+
+
+def test_custom_header_auth(stub_server, make_client):
+    stub_server.required_headers = {'api-key': 'secret'}
+    client = make_client('secret', auth='header')
+    assert client.call_api_with_retry('简历 header', {'model': 'stub/header'}, '候选人')['overall_score'] == 8
+    assert 'Authorization' not in stub_server.requests[-1]['headers']
+
+
+def test_wrong_key_is_rejected(stub_server, make_client):
+    stub_server.required_headers = {'Authorization': 'Bearer secret'}
+    client = make_client('wrong', auth='bearer')
+    result = client.call_api_with_retry('简历 wrong key', {'model': 'stub/wrong'}, '候选人')
+    assert result['analysis_status'] == 'default'
+
+
+def test_fallback_chain_is_per_endpoint(stub_server, make_client):
+    stub_server.failing = {'stub/primary', 'stub/fallback-1'}
+    client = make_client(fallback_models=['stub/fallback-1', 'stub/fallback-2'])
+    result = client.call_api_with_retry('简历 fallback', {'model': 'stub/primary'}, '候选人')
+    assert result['model'] == 'stub/fallback-2'
+    assert [request['model'] for request in stub_server.requests] == [
+        'stub/primary', 'stub/fallback-1', 'stub/fallback-2'
+    ]
+
+
+def test_endpoint_without_fallbacks_returns_default_scores(stub_server, make_client):
+    stub_server.failing = {'stub/lonely'}
+    client = make_client()
+    result = client.call_api_with_retry('简历 lonely', {'model': 'stub/lonely'}, '候选人')
+    assert result['analysis_status'] == 'default'
+    assert len(stub_server.requests) == 1
+
+
+def test_streaming_retries_then_succeeds(stub_server, make_client):
+    stub_server.flaky = {'stub/stream-flaky'}
+    client = make_client()
+    client.enable_streaming = True
+    fields = []
+    result = client.call_api_with_retry('简历 stream retry', {'model': 'stub/stream-flaky'}, '候选人',
+                                        on_field=lambda *field: fields.append(field))
+    assert result['overall_score'] == 8 and result['model'] == 'stub/stream-flaky'
+    assert fields[0] == ('overall_score', 8)
+    assert [request['model'] for request in stub_server.requests] == ['stub/stream-flaky'] * 2
+    assert all(request['stream'] for request in stub_server.requests)
+
+
+def test_streaming_falls_back(stub_server, make_client):
+    stub_server.failing = {'stub/stream-primary'}
+    client = make_client(fallback_models=['stub/stream-fallback'])
+    client.enable_streaming = True
+    result = client.call_api_with_retry('简历 stream fallback', {'model': 'stub/stream-primary'}, '候选人')
+    assert result['model'] == 'stub/stream-fallback'
+    assert [request['model'] for request in stub_server.requests] == ['stub/stream-primary', 'stub/stream-fallback']
+    assert all(request['stream'] for request in stub_server.requests)
+
+
+def test_async_streaming_falls_back(stub_server, make_client):
+    stub_server.failing = {'stub/astream-primary'}
+    client = make_client(fallback_models=['stub/astream-fallback'])
+    client.enable_streaming = True
+    items = [(0, '简历 async stream', '候选人')]
+    results = dict(iterate_async(AsyncAnalysisClient(client).analyze_many(items, {'model': 'stub/astream-primary'})))
+    assert results[0]['model'] == 'stub/astream-fallback'
+    assert all(request['stream'] for request in stub_server.requests)
+
+
+def test_retired_model_opens_circuit(stub_server, make_client):
+    stub_server.retired = {'stub/retired'}
+    client = make_client()
+    for i in range(4):
+        client.call_api_with_retry(f'简历 retired {i}', {'model': 'stub/retired'}, '候选人')
+    assert get_circuit_breaker().state('stub/retired') == 'open'
+    # 熔断后不再向已下线的模型发送请求
+    sent = len(stub_server.requests)
+    result = client.call_api_with_retry('简历 retired 4', {'model': 'stub/retired'}, '候选人')
+    assert result['analysis_status'] == 'default'
+    assert len(stub_server.requests) == sent
+
+
+def test_fallback_order_follows_observed_requests(stub_server, make_client):
+    stub_server.failing = {'stub/rank-flaky'}
+    client = make_client(fallback_models=['stub/rank-flaky', 'stub/rank-ok'])
+    for model in ('stub/rank-flaky', 'stub/rank-ok'):
+        client.call_api_with_retry(f'简历 rank {model}', {'model': model}, '候选人')
+    # 没有启用后台探测，排序只依据分析请求的结果
+    assert client.ordered_fallback_models() == ['stub/rank-ok', 'stub/rank-flaky']
+
+
+def test_async_client_uses_endpoint_auth(stub_server, make_client):
+    stub_server.required_headers = {'api-key': 'secret'}
+    client = make_client('secret', auth='header')
+    items = [(i, f'简历 async {i}', f'候选人{i}') for i in range(3)]
+    results = dict(iterate_async(AsyncAnalysisClient(client).analyze_many(items, {'model': 'stub/async'})))
+    assert sorted(results) == [0, 1, 2]
+    assert all(result['overall_score'] == 8 for result in results.values())
+
+
+def test_batches_share_the_preconnected_aiohttp_session(stub_server, make_client, monkeypatch):
+    created = []
+    session_class = async_client.aiohttp.ClientSession
+    monkeypatch.setattr(async_client.aiohttp, 'ClientSession',
+                        lambda *args, **kwargs: created.append(1) or session_class(*args, **kwargs))
+    client = make_client('free_model')
+    AsyncAnalysisClient(client).preconnect()
+    for thread in threading.enumerate():
+        if thread.name == 'aiohttp-preconnect':
+            thread.join()
+    for batch in range(2):
+        items = [(i, f'简历 batch {batch} {i}', f'候选人{i}') for i in range(2)]
+        results = dict(iterate_async(AsyncAnalysisClient(client).analyze_many(items, {'model': 'stub/pooled'})))
+        assert all(result['overall_score'] == 8 for result in results.values())
+    # 预连接和两个批次使用同一个会话
+    assert len(created) == 1
+
+
+def test_429_backs_off_only_without_rate_limiter(make_client):
+    error = APIException('rate limited', 429)
+    assert make_client(rate_limit=False).retry_delay(error, 1) > 0
+    assert make_client(rate_limit=True).retry_delay(error, 1) == 0
+
+
+def test_unknown_endpoint():
+    with pytest.raises(ValueError):
+        RobustAPIClient(endpoint='missing')
+
+
+def test_hedge_cancels_the_losing_stream(stub_server, make_client, monkeypatch):
+    stub_server.slow = {'stub/slow'}
+    client = make_client(fallback_models=['stub/fast'])
+    client.enable_streaming = True
+    client.enable_hedging = True
+    policy = get_hedge_policy()
+    monkeypatch.setattr(policy, 'delay', lambda model: 0.2)
+    monkeypatch.setattr(policy, 'try_hedge', lambda: True)
+
+    started = time.monotonic()
+    result = client.call_api_with_retry('简历 hedge', {'model': 'stub/slow'}, '候选人')
+    assert result['model'] == 'stub/fast'
+    # 主请求的流在发送完之前（约2秒）被关闭，并发名额随之释放
+    while not stub_server.aborted and time.monotonic() - started < 1.5:
+        time.sleep(0.05)
+    assert stub_server.aborted == ['stub/slow']
+    assert get_concurrency_controller().snapshot()['stub/slow']['inflight'] == 0
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""模型健康监控：按分析请求和探测结果排列备用模型"""
+
+import time
+
+from model_health import ModelHealthMonitor
+
+
+class _ProbeClient:
+    api_key = 'secret'
+
+    def __init__(self):
+        self.probed = []
+
+    def has_credentials(self):
+        return True
+
+    def health_check(self, model):
+        self.probed.append(model)
+        return {'status': 'healthy', 'response_time': 0.5}
+
+
+def test_rank_without_data_keeps_configured_order():
+    assert ModelHealthMonitor().rank(['a', 'b', 'c']) == ['a', 'b', 'c']
+
+
+def test_rank_uses_observed_requests():
+    monitor = ModelHealthMonitor(failure_penalty=15)
+    for _ in range(3):
+        monitor.observe('slow', True, 10)
+        monitor.observe('failing', False, 1)
+        monitor.observe('fast', True, 5)
+    assert monitor.rank(['slow', 'failing', 'fast', 'unknown']) == ['fast', 'slow', 'unknown', 'failing']
+    assert monitor.snapshot()['fast'] == {
+        'requests': 3, 'probes': 0, 'availability': 1.0, 'latency': 5, 'expected_cost': 5
+    }
+
+
+def test_request_data_outweighs_short_probes():
+    monitor = ModelHealthMonitor()
+    # 探测请求只生成几个token，耗时与分析请求不可比
+    monitor.record('probed', True, 0.5)
+    monitor.record('used', True, 0.5)
+    monitor.observe('used', True, 8)
+    assert monitor.expected_cost('used') == 8
+    assert monitor.rank(['used', 'probed']) == ['probed', 'used']
+
+
+def test_watch_and_stop():
+    monitor = ModelHealthMonitor(interval=60)
+    client = _ProbeClient()
+    monitor.watch(client, ['a', 'b'])
+    assert monitor.watching()
+    deadline = time.monotonic() + 5
+    while monitor.last_probe is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    monitor.stop()
+    monitor._thread.join(timeout=5)
+    assert not monitor.watching()
+    assert client.probed == ['a', 'b']
+    assert monitor.snapshot()['a']['probes'] == 1
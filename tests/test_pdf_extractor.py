@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""PDF文本提取的字符预算和解析子进程的内存上限"""
+
+import os
+
+import pytest
+
+import pdf_extractor
+
+
+@pytest.fixture
+def fake_pages(monkeypatch):
+    """用给定的页面文本代替真实PDF解析"""
+    def _install(*pages):
+        monkeypatch.setattr(pdf_extractor.PyPDF2, 'PdfReader', lambda stream: type('Reader', (), {'pages': pages})())
+        monkeypatch.setattr(pdf_extractor, 'iter_pdf_pages',
+                            lambda reader, max_pages: ((text, 0) for text in reader.pages))
+    return _install
+
+
+def _raw_length(result):
+    return result['text_stats']['raw_chars']
+
+
+# 页间换行计入字符数：预算只够放下换行时不追加下一页
+@pytest.mark.parametrize('max_chars, expected', [(5, 5), (10, 10), (11, 10), (12, 12), (15, 15), (60, 60)])
+def test_max_chars_is_never_exceeded(fake_pages, max_chars, expected):
+    fake_pages('a' * 10, 'b' * 50)
+    result = pdf_extractor.extract_pdf_text(b'', max_chars=max_chars)
+    assert _raw_length(result) == expected
+    assert result['truncated']
+
+
+def test_page_at_exact_budget_is_not_followed_by_other_pages(fake_pages):
+    fake_pages('a' * 10, 'b' * 50)
+    result = pdf_extractor.extract_pdf_text(b'', max_chars=10)
+    assert 'b' not in result['text']
+    assert result['pages_parsed'] == 2
+
+
+def test_unlimited_keeps_all_pages(fake_pages):
+    fake_pages('a' * 10, 'b' * 50)
+    result = pdf_extractor.extract_pdf_text(b'')
+    assert _raw_length(result) == 61
+    assert not result['truncated']
+
+
+def test_memory_error_is_reported_as_memory_exceeded(monkeypatch):
+    def _oversized(reader, max_pages):
+        raise MemoryError()
+        yield
+    monkeypatch.setattr(pdf_extractor.PyPDF2, 'PdfReader', lambda stream: type('Reader', (), {'pages': ()})())
+    monkeypatch.setattr(pdf_extractor, 'iter_pdf_pages', _oversized)
+    assert pdf_extractor.extract_pdf_text(b'')['status'] == 'memory_exceeded'
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/limits'), reason="需要 /proc/<pid>/limits")
+def test_worker_address_space_is_limited():
+    pool = pdf_extractor.PDFExtractionPool(max_workers=1, max_memory_mb=256)
+    worker = pool._acquire_worker(block=True)
+    try:
+        # 子进程在进入主循环前设置上限，用一次空提取等待其完成初始化
+        worker.submit(0, b'')
+        worker.conn.recv()
+        with open(f"/proc/{worker.process.pid}/limits") as f:
+            limit = next(line for line in f if line.startswith('Max address space')).split()[3]
+        assert int(limit) == 256 * 1024 * 1024
+    finally:
+        pool._release_worker(worker)
+        pool.shutdown()
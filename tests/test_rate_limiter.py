@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""按模型限流：免费模型的保守默认速率和按响应头双向调整"""
+
+import pytest
+
+from api_client import RateLimiter
+
+
+def _limiter():
+    return RateLimiter(20, burst=5, min_requests_per_minute=2, max_requests_per_minute=600)
+
+
+def _rate(limiter, model):
+    return pytest.approx(limiter.snapshot()[model]['rate_per_minute'])
+
+
+def test_only_free_models_are_throttled_by_default():
+    limiter = _limiter()
+    assert [limiter.reserve('deepseek/deepseek-r1:free') for _ in range(6)][-1] > 0
+    assert all(limiter.reserve('openai/gpt-4o') == 0 for _ in range(50))
+    assert _rate(limiter, 'openai/gpt-4o') == 600
+
+
+def test_headers_raise_and_lower_the_rate():
+    limiter = _limiter()
+    model = 'deepseek/deepseek-r1:free'
+    limiter.observe(model, 200, {'X-RateLimit-Remaining': '100', 'X-RateLimit-Reset': '60s'})
+    assert _rate(limiter, model) == 100
+    limiter.observe(model, 200, {'X-RateLimit-Remaining': '5', 'X-RateLimit-Reset': '60s'})
+    assert _rate(limiter, model) == 5
+    # 不超过上限
+    limiter.observe(model, 200, {'X-RateLimit-Remaining': '10000', 'X-RateLimit-Reset': '60s'})
+    assert _rate(limiter, model) == 600
+
+
+def test_paid_model_slows_down_after_429_and_recovers():
+    limiter = _limiter()
+    model = 'openai/gpt-4o'
+    limiter.observe(model, 429, {})
+    assert _rate(limiter, model) == 300
+    for _ in range(20):
+        limiter.observe(model, 200, {})
+    assert _rate(limiter, model) == 600
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""简历分段：标题识别"""
+
+import pytest
+
+from resume_segmenter import detect_heading, segment_text
+
+
+@pytest.mark.parametrize('line, section', [
+    ('教育背景', 'education'),
+    ('## Work Experience', 'experience'),
+    ('【项目经验】', 'projects'),
+    ('技能：', 'skills'),
+    ('工作经历（3年）', 'experience'),
+    ('Education (2015-2019)', 'education'),
+    ('教育 Education', 'education'),
+    ('教育背景 / Educational Background', 'education'),
+    ('Work Experience | 工作经历', 'experience'),
+    ('自我评价 Summary', 'other'),
+])
+def test_headings(line, section):
+    assert detect_heading(line) == section
+
+
+@pytest.mark.parametrize('line', [
+    'Research Assistant, 清华大学',
+    'Experience 3年Java开发',
+    'Skills 熟练掌握Python',
+    'Summary 本人性格开朗',
+    'Skills: Python, Java',
+    '教育部重点项目负责人',
+    '项目经验 project management experience in large teams',
+    '工作经历（2018年至今在某互联网公司担任高级后端开发工程师）',
+])
+def test_body_lines_are_not_headings(line):
+    assert detect_heading(line) is None
+
+
+def test_segment_text():
+    text = "张三\n教育背景 Education\n北京大学\nExperience 3年Java开发\n技能\nPython\n"
+    sections = [(section, text[start:end]) for section, start, end in segment_text(text)]
+    assert sections == [
+        ('other', "张三\n"),
+        ('education', "教育背景 Education\n北京大学\nExperience 3年Java开发\n"),
+        ('skills', "技能\nPython\n")
+    ]
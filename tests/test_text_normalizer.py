@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""简历文本规范化：页码、页眉页脚"""
+
+from text_normalizer import normalize_pages
+
+# 表格式简历：每个单元格单独成行，年龄、工作年限等数字单元格也是独立的一行
+_TABLE_PAGE = """个人简历
+姓名
+张三
+年龄
+28
+工作年限
+5
+期望城市
+北京
+教育背景
+北京大学 计算机科学 本科
+1 / 2"""
+
+
+def test_table_cells_that_look_like_page_numbers_are_kept():
+    lines = normalize_pages([_TABLE_PAGE, "工作经历\n某公司 后端开发\n- 2 -"]).splitlines()
+    assert lines[lines.index('年龄') + 1] == '28'
+    assert lines[lines.index('工作年限') + 1] == '5'
+    assert '1 / 2' not in lines and '- 2 -' not in lines
+
+
+def test_page_numbers_at_page_edges_are_removed():
+    pages = ["第 1 页 共 2 页\n张三\n北京大学\n\n3", "Page 2 of 2\n工作经历\n某公司\n"]
+    assert normalize_pages(pages) == "张三\n北京大学\n\n工作经历\n某公司"
+
+
+def test_repeated_headers_are_kept_once():
+    pages = ["张三的简历\n教育背景\n北京大学", "张三的简历\n工作经历\n某公司"]
+    assert normalize_pages(pages).count("张三的简历") == 1
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+简历文本规范化
+在PDF提取和构建提示词之间清理页眉页脚、页码、多余空白、中文断行和重复行，减少提示词token
+"""
+
+import re
+from collections import Counter
+from typing import Dict, Any, List
+
+# 规范化规则变化时递增，作为提取缓存签名的一部分
+NORMALIZER_VERSION = 2
+
+_CJK = r'\u3001-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef'
+_CJK_CHAR_RE = re.compile(f'[{_CJK}]')
+_CJK_SPACE_RE = re.compile(f'(?<=[{_CJK}]) (?=[{_CJK}])')
+_WHITESPACE_RE = re.compile(r'[ \t\u00a0\u2000-\u200b\u3000]+')
+_PAGE_NUMBER_RE = re.compile(
+    r'^(?:'
+    r'第\s*\d+\s*页(?:\s*[/,，]?\s*共\s*\d+\s*页)?'
+    r'|共\s*\d+\s*页\s*第\s*\d+\s*页'
+    r'|page\s*\d+(?:\s*(?:of|/)\s*\d+)?'
+    r'|[-–—]?\s*\d{1,3}\s*[-–—]?'
+    r'|\d{1,3}\s*/\s*\d{1,3}'
+    r')$',
+    re.IGNORECASE
+)
+# 以这些标点结尾的行视为完整句子，不与下一行拼接
+_SENTENCE_END = '。！？；：.!?;:）)】」'
+# 短于该长度的行可能是标题，不做断行拼接
+_MIN_WRAPPED_LINE = 15
+# 短于该长度的重复行（如技能关键词）保留
+_MIN_DUPLICATE_LINE = 10
+# 页眉页脚和页码检测：每页首尾各检查的行数
+_EDGE_LINES = 2
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算文本的token数：中日韩字符约1个token，其余字符约4个字符1个token"""
+    cjk_count = len(_CJK_CHAR_RE.findall(text))
+    return cjk_count + (len(text) - cjk_count + 3) // 4
+
+
+def _clean_line(line: str) -> str:
+    """压缩空白；对逐字加空格的中文行（PDF字距造成）去掉字间空格"""
+    spaced = len(_CJK_SPACE_RE.findall(line))
+    if spaced >= 2 and spaced * 2 >= len(_CJK_CHAR_RE.findall(line)) - 1:
+        line = _CJK_SPACE_RE.sub('', line)
+    return _WHITESPACE_RE.sub(' ', line).strip()
+
+
+def _strip_page_numbers(lines: List[str]) -> List[str]:
+    """去掉每页首尾各 _EDGE_LINES 个非空行中的页码（正文中单独成行的数字，如表格里的年龄、年限，保留）"""
+    content = [i for i, line in enumerate(lines) if line]
+    edges = set(content[:_EDGE_LINES]) | set(content[-_EDGE_LINES:])
+    return [line for i, line in enumerate(lines) if not (i in edges and _PAGE_NUMBER_RE.match(line))]
+
+
+def _find_repeated_edges(pages: List[List[str]]) -> set:
+    """找出在多数页面首尾重复出现的行（页眉/页脚）"""
+    if len(pages) < 2:
+        return set()
+    counter = Counter()
+    for lines in pages:
+        edges = set(lines[:_EDGE_LINES]) | set(lines[-_EDGE_LINES:])
+        counter.update(line for line in edges if line)
+    threshold = max(2, (len(pages) + 1) // 2)
+    return {line for line, count in counter.items() if count >= threshold}
+
+
+def _should_join(previous: str, current: str) -> bool:
+    """判断两行是否为被PDF排版打断的同一段中文"""
+    # 被折行的正文通常是连续的中文，末尾一段含空格的多为表格式字段（如 学校 专业 学历）
+    return (
+        len(previous) >= _MIN_WRAPPED_LINE
+        and ' ' not in previous[-_MIN_WRAPPED_LINE:]
+        and previous[-1] not in _SENTENCE_END
+        and bool(_CJK_CHAR_RE.match(previous[-1]))
+        and bool(_CJK_CHAR_RE.match(current[0]))
+    )
+
+
+def normalize_pages(page_texts: List[str]) -> str:
+    """按页规范化简历文本并合并为一个字符串（确定性：相同输入总是得到相同输出）"""
+    pages = [[_clean_line(line) for line in page.splitlines()] for page in page_texts]
+    pages = [_strip_page_numbers(lines) for lines in pages]
+    repeated_edges = _find_repeated_edges(pages)
+
+    output: List[str] = []
+    seen_edges = set()
+    seen_lines = set()
+    for lines in pages:
+        for line in lines:
+            if not line:
+                if output and output[-1]:
+                    output.append('')
+                continue
+            # 页眉页脚只保留第一次出现
+            if line in repeated_edges:
+                if line in seen_edges:
+                    continue
+                seen_edges.add(line)
+            # 较长的重复行只保留一次
+            if len(line) >= _MIN_DUPLICATE_LINE:
+                if line in seen_lines:
+                    continue
+                seen_lines.add(line)
+            if output and output[-1] and _should_join(output[-1], line):
+                output[-1] += line
+            elif output and output[-1] == line:
+                continue
+            else:
+                output.append(line)
+        if output and output[-1]:
+            output.append('')
+
+    return '\n'.join(output).strip()
+
+
+def normalize_text(text: str) -> str:
+    """规范化未分页的文本"""
+    return normalize_pages(text.split('\f'))
+
+
+def text_stats(raw_text: str, normalized_text: str) -> Dict[str, Any]:
+    """规范化前后的字符数和估算token数"""
+    return {
+        'raw_chars': len(raw_text),
+        'chars': len(normalized_text),
+        'raw_tokens': estimate_tokens(raw_text),
+        'tokens': estimate_tokens(normalized_text)
+    }
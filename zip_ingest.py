@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+ZIP压缩包简历导入
+逐个流式读取压缩包中的PDF成员，不整体解压到内存或磁盘，读取一个就交给提取流水线处理一个
+"""
+
+import os
+import logging
+import zipfile
+from typing import Iterator, List, Tuple
+
+from config import FILE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# 每次从压缩流读取的块大小
+_READ_CHUNK = 1024 * 1024
+
+
+def _decode_member_name(info: zipfile.ZipInfo) -> str:
+    """修正Windows下压缩的中文文件名（未设置UTF-8标志时按GBK解码）"""
+    if info.flag_bits & 0x800:
+        return info.filename
+    try:
+        return info.filename.encode('cp437').decode('gbk')
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return info.filename
+
+
+class ZipResumeArchive:
+    """上传的ZIP简历包，只读取中央目录建立成员列表，成员内容按需逐个解压"""
+
+    def __init__(self, fileobj, max_member_size: int = None, max_members: int = None):
+        self.name = getattr(fileobj, 'name', 'archive.zip')
+        self.max_member_size = max_member_size or FILE_CONFIG['max_file_size']
+        max_members = max_members or FILE_CONFIG['max_zip_members']
+        self.skipped: List[Tuple[str, str]] = []
+        self._zip = zipfile.ZipFile(fileobj)
+        self.members: List[zipfile.ZipInfo] = []
+        for info in self._zip.infolist():
+            name = _decode_member_name(info)
+            base_name = os.path.basename(name)
+            if info.is_dir() or name.startswith('__MACOSX/') or base_name.startswith('.'):
+                continue
+            if not base_name.lower().endswith('.pdf'):
+                continue
+            if len(self.members) >= max_members:
+                self.skipped.append((base_name, f"超过单个压缩包 {max_members} 份的上限"))
+                continue
+            self.members.append(info)
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def _read_member(self, info: zipfile.ZipInfo) -> bytes:
+        """读取单个成员，超过大小上限时中止（不信任压缩包头中声明的大小）"""
+        if info.file_size > self.max_member_size:
+            raise ValueError(f"文件超过 {self.max_member_size // (1024 * 1024)}MB 上限")
+        chunks = []
+        size = 0
+        with self._zip.open(info) as member:
+            while True:
+                chunk = member.read(_READ_CHUNK)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > self.max_member_size:
+                    raise ValueError(f"文件超过 {self.max_member_size // (1024 * 1024)}MB 上限")
+                chunks.append(chunk)
+        return b''.join(chunks)
+
+    def iter_members(self) -> Iterator[Tuple[str, bytes]]:
+        """逐个生成 (文件名, PDF字节)，同一时刻只有当前成员的内容在内存中"""
+        for info in self.members:
+            base_name = os.path.basename(_decode_member_name(info))
+            try:
+                pdf_bytes = self._read_member(info)
+            except (ValueError, RuntimeError, zipfile.BadZipFile, OSError) as e:
+                # 加密、损坏或超大的成员跳过，不影响其余成员
+                logger.warning(f"跳过压缩包成员 {base_name}: {e}")
+                self.skipped.append((base_name, str(e)))
+                continue
+            yield base_name, pdf_bytes
+
+    def close(self):
+        self._zip.close()